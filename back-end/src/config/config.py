@@ -33,6 +33,10 @@ class GlobalConfig(BaseSettings):
     # "http://localhost:8080", "http://local.dockertoolbox.tiangolo.com"]'
     FRONTEND_HOST: List[AnyHttpUrl] = []
     MAX_UPLOAD_SIZE_GB: Union[int, float] = Field(default=10)
+    MAX_DECOMPRESSION_RATIO: Union[int, float] = Field(default=100)
+    DATASET_EXTRACTION_WORKERS: int = Field(default=4)
+    UPLOAD_PART_SIZE_MB: int = Field(default=8, ge=5)  # S3 min part is 5MiB
+    UPLOAD_EXPIRY_HOURS: float = Field(default=24, gt=0)  # unfinished
     SECURE_COOKIES: bool = Field(default=False)  # set to True if site is HTTPS
 
     # Authentication Settings
@@ -67,6 +71,23 @@ class GlobalConfig(BaseSettings):
     K8S_HOST: Optional[str] = None
     K8S_API_KEY: Optional[str] = None
 
+    # Warm Pool Settings (pre-started engines handed out to previews)
+    IE_WARM_POOL_SIZE: int = Field(default=0, ge=0)  # per image, 0 disables
+    IE_WARM_POOL_IMAGES: List[str] = []
+    # Also keep warm the N most used images of existing services
+    IE_WARM_POOL_TOP_IMAGES: int = Field(default=0, ge=0)
+    IE_WARM_POOL_REFRESH_SECONDS: float = Field(default=60, gt=0)
+
+    # Autoscaling Settings (services with an autoscaling policy)
+    # Per pod metric served by the custom metrics API, for RPS based HPAs
+    IE_HPA_RPS_METRIC: str = Field(default="requests_per_second")
+    IE_IDLE_CHECK_SECONDS: float = Field(default=60, gt=0)
+    # Back-end service (e.g aas-backend.default:8080) that requests to
+    # engines scaled to zero are sent to, to wake them up. If not set,
+    # engines are never scaled to zero
+    IE_WAKE_SERVICE: Optional[str] = None
+    IE_WAKE_TIMEOUT_SECONDS: float = Field(default=120, gt=0)
+
     # ClearML Settings
     CLEARML_CONFIG_FILE: Optional[str] = None
     CLEARML_WEB_HOST: Optional[str] = None
@@ -75,6 +96,11 @@ class GlobalConfig(BaseSettings):
     CLEARML_API_ACCESS_KEY: Optional[str] = None
     CLEARML_API_SECRET_KEY: Optional[str] = None
 
+    # Experiment Cache Settings
+    EXPERIMENT_CACHE_TTL_SECONDS: float = Field(default=30)
+    EXPERIMENT_CACHE_COMPLETED_TTL_SECONDS: float = Field(default=3600)
+    EXPERIMENT_CACHE_SIZE: int = Field(default=256)
+
     @validator("FRONTEND_HOST", pre=True)
     def assemble_cors_origins(
         cls, v: Union[str, List[str]]
@@ -0,0 +1,300 @@
+"""Streaming extraction of uploaded dataset archives.
+
+Archives are extracted entry by entry straight from the uploaded
+file object, instead of first writing the archive to disk and then
+calling `shutil.unpack_archive`. While extracting, the total number
+of decompressed bytes and the compression ratio are checked, so that
+a decompression bomb is rejected before it fills up the disk.
+"""
+import bz2
+import gzip
+import tarfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Callable, List, Optional, Union
+
+from .dependencies.file_validator import MaxFileSizeException
+
+EXTRACT_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+# Ratio is only enforced after this many bytes have been written
+# so that small, highly compressible files (e.g csv) are not rejected
+MIN_RATIO_CHECK_BYTES = 10 * 1024 * 1024  # 10 MiB
+
+ZIP_CONTENT_TYPES = {"application/zip"}
+TAR_CONTENT_TYPES = {"application/x-tar"}
+SINGLE_FILE_DECOMPRESSORS = {
+    "application/gzip": lambda f: gzip.GzipFile(fileobj=f, mode="rb"),
+    "application/x-bzip2": lambda f: bz2.BZ2File(f, mode="rb"),
+}
+
+
+class ExtractionLimitException(MaxFileSizeException):
+    """Exception raised when an archive exceeds the extraction limits."""
+
+    def __init__(self, fs: int, reason: str):
+        """Initialize an ExtractionLimitException.
+
+        Args:
+            fs (int): Total decompressed bytes when this exception was raised.
+            reason (str): Which limit was exceeded.
+        """
+        super().__init__(fs=fs)
+        self.reason = reason
+
+    def __str__(self) -> str:
+        return self.reason
+
+
+class UnsafeArchiveMemberException(ValueError):
+    """Exception raised when an archive member would be written
+    outside of the extraction directory."""
+
+
+class _CountingReader:
+    """File-like wrapper that counts how many bytes were read."""
+
+    def __init__(self, fileobj: BinaryIO):
+        self.fileobj = fileobj
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.fileobj.read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+class DecompressionBudget:
+    """Thread-safe tracker of decompressed bytes written to disk."""
+
+    def __init__(self, max_bytes: int, max_ratio: Optional[float] = None):
+        """Initialize a DecompressionBudget.
+
+        Args:
+            max_bytes (int): Maximum total decompressed bytes.
+            max_ratio (Optional[float], optional): Maximum ratio of
+                decompressed bytes to compressed bytes. Defaults to None.
+        """
+        self.max_bytes = max_bytes
+        self.max_ratio = max_ratio
+        self.written = 0
+        self._lock = threading.Lock()
+
+    def consume(
+        self, num_bytes: int, compressed_bytes: Optional[int] = None
+    ) -> None:
+        """Record bytes written and check that limits are respected.
+
+        Args:
+            num_bytes (int): Number of decompressed bytes just written.
+            compressed_bytes (Optional[int], optional): Compressed bytes
+                read so far, used to check the compression ratio.
+                Defaults to None.
+
+        Raises:
+            ExtractionLimitException: If either limit is exceeded.
+        """
+        with self._lock:
+            self.written += num_bytes
+            written = self.written
+        if written > self.max_bytes:
+            raise ExtractionLimitException(
+                fs=written,
+                reason=f"Decompressed size exceeds {self.max_bytes} bytes",
+            )
+        if (
+            self.max_ratio is not None
+            and compressed_bytes
+            and written > MIN_RATIO_CHECK_BYTES
+            and written / compressed_bytes > self.max_ratio
+        ):
+            raise ExtractionLimitException(
+                fs=written,
+                reason=f"Compression ratio exceeds {self.max_ratio}",
+            )
+
+
+def safe_member_path(dest: Union[str, Path], name: str) -> Path:
+    """Resolve the path an archive member should be extracted to,
+    guarding against path traversal (e.g `../../etc/passwd`).
+
+    Args:
+        dest (Union[str, Path]): Extraction directory
+        name (str): Name of member in archive
+
+    Raises:
+        UnsafeArchiveMemberException: If member would be written
+            outside of the extraction directory.
+
+    Returns:
+        Path: Path to write member to
+    """
+    dest = Path(dest).resolve()
+    parts = [
+        part
+        for part in PurePosixPath(name.replace("\\", "/")).parts
+        if part not in ("", "/", ".")
+    ]
+    target = dest.joinpath(*parts).resolve()
+    if target == dest or dest not in target.parents:
+        raise UnsafeArchiveMemberException(f"Unsafe member name: {name}")
+    return target
+
+
+class StreamingExtractor:
+    """Extracts zip, tar, gzip and bzip2 archives entry by entry,
+    enforcing a decompressed size budget and compression ratio limit."""
+
+    def __init__(
+        self,
+        max_bytes: int,
+        max_ratio: Optional[float] = None,
+        max_workers: int = 1,
+        chunk_size: int = EXTRACT_CHUNK_SIZE,
+    ):
+        """Initialize a StreamingExtractor.
+
+        Args:
+            max_bytes (int): Maximum total decompressed bytes.
+            max_ratio (Optional[float], optional): Maximum compression ratio.
+                Defaults to None.
+            max_workers (int, optional): Number of threads used to extract
+                zip members. Defaults to 1.
+            chunk_size (int, optional): Size of chunks to write.
+                Defaults to EXTRACT_CHUNK_SIZE.
+        """
+        self.max_bytes = max_bytes
+        self.max_ratio = max_ratio
+        self.max_workers = max(1, max_workers)
+        self.chunk_size = chunk_size
+
+    def extract(
+        self,
+        fileobj: BinaryIO,
+        content_type: str,
+        dest: Union[str, Path],
+        filename: Optional[str] = None,
+    ) -> List[Path]:
+        """Extract an archive into a directory.
+
+        Args:
+            fileobj (BinaryIO): Archive file object. Zip archives and
+                single compressed files require a seekable file object.
+            content_type (str): MIME type of the archive
+            dest (Union[str, Path]): Directory to extract to
+            filename (Optional[str], optional): Original filename, used to
+                name the output of a single compressed file. Defaults to None.
+
+        Raises:
+            ValueError: If the content type is not supported
+            ExtractionLimitException: If extraction limits are exceeded
+
+        Returns:
+            List[Path]: Paths of extracted files
+        """
+        budget = DecompressionBudget(self.max_bytes, self.max_ratio)
+        if content_type in ZIP_CONTENT_TYPES:
+            return self._extract_zip(fileobj, dest, budget)
+        if content_type in TAR_CONTENT_TYPES:
+            return self._extract_tar(fileobj, dest, budget)
+        if content_type in SINGLE_FILE_DECOMPRESSORS:
+            # gzip/bzip2 may either be a compressed tarball or a single file
+            start = fileobj.tell()
+            try:
+                return self._extract_tar(fileobj, dest, budget)
+            except tarfile.ReadError:
+                fileobj.seek(start)
+            return self._extract_single(
+                fileobj,
+                dest,
+                budget,
+                SINGLE_FILE_DECOMPRESSORS[content_type],
+                filename,
+            )
+        raise ValueError(f"Unsupported archive type: {content_type}")
+
+    def _copy(
+        self,
+        src: BinaryIO,
+        target: Path,
+        budget: DecompressionBudget,
+        compressed_bytes: Callable[[], Optional[int]],
+    ) -> None:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, "wb") as f:
+            while chunk := src.read(self.chunk_size):
+                budget.consume(len(chunk), compressed_bytes())
+                f.write(chunk)
+
+    def _extract_zip(
+        self,
+        fileobj: BinaryIO,
+        dest: Union[str, Path],
+        budget: DecompressionBudget,
+    ) -> List[Path]:
+        with zipfile.ZipFile(fileobj) as archive:
+            members = [
+                info for info in archive.infolist() if not info.is_dir()
+            ]
+            # Reject early if the archive declares it is too large
+            declared = sum(info.file_size for info in members)
+            if declared > self.max_bytes:
+                raise ExtractionLimitException(
+                    fs=declared,
+                    reason=f"Decompressed size exceeds {self.max_bytes} bytes",
+                )
+            compressed = sum(info.compress_size for info in members)
+            targets = [
+                safe_member_path(dest, info.filename) for info in members
+            ]
+
+            def extract_member(args) -> Path:
+                info, target = args
+                # ZipFile serializes reads on the shared file handle,
+                # decompression itself runs in parallel
+                with archive.open(info) as src:
+                    self._copy(src, target, budget, lambda: compressed)
+                return target
+
+            if self.max_workers == 1 or len(members) < 2:
+                return [extract_member(job) for job in zip(members, targets)]
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                return list(pool.map(extract_member, zip(members, targets)))
+
+    def _extract_tar(
+        self,
+        fileobj: BinaryIO,
+        dest: Union[str, Path],
+        budget: DecompressionBudget,
+    ) -> List[Path]:
+        reader = _CountingReader(fileobj)
+        extracted = []
+        # Stream mode (r|*) never seeks, so entries are read in order
+        with tarfile.open(fileobj=reader, mode="r|*") as archive:
+            for member in archive:
+                if not member.isfile():
+                    # Skip directories, links and device files
+                    continue
+                target = safe_member_path(dest, member.name)
+                src = archive.extractfile(member)
+                if src is None:
+                    continue
+                self._copy(src, target, budget, lambda: reader.bytes_read)
+                extracted.append(target)
+        return extracted
+
+    def _extract_single(
+        self,
+        fileobj: BinaryIO,
+        dest: Union[str, Path],
+        budget: DecompressionBudget,
+        decompressor: Callable,
+        filename: Optional[str],
+    ) -> List[Path]:
+        reader = _CountingReader(fileobj)
+        name = Path(filename or "data").stem or "data"
+        target = safe_member_path(dest, name)
+        with decompressor(reader) as src:
+            self._copy(src, target, budget, lambda: reader.bytes_read)
+        return [target]
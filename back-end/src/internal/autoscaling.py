@@ -0,0 +1,435 @@
+"""Autoscaling of inference engines.
+
+Knative engines are autoscaled by Knative itself. For Emissary engines,
+a HorizontalPodAutoscaler is created next to the deployment, and as an
+HPA cannot scale to zero, idle engines are scaled to zero by a
+background task instead.
+
+An engine is idle once its pods have served no requests, per the
+request rate metric of the custom metrics API (`IE_HPA_RPS_METRIC`,
+also used by RPS based HPAs), and its status has not been requested
+for its idle timeout. If the request rate is unavailable, the engine is
+never scaled to zero.
+
+Before an engine is scaled to zero, a second Emissary mapping for its
+path is created, sending its requests to the back-end (`IE_WAKE_SERVICE`,
+see `routers.wake`). The back-end scales the engine back up, waits for
+it to be ready, removes the mapping and redirects the request back to
+the engine. The engine is also woken up when its status is requested,
+e.g when the page of its model is opened. Without `IE_WAKE_SERVICE`,
+engines are never scaled to zero.
+"""
+import asyncio
+import datetime
+from typing import Dict, Optional, Union
+
+from kubernetes.client import (
+    ApiClient,
+    AppsV1Api,
+    AutoscalingV2Api,
+    CustomObjectsApi,
+)
+from kubernetes.client.rest import ApiException as K8sAPIException
+from kubernetes.utils import parse_quantity
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from yaml import safe_load
+
+from ..config.config import config
+from ..models.engine import AutoscalingPolicy, ServiceBackend
+from .dependencies.k8s_client import get_k8s_client
+from .dependencies.mongo_client import get_db
+from .templates import template_env
+
+
+def get_autoscaling_policy(service: Dict) -> Optional[AutoscalingPolicy]:
+    """Get the autoscaling policy of a service from the database.
+
+    Args:
+        service (Dict): Service document
+
+    Returns:
+        Optional[AutoscalingPolicy]: Policy, or None if not autoscaled
+    """
+    if not service.get("autoscaling"):
+        return None
+    return AutoscalingPolicy.parse_obj(service["autoscaling"])
+
+
+def render_hpa(
+    engine_name: str, policy: Optional[AutoscalingPolicy]
+) -> Optional[Dict]:
+    """Render the HPA of an Emissary inference engine.
+
+    Args:
+        engine_name (str): Name of the engine
+        policy (Optional[AutoscalingPolicy]): Autoscaling policy
+
+    Returns:
+        Optional[Dict]: Manifest, or None if the engine has a fixed
+            number of replicas
+    """
+    if policy is None or policy.max_replicas <= max(policy.min_replicas, 1):
+        return None
+    template = template_env.get_template(
+        "ambassador/inference-engine-hpa.yaml.j2"
+    )
+    return safe_load(
+        template.render(
+            {
+                "engine_name": engine_name,
+                "autoscaling": policy,
+                "rps_metric": config.IE_HPA_RPS_METRIC,
+            }
+        )
+    )
+
+
+def apply_hpa(
+    client: ApiClient,
+    engine_name: str,
+    policy: Optional[AutoscalingPolicy],
+):
+    """Create or replace the HPA of an Emissary inference engine,
+    or delete it if the policy no longer needs one.
+
+    Args:
+        client (ApiClient): K8S client
+        engine_name (str): Name of the engine
+        policy (Optional[AutoscalingPolicy]): Autoscaling policy
+    """
+    manifest = render_hpa(engine_name, policy)
+    if manifest is None:
+        delete_hpa(client, engine_name)
+        return
+    api = AutoscalingV2Api(client)
+    try:
+        api.create_namespaced_horizontal_pod_autoscaler(
+            namespace=config.IE_NAMESPACE, body=manifest
+        )
+    except K8sAPIException as err:
+        if err.status != 409:  # already exists
+            raise err
+        api.replace_namespaced_horizontal_pod_autoscaler(
+            name=engine_name + "-hpa",
+            namespace=config.IE_NAMESPACE,
+            body=manifest,
+        )
+
+
+def delete_hpa(client: ApiClient, engine_name: str):
+    """Delete the HPA of an Emissary inference engine, if any.
+
+    Args:
+        client (ApiClient): K8S client
+        engine_name (str): Name of the engine
+    """
+    try:
+        AutoscalingV2Api(client).delete_namespaced_horizontal_pod_autoscaler(
+            name=engine_name + "-hpa", namespace=config.IE_NAMESPACE
+        )
+    except K8sAPIException as err:
+        if err.status != 404:
+            raise err
+
+
+def _to_datetime(value: Union[str, datetime.datetime]) -> datetime.datetime:
+    # lastModified is saved as a string
+    if isinstance(value, str):
+        return datetime.datetime.fromisoformat(value)
+    return value
+
+
+def is_idle(service: Dict, now: datetime.datetime) -> bool:
+    """Check if a service has been idle for longer than its policy allows.
+
+    Args:
+        service (Dict): Service document
+        now (datetime.datetime): Current time
+
+    Returns:
+        bool: If the service should be scaled to zero
+    """
+    policy = get_autoscaling_policy(service)
+    if policy is None or policy.idle_timeout_seconds is None:
+        return False
+    if service.get("scaledToZero"):
+        return False
+    last_active = service.get("lastActive") or service.get("lastModified")
+    if last_active is None:
+        return False
+    idle_seconds = (now - _to_datetime(last_active)).total_seconds()
+    return idle_seconds > policy.idle_timeout_seconds
+
+
+def sum_request_rate(metrics: Dict) -> float:
+    """Total request rate of the pods of an engine.
+
+    Args:
+        metrics (Dict): MetricValueList from the custom metrics API
+
+    Returns:
+        float: Requests per second, summed over the pods
+    """
+    return float(
+        sum(parse_quantity(item["value"]) for item in metrics["items"])
+    )
+
+
+def get_request_rate(client: ApiClient, engine_name: str) -> float:
+    """Get the request rate of an Emissary inference engine, from the
+    same per pod metric as RPS based HPAs.
+
+    Args:
+        client (ApiClient): K8S client
+        engine_name (str): Name of the engine
+
+    Raises:
+        K8sAPIException: If the custom metrics API or metric is unavailable
+
+    Returns:
+        float: Requests per second served by the pods of the engine
+    """
+    metrics = client.call_api(
+        "/apis/custom.metrics.k8s.io/v1beta1/namespaces/{namespace}"
+        + "/pods/*/{metric}",
+        "GET",
+        path_params={
+            "namespace": config.IE_NAMESPACE,
+            "metric": config.IE_HPA_RPS_METRIC,
+        },
+        query_params=[("labelSelector", f"app={engine_name}")],
+        response_type="object",
+        auth_settings=["BearerToken"],
+        _return_http_data_only=True,
+    )
+    return sum_request_rate(metrics)
+
+
+def create_wake_mapping(client: ApiClient, engine_name: str):
+    """Send requests to an Emissary inference engine to the back-end,
+    which wakes the engine up.
+
+    Args:
+        client (ApiClient): K8S client
+        engine_name (str): Name of the engine
+    """
+    template = template_env.get_template("ambassador/wake-mapping.yaml.j2")
+    manifest = safe_load(
+        template.render(
+            {
+                "engine_name": engine_name,
+                "wake_service": config.IE_WAKE_SERVICE,
+                # Requests wait for the engine to be ready
+                "timeout_ms": int(config.IE_WAKE_TIMEOUT_SECONDS + 10) * 1000,
+            }
+        )
+    )
+    try:
+        CustomObjectsApi(client).create_namespaced_custom_object(
+            group="getambassador.io",
+            version="v2",
+            namespace=config.IE_NAMESPACE,
+            plural="mappings",
+            body=manifest,
+        )
+    except K8sAPIException as err:
+        if err.status != 409:  # already exists
+            raise err
+
+
+def delete_wake_mapping(client: ApiClient, engine_name: str):
+    """Send requests to an Emissary inference engine to the engine again.
+
+    Args:
+        client (ApiClient): K8S client
+        engine_name (str): Name of the engine
+    """
+    try:
+        CustomObjectsApi(client).delete_namespaced_custom_object(
+            group="getambassador.io",
+            version="v2",
+            namespace=config.IE_NAMESPACE,
+            plural="mappings",
+            name=engine_name + "-wake",
+        )
+    except K8sAPIException as err:
+        if err.status != 404:
+            raise err
+
+
+def is_engine_ready(client: ApiClient, engine_name: str) -> bool:
+    """Check if an Emissary inference engine has a ready replica.
+
+    Args:
+        client (ApiClient): K8S client
+        engine_name (str): Name of the engine
+
+    Returns:
+        bool: If the engine can serve requests
+    """
+    result = AppsV1Api(client).read_namespaced_deployment_status(
+        name=engine_name + "-deployment", namespace=config.IE_NAMESPACE
+    )
+    return bool(result.status.ready_replicas)
+
+
+async def wait_until_ready(client: ApiClient, engine_name: str) -> bool:
+    """Wait up to `IE_WAKE_TIMEOUT_SECONDS` for an engine to be ready.
+
+    Args:
+        client (ApiClient): K8S client
+        engine_name (str): Name of the engine
+
+    Returns:
+        bool: If the engine is ready
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + config.IE_WAKE_TIMEOUT_SECONDS
+    while not is_engine_ready(client, engine_name):
+        if loop.time() >= deadline:
+            return False
+        await asyncio.sleep(2)
+    return True
+
+
+async def finish_waking(
+    db: AsyncIOMotorDatabase, client: ApiClient, service_name: str
+):
+    """Route requests to a woken up engine, once it is ready.
+
+    Args:
+        db (AsyncIOMotorDatabase): MongoDB database
+        client (ApiClient): K8S client
+        service_name (str): Name of the service
+    """
+    delete_wake_mapping(client, service_name)
+    await db["services"].update_one(
+        {"serviceName": service_name}, {"$unset": {"wakeMapping": ""}}
+    )
+
+
+async def record_activity(db: AsyncIOMotorDatabase, service_name: str):
+    """Mark a service as in use, delaying it being scaled to zero.
+
+    Args:
+        db (AsyncIOMotorDatabase): MongoDB database
+        service_name (str): Name of the service
+    """
+    await db["services"].update_one(
+        {"serviceName": service_name},
+        {"$set": {"lastActive": datetime.datetime.now()}},
+    )
+
+
+async def wake_engine(
+    db: AsyncIOMotorDatabase, client: ApiClient, service: Dict
+) -> int:
+    """Scale an engine that was scaled to zero for being idle back up.
+    Its requests are still sent to the back-end until `finish_waking`.
+
+    Args:
+        db (AsyncIOMotorDatabase): MongoDB database
+        client (ApiClient): K8S client
+        service (Dict): Service document
+
+    Returns:
+        int: Number of replicas the engine was scaled to
+    """
+    policy = get_autoscaling_policy(service)
+    replicas = max(policy.min_replicas, 1) if policy else 1
+    AppsV1Api(client).patch_namespaced_deployment_scale(
+        name=service["serviceName"] + "-deployment",
+        namespace=config.IE_NAMESPACE,
+        body={"spec": {"replicas": replicas}},
+    )
+    await db["services"].update_one(
+        {"serviceName": service["serviceName"]},
+        {
+            "$set": {
+                "scaledToZero": False,
+                "lastActive": datetime.datetime.now(),
+            }
+        },
+    )
+    print(f"INFO: Woke up idle engine {service['serviceName']}")
+    return replicas
+
+
+async def reap_idle_engines():
+    """Scale Emissary engines that have been idle for longer than their
+    `idleTimeoutSeconds` to zero, and mark those serving requests as
+    active."""
+    db, _ = get_db()
+    services = (
+        await db["services"]
+        .find(
+            {
+                "backend": ServiceBackend.EMISSARY,
+                "autoscaling.idleTimeoutSeconds": {"$gt": 0},
+                "scaledToZero": {"$ne": True},
+            }
+        )
+        .to_list(length=None)
+    )
+    now = datetime.datetime.now()
+    with get_k8s_client() as client:
+        apps_api = AppsV1Api(client)
+        for service in services:
+            service_name = service["serviceName"]
+            try:
+                request_rate = get_request_rate(client, service_name)
+            except K8sAPIException as err:
+                # Cannot tell if it is in use, so keep it running
+                print(f"WARN: Could not get traffic of {service_name}: {err}")
+                continue
+            if request_rate > 0:
+                await record_activity(db, service_name)
+                continue
+            if not is_idle(service, now):
+                continue
+            try:
+                # Requests must be able to wake it up before it goes down
+                create_wake_mapping(client, service_name)
+                await db["services"].update_one(
+                    {"serviceName": service_name},
+                    {"$set": {"wakeMapping": True}},
+                )
+                # HPA stops scaling a deployment with 0 replicas
+                apps_api.patch_namespaced_deployment_scale(
+                    name=service_name + "-deployment",
+                    namespace=config.IE_NAMESPACE,
+                    body={"spec": {"replicas": 0}},
+                )
+            except K8sAPIException as err:
+                print(f"WARN: Could not scale down {service_name}: {err}")
+                continue
+            await db["services"].update_one(
+                {"serviceName": service_name},
+                {"$set": {"scaledToZero": True}},
+            )
+            print(f"INFO: Scaled idle engine {service_name} to zero")
+
+
+# Reference to the background task, so it is not garbage collected
+_idle_reaper_task: Optional[asyncio.Task] = None
+
+
+async def start_idle_reaper():
+    """Start scaling idle engines to zero in the background, if they
+    can be woken up by requests."""
+    global _idle_reaper_task
+    if config.IE_WAKE_SERVICE is None:
+        print("INFO: IE_WAKE_SERVICE is not set, idle engines are kept up")
+        return
+    if _idle_reaper_task is None:
+        _idle_reaper_task = asyncio.create_task(run_idle_reaper())
+
+
+async def run_idle_reaper():
+    """Scale idle engines to zero periodically, while the app runs."""
+    while True:
+        try:
+            await reap_idle_engines()
+        except Exception as err:  # keep the loop alive
+            print(f"ERROR: Failed to scale down idle engines: {err}")
+        await asyncio.sleep(config.IE_IDLE_CHECK_SECONDS)
@@ -0,0 +1,127 @@
+"""In-memory caching utilities.
+
+Used to avoid repeated calls to slow remote services (e.g ClearML)
+when many users request the same resource.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache where each entry expires after a TTL."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60):
+        """Initialize a TTLCache.
+
+        Args:
+            maxsize (int, optional): Maximum number of entries. Least
+                recently used entries are evicted first. Defaults to 1024.
+            ttl (float, optional): Default time to live of an entry
+                in seconds. Defaults to 60.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get an entry from the cache.
+
+        Args:
+            key (Hashable): Key of entry
+            default (Any, optional): Value to return if entry is
+                missing or expired. Defaults to None.
+
+        Returns:
+            Any: Cached value
+        """
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Add an entry to the cache.
+
+        Args:
+            key (Hashable): Key of entry
+            value (Any): Value to cache
+            ttl (Optional[float], optional): Time to live in seconds.
+                If None, the default TTL is used. Defaults to None.
+        """
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry from the cache.
+
+        Args:
+            key (Hashable): Key of entry
+            default (Any, optional): Value to return if entry is missing.
+                Defaults to None.
+
+        Returns:
+            Any: Removed value
+        """
+        with self._lock:
+            item = self._data.pop(key, _MISSING)
+        return default if item is _MISSING else item[0]
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RequestCoalescer:
+    """Ensures that concurrent requests for the same key
+    share a single in-flight call, instead of each making their own."""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """Run `func`, or wait for the in-flight call with the same key.
+
+        Args:
+            key (Hashable): Key identifying the request
+            func (Callable[[], Awaitable[T]]): Coroutine function to call
+                if there is no in-flight call for the key
+
+        Returns:
+            T: Result of the call
+        """
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shield so that one cancelled request does not cancel the
+        # call for everyone else waiting on it
+        return await asyncio.shield(future)
+
+    def __len__(self) -> int:
+        return len(self._inflight)
@@ -1,10 +1,11 @@
 """Contains functions to connect to MinIO instance and upload data to it"""
 from io import BytesIO
-from typing import Optional
+from typing import List, Optional
 from aiohttp import client_reqrep
 
 import miniopy_async
 from miniopy_async.commonconfig import CopySource, ComposeSource
+from miniopy_async.datatypes import Part
 from miniopy_async.deleteobjects import DeleteObject
 from colorama import Fore
 
@@ -201,3 +202,155 @@ async def compose_data(
     await client.compose_object(target_bucket_name, target_object_name, copy_source)
 
     return f"s3://{target_bucket_name}/{target_object_name}"
+
+
+# miniopy_async has no public API to upload the parts of an object in
+# separate requests, so resumable uploads use private methods of its
+# client. These can change in any release, so miniopy-async is pinned
+# to 1.12.x in pyproject.toml.
+def _multipart_method(client: miniopy_async.Minio, name: str):
+    """Get a private multipart upload method of the MinIO client
+
+    Args:
+        client (miniopy_async.Minio): MinIO client
+        name (str): Name of method (e.g _upload_part)
+
+    Raises:
+        NotImplementedError: If the installed miniopy_async does not have it
+
+    Returns:
+        Callable: Bound method
+    """
+    method = getattr(client, name, None)
+    if method is None:
+        raise NotImplementedError(
+            f"MinIO client has no {name}, "
+            + "multipart uploads need miniopy-async 1.12.x"
+        )
+    return method
+
+
+async def create_multipart_upload(
+    client: miniopy_async.Minio,
+    object_name: str,
+    bucket_name: str,
+    content_type: str = "application/octet-stream",
+) -> str:
+    """Start a multipart upload, so that an object can be uploaded in parts
+
+    Args:
+        client (miniopy_async.Minio): MinIO client
+        object_name (str): Filename of object
+        bucket_name (str): Bucket to store object in
+        content_type (str, optional): Content type of object. Defaults to "application/octet-stream".
+
+    Returns:
+        str: Upload ID of the multipart upload
+    """
+    return await _multipart_method(client, "_create_multipart_upload")(
+        bucket_name, object_name, {"Content-Type": content_type}
+    )
+
+
+async def upload_part(
+    client: miniopy_async.Minio,
+    blob: bytes,
+    object_name: str,
+    bucket_name: str,
+    upload_id: str,
+    part_number: int,
+) -> str:
+    """Upload a single part of a multipart upload
+
+    Args:
+        client (miniopy_async.Minio): MinIO client
+        blob (bytes): Binary data of the part
+        object_name (str): Filename of object
+        bucket_name (str): Bucket to store object in
+        upload_id (str): Upload ID of the multipart upload
+        part_number (int): Part number (1 to 10000)
+
+    Returns:
+        str: ETag of the uploaded part
+    """
+    return await _multipart_method(client, "_upload_part")(
+        bucket_name, object_name, blob, None, upload_id, part_number
+    )
+
+
+async def list_parts(
+    client: miniopy_async.Minio,
+    object_name: str,
+    bucket_name: str,
+    upload_id: str,
+) -> List[Part]:
+    """List parts that have been uploaded for a multipart upload.
+    Used to resume an interrupted upload.
+
+    Args:
+        client (miniopy_async.Minio): MinIO client
+        object_name (str): Filename of object
+        bucket_name (str): Bucket object is stored in
+        upload_id (str): Upload ID of the multipart upload
+
+    Returns:
+        List[Part]: Uploaded parts, sorted by part number
+    """
+    parts: List[Part] = []
+    marker = None
+    while True:
+        result = await _multipart_method(client, "_list_parts")(
+            bucket_name,
+            object_name,
+            upload_id,
+            part_number_marker=marker,
+        )
+        parts.extend(result.parts)
+        if not result.is_truncated:
+            break
+        marker = str(result.next_part_number_marker)
+    return sorted(parts, key=lambda part: part.part_number)
+
+
+async def complete_multipart_upload(
+    client: miniopy_async.Minio,
+    parts: List[Part],
+    object_name: str,
+    bucket_name: str,
+    upload_id: str,
+) -> str:
+    """Assemble uploaded parts into a single object (server-side)
+
+    Args:
+        client (miniopy_async.Minio): MinIO client
+        parts (List[Part]): Parts to assemble, in order
+        object_name (str): Filename of object
+        bucket_name (str): Bucket to store object in
+        upload_id (str): Upload ID of the multipart upload
+
+    Returns:
+        str: an S3 URL to the object (need to be further processed)
+    """
+    await _multipart_method(client, "_complete_multipart_upload")(
+        bucket_name, object_name, upload_id, parts
+    )
+    return f"s3://{bucket_name}/{object_name}"
+
+
+async def abort_multipart_upload(
+    client: miniopy_async.Minio,
+    object_name: str,
+    bucket_name: str,
+    upload_id: str,
+):
+    """Abort a multipart upload, removing any uploaded parts
+
+    Args:
+        client (miniopy_async.Minio): MinIO client
+        object_name (str): Filename of object
+        bucket_name (str): Bucket object is stored in
+        upload_id (str): Upload ID of the multipart upload
+    """
+    await _multipart_method(client, "_abort_multipart_upload")(
+        bucket_name, object_name, upload_id
+    )
@@ -0,0 +1,161 @@
+"""Downsampling of scalar series for plotting.
+
+Long training runs can log hundreds of thousands of points per
+scalar series, which is far more than can be displayed in a chart.
+These functions reduce each series to a maximum number of points
+while preserving its visual shape.
+"""
+from enum import Enum
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+class DownsampleMethod(str, Enum):
+    """Supported downsampling algorithms."""
+
+    LTTB = "lttb"  # Largest-Triangle-Three-Buckets
+    MINMAX = "minmax"  # Keep min and max of each bucket
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Select points using the Largest-Triangle-Three-Buckets algorithm.
+
+    Each bucket is reduced to the point forming the largest triangle
+    with the previously selected point and the average of the next
+    bucket. Area computation within a bucket is vectorized.
+
+    Args:
+        x (np.ndarray): X values, sorted in ascending order
+        y (np.ndarray): Y values
+        n_out (int): Number of points to keep (at least 3)
+
+    Returns:
+        np.ndarray: Indices of points to keep
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    # First and last points are always kept, the rest are split
+    # into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    selected = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        areas = np.abs(
+            (x[selected] - avg_x) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (avg_y - y[selected])
+        )
+        selected = start + int(np.argmax(areas))
+        indices[i + 1] = selected
+    return indices
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Select the min and max point of each bucket.
+
+    Args:
+        y (np.ndarray): Y values
+        n_out (int): Max number of points to keep (at least 2)
+
+    Returns:
+        np.ndarray: Indices of points to keep, in ascending order
+    """
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    # First and last points are always kept, the points in between
+    # are split into buckets of two points each
+    n_buckets = (n_out - 2) // 2
+    if n_buckets < 1:
+        return np.array([0, n - 1])
+    interior = y[1 : n - 1]
+    bucket_size = int(np.ceil(len(interior) / n_buckets))
+    padded = np.full(n_buckets * bucket_size, np.nan)
+    padded[: len(interior)] = interior
+    buckets = padded.reshape(n_buckets, bucket_size)
+    # Empty trailing buckets and all-NaN buckets are skipped
+    valid = ~np.all(np.isnan(buckets), axis=1)
+    offsets = 1 + np.arange(n_buckets)[valid] * bucket_size
+    mins = offsets + np.nanargmin(buckets[valid], axis=1)
+    maxs = offsets + np.nanargmax(buckets[valid], axis=1)
+    return np.unique(np.concatenate([[0, n - 1], mins, maxs]))
+
+
+def downsample_series(
+    x: List, y: List, max_points: int, method: DownsampleMethod
+) -> Tuple[List, List]:
+    """Downsample a single series.
+
+    Series which cannot be converted to floats (e.g categorical x
+    values) are returned unchanged.
+
+    Args:
+        x (List): X values
+        y (List): Y values
+        max_points (int): Max number of points to keep
+        method (DownsampleMethod): Downsampling algorithm
+
+    Returns:
+        Tuple[List, List]: Downsampled x and y values
+    """
+    if len(x) <= max_points or len(x) != len(y):
+        return x, y
+    try:
+        x_arr = np.asarray(x, dtype=np.float64)
+        y_arr = np.asarray(y, dtype=np.float64)
+    except (TypeError, ValueError):
+        return x, y
+    if method == DownsampleMethod.LTTB:
+        # NaN would poison the triangle areas
+        y_arr = np.nan_to_num(y_arr)
+        indices = lttb_indices(x_arr, y_arr, max_points)
+    else:
+        if np.all(np.isnan(y_arr)):
+            return x, y
+        indices = minmax_indices(y_arr, max_points)
+    # Index into the original values to keep their types (e.g int, None)
+    return (
+        np.asarray(x, dtype=object)[indices].tolist(),
+        np.asarray(y, dtype=object)[indices].tolist(),
+    )
+
+
+def downsample_plotly(
+    figures: List[Dict],
+    max_points: int,
+    method: DownsampleMethod = DownsampleMethod.LTTB,
+) -> List[Dict]:
+    """Downsample every series of a list of plotly figures.
+
+    Args:
+        figures (List[Dict]): Plotly JSON figures (e.g experiment metrics)
+        max_points (int): Max number of points per series
+        method (DownsampleMethod, optional): Downsampling algorithm.
+            Defaults to DownsampleMethod.LTTB.
+
+    Returns:
+        List[Dict]: Downsampled copy of the figures
+    """
+    output = []
+    for figure in figures:
+        # Shallow copy, so that cached figures are not modified
+        figure = {
+            **figure,
+            "data": [dict(series) for series in figure.get("data", [])],
+        }
+        for series in figure["data"]:
+            if "x" in series and "y" in series:
+                series["x"], series["y"] = downsample_series(
+                    series["x"], series["y"], max_points, method
+                )
+        output.append(figure)
+    return output
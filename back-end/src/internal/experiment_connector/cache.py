@@ -0,0 +1,286 @@
+"""Caching layer over the experiment connectors.
+
+Opening a model card with a linked experiment requires several
+remote calls to the experiment tracker (e.g ClearML). This module
+caches the connector and its expensive properties, fetches the
+properties concurrently in worker threads, and coalesces concurrent
+requests for the same experiment into a single remote fetch.
+"""
+import asyncio
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from ...config.config import config
+from ...models.experiment import Connector
+from ..cache import RequestCoalescer, TTLCache
+from ..downsample import DownsampleMethod, downsample_plotly
+from . import Experiment
+from .connector import ExperimentConnector
+
+# Properties which each require a separate remote call
+EXPERIMENT_FIELDS = (
+    "metrics",
+    "plots",
+    "artifacts",
+    "models",
+    "tags",
+    "config",
+)
+# Output URLs only change if an experiment is moved to another project
+OUTPUT_URL_TTL = 24 * 60 * 60
+# Artifacts, models and tags can still be added to a completed
+# experiment, so they are cached for a shorter time than scalars and plots
+MUTABLE_COMPLETED_TTL = 600
+
+
+class ExperimentCache:
+    """Caches experiments and their properties with per-field TTLs."""
+
+    def __init__(
+        self,
+        ttl: float = 30,
+        completed_ttl: float = 3600,
+        field_ttls: Optional[Dict[str, Tuple[float, float]]] = None,
+        maxsize: int = 256,
+    ):
+        """Initialize an ExperimentCache.
+
+        Args:
+            ttl (float, optional): TTL in seconds of entries for experiments
+                which are still running. Defaults to 30.
+            completed_ttl (float, optional): TTL in seconds of entries for
+                experiments which have completed. Defaults to 3600.
+            field_ttls (Optional[Dict[str, Tuple[float, float]]], optional):
+                Mapping of field name to (running TTL, completed TTL),
+                overriding the default TTLs. Defaults to None.
+            maxsize (int, optional): Max number of cached entries.
+                Defaults to 256.
+        """
+        self.ttl = ttl
+        self.completed_ttl = completed_ttl
+        self.field_ttls = field_ttls or {}
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._coalescer = RequestCoalescer()
+
+    def ttl_for(self, field: str, completed: bool) -> float:
+        """Get TTL of a field.
+
+        Args:
+            field (str): Name of field
+            completed (bool): If the experiment has completed
+
+        Returns:
+            float: TTL in seconds
+        """
+        running_ttl, completed_ttl = self.field_ttls.get(
+            field, (self.ttl, self.completed_ttl)
+        )
+        return completed_ttl if completed else running_ttl
+
+    async def _cached(
+        self,
+        key: Tuple,
+        fetch: Callable[[], Any],
+        ttl: Union[float, Callable[[Any], float], None] = None,
+    ) -> Any:
+        """Get value from cache, otherwise fetch it in a worker thread.
+        Concurrent misses for the same key share a single fetch.
+
+        Args:
+            key (Tuple): Cache key
+            fetch (Callable[[], Any]): Blocking function to fetch value
+            ttl (Union[float, Callable[[Any], float], None], optional): TTL of
+                value, or function of the fetched value returning the TTL.
+                Defaults to None.
+
+        Returns:
+            Any: Cached or fetched value
+        """
+        value = self._cache.get(key)
+        if value is not None:
+            return value
+
+        async def fetch_and_store():
+            result = await asyncio.to_thread(fetch)
+            self._cache.set(
+                key, result, ttl=ttl(result) if callable(ttl) else ttl
+            )
+            return result
+
+        return await self._coalescer.run(key, fetch_and_store)
+
+    async def get(
+        self, connector: Connector, exp_id: str
+    ) -> Tuple[ExperimentConnector, bool]:
+        """Get an experiment connector.
+
+        Args:
+            connector (Connector): Experiment connector type
+            exp_id (str): Experiment ID
+
+        Returns:
+            Tuple[ExperimentConnector, bool]: Experiment connector,
+                and whether the experiment has completed
+        """
+
+        def fetch() -> Tuple[ExperimentConnector, bool]:
+            exp = Experiment.from_connector(connector).get(exp_id=exp_id)
+            return exp, exp.completed
+
+        return await self._cached(
+            (connector, exp_id, "experiment"),
+            fetch,
+            ttl=lambda result: self.ttl_for("experiment", result[1]),
+        )
+
+    async def get_field(
+        self, connector: Connector, exp_id: str, field: str
+    ) -> Any:
+        """Get a property of an experiment.
+
+        Args:
+            connector (Connector): Experiment connector type
+            exp_id (str): Experiment ID
+            field (str): Name of property (e.g metrics, plots)
+
+        Returns:
+            Any: Value of property
+        """
+        exp, completed = await self.get(connector, exp_id)
+        return await self._cached(
+            (connector, exp_id, field),
+            lambda: getattr(exp, field),
+            ttl=self.ttl_for(field, completed),
+        )
+
+    async def get_fields(
+        self,
+        connector: Connector,
+        exp_id: str,
+        fields: Iterable[str] = EXPERIMENT_FIELDS,
+    ) -> Dict[str, Any]:
+        """Get many properties of an experiment concurrently.
+
+        Args:
+            connector (Connector): Experiment connector type
+            exp_id (str): Experiment ID
+            fields (Iterable[str], optional): Names of properties.
+                Defaults to EXPERIMENT_FIELDS.
+
+        Returns:
+            Dict[str, Any]: Mapping of property name to value
+        """
+        fields = list(fields)
+        values = await asyncio.gather(
+            *(self.get_field(connector, exp_id, field) for field in fields)
+        )
+        return dict(zip(fields, values))
+
+    async def get_metrics(
+        self,
+        connector: Connector,
+        exp_id: str,
+        max_points: Optional[int] = None,
+        method: DownsampleMethod = DownsampleMethod.LTTB,
+    ) -> List[Dict]:
+        """Get scalar metrics of an experiment, optionally downsampled.
+        Downsampled results are cached separately for each
+        combination of `max_points` and `method`.
+
+        Args:
+            connector (Connector): Experiment connector type
+            exp_id (str): Experiment ID
+            max_points (Optional[int], optional): Max points per series.
+                If None, metrics are not downsampled. Defaults to None.
+            method (DownsampleMethod, optional): Downsampling algorithm.
+                Defaults to DownsampleMethod.LTTB.
+
+        Returns:
+            List[Dict]: Plotly compatible metrics
+        """
+        metrics = await self.get_field(connector, exp_id, "metrics")
+        if max_points is None:
+            return metrics
+        _, completed = await self.get(connector, exp_id)
+        return await self._cached(
+            (connector, exp_id, "metrics", method.value, max_points),
+            lambda: downsample_plotly(metrics, max_points, method),
+            ttl=self.ttl_for("metrics", completed),
+        )
+
+    async def get_output_url(self, connector: Connector, exp_id: str) -> str:
+        """Get the web page URL of an experiment, without
+        fetching the full experiment.
+
+        Args:
+            connector (Connector): Experiment connector type
+            exp_id (str): Experiment ID
+
+        Raises:
+            ValueError: If experiment does not exist
+
+        Returns:
+            str: URL of experiment
+        """
+        urls = await self.get_output_urls(connector, [exp_id])
+        if exp_id not in urls:
+            raise ValueError(f"Experiment with ID {exp_id} not found")
+        return urls[exp_id]
+
+    async def get_output_urls(
+        self, connector: Connector, exp_ids: Iterable[str]
+    ) -> Dict[str, str]:
+        """Get the web page URLs of many experiments. Cache misses
+        are resolved with a single query to the experiment connector.
+
+        Args:
+            connector (Connector): Experiment connector type
+            exp_ids (Iterable[str]): Experiment IDs
+
+        Returns:
+            Dict[str, str]: Mapping of experiment id to URL.
+                Experiments which are not found are omitted.
+        """
+        urls = {}
+        missing = []
+        for exp_id in dict.fromkeys(exp_ids):  # dedupe, keep order
+            url = self._cache.get((connector, exp_id, "output_url"))
+            if url is None:
+                missing.append(exp_id)
+            else:
+                urls[exp_id] = url
+        if missing:
+            resolved = await self._coalescer.run(
+                (connector, "output_url", tuple(missing)),
+                lambda: asyncio.to_thread(
+                    Experiment.from_connector(connector).get_output_urls,
+                    missing,
+                ),
+            )
+            for exp_id, url in resolved.items():
+                self._cache.set(
+                    (connector, exp_id, "output_url"), url, ttl=OUTPUT_URL_TTL
+                )
+            urls.update(resolved)
+        return urls
+
+    def invalidate(self, connector: Connector, exp_id: str):
+        """Remove all cached entries of an experiment.
+        Downsampled metrics are left to expire on their own.
+
+        Args:
+            connector (Connector): Experiment connector type
+            exp_id (str): Experiment ID
+        """
+        for field in ("experiment", *EXPERIMENT_FIELDS):
+            self._cache.pop((connector, exp_id, field))
+
+
+experiment_cache = ExperimentCache(
+    ttl=config.EXPERIMENT_CACHE_TTL_SECONDS,
+    completed_ttl=config.EXPERIMENT_CACHE_COMPLETED_TTL_SECONDS,
+    field_ttls={
+        field: (config.EXPERIMENT_CACHE_TTL_SECONDS, MUTABLE_COMPLETED_TTL)
+        for field in ("experiment", "artifacts", "models", "tags")
+    },
+    maxsize=config.EXPERIMENT_CACHE_SIZE,
+)
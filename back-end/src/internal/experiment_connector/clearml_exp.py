@@ -2,14 +2,18 @@
 A interface to interact with ClearML experiments.
 """
 import json
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence
 
 from clearml import Model, Task
+from clearml.backend_api import Session
 from clearml.task import Artifact as ClearMLArtifact
 
 from ...models.model import Artifact
 from .connector import ExperimentConnector
 
+# Task statuses where the task is no longer running
+COMPLETED_STATUSES = {"completed", "closed", "published", "failed", "stopped"}
+
 
 class ClearMLExperiment(ExperimentConnector):
     def __init__(self):
@@ -51,6 +55,32 @@ class ClearMLExperiment(ExperimentConnector):
         exp.task = task
         return exp
 
+    @staticmethod
+    def get_output_urls(exp_ids: Sequence[str]) -> Dict[str, str]:
+        """Get the web page URLs of many experiments using a single
+        query, instead of fetching each task.
+
+        Args:
+            exp_ids (Sequence[str]): Ids of experiments
+
+        Returns:
+            Dict[str, str]: Mapping of experiment id to URL.
+                Experiments which are not found are omitted.
+        """
+        if not exp_ids:
+            return {}
+        tasks = Task.query_tasks(
+            additional_return_fields=["project"],
+            task_filter={"id": list(exp_ids)},
+        )
+        app_server = Session.get_app_server_host()
+        # Same as get_output_log_web_page, without the /output/log suffix
+        return {
+            task["id"]: f"{app_server}/projects/{task.get('project') or '*'}"
+            + f"/experiments/{task['id']}"
+            for task in tasks
+        }
+
     @property
     def config(self) -> Dict:
         if not self.task:
@@ -63,6 +93,12 @@ class ClearMLExperiment(ExperimentConnector):
             raise ValueError("Not currently connected to any experiments")
         return list(self.task.get_tags())
 
+    @property
+    def completed(self) -> bool:
+        if not self.task:
+            raise ValueError("Not currently connected to any experiments")
+        return str(self.task.status) in COMPLETED_STATUSES
+
     @property
     def metrics(self) -> List[Dict]:
         if not self.task:
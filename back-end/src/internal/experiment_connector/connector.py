@@ -1,7 +1,7 @@
 """Provides a base class for all experiment connectors to inherit from.""" ""
 from abc import ABC, abstractmethod
 from logging import Logger
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence
 
 from ...models.model import Artifact
 
@@ -46,6 +46,17 @@ class ExperimentConnector(ABC):
         """
         raise NotImplementedError
 
+    @property
+    def completed(self) -> bool:
+        """Returns if experiment has finished running,
+        meaning its metrics, plots and artifacts will
+        no longer change.
+
+        Returns:
+            bool: True if experiment has finished running
+        """
+        return False
+
     @property
     @abstractmethod
     def artifacts(self) -> Dict[str, Artifact]:
@@ -114,6 +125,25 @@ class ExperimentConnector(ABC):
         """
         raise NotImplementedError
 
+    @staticmethod
+    @abstractmethod
+    def get_output_urls(exp_ids: Sequence[str]) -> Dict[str, str]:
+        """Get the web page URLs of many experiments, without
+        fetching the full experiments.
+
+        Args:
+            exp_ids (Sequence[str]): Ids of experiments
+
+        Raises:
+            NotImplementedError: If experiment connector
+                does not implement this method.
+
+        Returns:
+            Dict[str, str]: Mapping of experiment id to URL.
+                Experiments which are not found are omitted.
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def delete(self) -> bool:
         """Delete the experiment.
@@ -1,5 +1,6 @@
 """This module contains background tasks to be run by FastAPI's BackgroundTasks."""
 from .clean_orphaned_media import delete_orphan_images
 from .clean_orphaned_services import delete_orphan_services
+from .clean_stale_uploads import abort_stale_uploads
 from .model_exporter import export_selected_models
 from .init_db import init_db
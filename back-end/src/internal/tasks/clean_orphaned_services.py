@@ -4,8 +4,10 @@ from kubernetes.client.rest import ApiException
 
 from ...config.config import config
 from ...models.engine import ServiceBackend
+from ..autoscaling import delete_hpa, delete_wake_mapping
 from ..dependencies.k8s_client import get_k8s_client
 from ..dependencies.mongo_client import get_db
+from ..warm_pool import WARM_POOL_COLLECTION
 
 
 async def delete_orphan_services():
@@ -76,6 +78,10 @@ async def delete_orphan_services():
             )  # include only service names
         ).to_list(length=None)
         used_services = [x["inferenceServiceName"] for x in model_services]
+        # Warm engines are waiting to be handed out, so are not orphans
+        used_services.extend(
+            await db[WARM_POOL_COLLECTION].distinct("serviceName")
+        )
 
         # Do a set difference to find services that are orphaned
         orphaned_services = set(service_names) - set(used_services)
@@ -167,4 +173,6 @@ async def delete_orphan_services():
                             )
                         else:
                             raise err
+                    delete_hpa(client, service_name)
+                    delete_wake_mapping(client, service_name)
                 await db["services"].delete_one({"serviceName": service_name})
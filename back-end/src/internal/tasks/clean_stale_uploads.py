@@ -0,0 +1,39 @@
+"""Task to abort resumable uploads which were never completed."""
+import datetime
+
+from ...config.config import config
+from ..dependencies.minio_client import (
+    abort_multipart_upload,
+    minio_api_client,
+)
+from ..dependencies.mongo_client import get_db
+
+
+async def abort_stale_uploads():
+    """Abort uploads that were started more than `UPLOAD_EXPIRY_HOURS`
+    ago and not completed, removing their parts from the bucket."""
+    db, _ = get_db()
+    s3_client = await minio_api_client()
+    cutoff = datetime.datetime.now() - datetime.timedelta(
+        hours=config.UPLOAD_EXPIRY_HOURS
+    )
+    # Created times are saved as strings, which sort chronologically
+    uploads = await (
+        db["uploads"].find(
+            {"completed": False, "created": {"$lt": str(cutoff)}}
+        )
+    ).to_list(length=None)
+    for upload in uploads:
+        try:
+            await abort_multipart_upload(
+                s3_client,
+                upload["objectName"],
+                upload["bucketName"],
+                upload["uploadId"],
+            )
+        except Exception as err:
+            # Parts may already be gone, still forget the upload
+            print(f"WARN: Could not abort upload {upload['uploadId']}: {err}")
+        await db["uploads"].delete_one({"uploadId": upload["uploadId"]})
+    if uploads:
+        print(f"INFO: Aborted {len(uploads)} stale uploads")
@@ -16,6 +16,8 @@ async def init_db():
         [("modelId", 1), ("creatorUserId", 1)], unique=True
     )
     db["services"].create_index([("serviceName", 1)], unique=True)
+    db["uploads"].create_index([("uploadId", 1)], unique=True)
+    db["warmEngines"].create_index([("serviceName", 1)], unique=True)
     if config.FIRST_SUPERUSER_ID and config.FIRST_SUPERUSER_PASSWORD:
         print("Creating root user...")
         try:
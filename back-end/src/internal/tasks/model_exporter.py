@@ -1,5 +1,7 @@
 import datetime
 import json
+from typing import Dict, List, Tuple
+
 from colorama import Fore
 from fastapi import Depends
 
@@ -10,6 +12,7 @@ from ..dependencies.minio_client import (
     compose_data,
     get_data,
 )
+from ..experiment_connector.cache import experiment_cache
 
 from ...config.config import config
 from ...internal.preprocess_html import process_html_to_base64
@@ -18,6 +21,37 @@ from ...models.iam import TokenData
 from ...models.model import ModelCardPackage
 
 
+async def resolve_output_urls(cards: List[Dict]) -> Dict[Tuple[str, str], str]:
+    """Resolve the output URLs of experiments linked to many model cards,
+    using one query per experiment connector instead of one per card.
+
+    Args:
+        cards (List[Dict]): Model cards
+
+    Returns:
+        Dict[Tuple[str, str], str]: Mapping of (connector, experiment id) to URL
+    """
+    exp_ids: Dict[str, List[str]] = {}
+    for card in cards:
+        experiment = card.get("experiment") or {}
+        if experiment.get("connector") and experiment.get("experimentId"):
+            exp_ids.setdefault(experiment["connector"], []).append(
+                experiment["experimentId"]
+            )
+    output_urls = {}
+    for connector, ids in exp_ids.items():
+        try:
+            urls = await experiment_cache.get_output_urls(connector, ids)
+        except Exception as err:
+            print(
+                f"{Fore.YELLOW}WARNING{Fore.WHITE}:  Could not resolve {connector} experiment URLs: {err}"
+            )
+            continue
+        for exp_id, url in urls.items():
+            output_urls[(connector, exp_id)] = url
+    return output_urls
+
+
 async def export_selected_models(
     card_package: ModelCardPackage,
     user: TokenData,
@@ -38,6 +72,25 @@ async def export_selected_models(
             )
             return
         else:
+            # Resolve linked experiment URLs for all cards in one go
+            output_urls = {}
+            if len(pkg) > 0:
+                output_urls = await resolve_output_urls(
+                    await db["models"]
+                    .find(
+                        {
+                            "$or": [
+                                {
+                                    "modelId": x["model_id"],
+                                    "creatorUserId": x["creator_user_id"],
+                                }
+                                for x in pkg
+                            ]
+                        },
+                        {"experiment": 1},
+                    )
+                    .to_list(length=None)
+                )
             async with await mongo_client.start_session() as session:
                 async with session.start_transaction():
                     await db["exports"].insert_one(
@@ -57,6 +110,15 @@ async def export_selected_models(
                                 }
                             )
 
+                            experiment = existing_card.get("experiment") or {}
+                            output_url = output_urls.get(
+                                (
+                                    experiment.get("connector"),
+                                    experiment.get("experimentId"),
+                                )
+                            )
+                            if output_url is not None:
+                                experiment["outputUrl"] = output_url
                             existing_card["markdown"] = await process_html_to_base64(
                                 existing_card["markdown"]
                             )
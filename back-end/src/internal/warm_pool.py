@@ -0,0 +1,501 @@
+"""Warm pool of pre-started inference engines.
+
+Creating a preview engine has to schedule a pod, pull the image and
+load the model before the preview is usable. When enabled, a few
+engines are kept running for frequently used images, and handed out
+to new previews instead of starting an engine from scratch. Handed out
+engines are replaced in the background.
+
+Only previews with the default pod spec (no environment variables,
+resource limits, etc.) get a warm engine, as changing the pod spec of
+a running engine starts a new pod, which is as slow as a cold start.
+
+State is kept in MongoDB, so that every worker of the app shares the
+same pool.
+"""
+import asyncio
+import datetime
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import uuid4
+
+from kubernetes.client import ApiClient, AppsV1Api, CoreV1Api, CustomObjectsApi
+from kubernetes.client.rest import ApiException as K8sAPIException
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+from yaml import safe_load
+
+from ..config.config import config
+from ..models.engine import (
+    AutoscalingPolicy,
+    CreateInferenceEngineService,
+    ServiceBackend,
+)
+from .dependencies.k8s_client import get_k8s_client
+from .dependencies.mongo_client import get_db
+from .templates import template_env
+from .utils import k8s_safe_name
+
+WARM_POOL_COLLECTION = "warmEngines"
+WARM_POOL_STATS_ID = "warmPool"
+# Only one worker replenishes the pool at a time
+REPLENISH_LEASE_SECONDS = 120
+# Keeps Knative from scaling warm engines to zero while in the pool
+WARM_ENGINE_POLICY = AutoscalingPolicy(min_replicas=1, max_replicas=1)
+
+
+def select_pool_images(
+    configured: Iterable[str], used: Iterable[str], top_n: int
+) -> List[str]:
+    """Choose the images to keep warm engines for.
+
+    Args:
+        configured (Iterable[str]): Images set in the config
+        used (Iterable[str]): Image of every existing service
+        top_n (int): Number of most used images to add
+
+    Returns:
+        List[str]: Images, without duplicates
+    """
+    images = list(dict.fromkeys(configured))
+    popular = [
+        image
+        for image, _ in Counter(used).most_common()
+        if image not in images
+    ]
+    return images + popular[:top_n]
+
+
+def render_engine(
+    engine_name: str,
+    image_uri: str,
+    port: Optional[int],
+    env: Optional[Dict[str, str]],
+    num_gpus: float,
+    backend: ServiceBackend,
+) -> Dict[str, Dict]:
+    """Render the K8S manifests of a warm inference engine,
+    which always has one replica.
+
+    Args:
+        engine_name (str): Name of the engine
+        image_uri (str): Image of the engine
+        port (Optional[int]): Container port, defaults to 8080 if None
+        env (Optional[Dict[str, str]]): Environment variables
+        num_gpus (float): Number of GPUs
+        backend (ServiceBackend): Service backend
+
+    Raises:
+        NotImplementedError: If the backend is not supported
+
+    Returns:
+        Dict[str, Dict]: Manifest of each resource
+    """
+    values = {
+        "engine_name": engine_name,
+        "image_name": image_uri,
+        "port": port,
+        "env": env,
+        "num_gpus": num_gpus,
+        "autoscaling": WARM_ENGINE_POLICY,
+    }
+    if backend == ServiceBackend.KNATIVE:
+        template = template_env.get_template(
+            "knative/inference-engine-knative-service.yaml.j2"
+        )
+        return {"service": safe_load(template.render(values))}
+    if backend == ServiceBackend.EMISSARY:
+        return {
+            name: safe_load(
+                template_env.get_template(f"ambassador/{path}").render(values)
+            )
+            for name, path in (
+                ("service", "inference-engine-service.yaml.j2"),
+                ("deployment", "inference-engine-deployment.yaml.j2"),
+                ("mapping", "ambassador-mapping.yaml.j2"),
+            )
+        }
+    raise NotImplementedError(f"Backend type {backend} not implemented.")
+
+
+def create_engine(
+    client: ApiClient, manifests: Dict[str, Dict], backend: ServiceBackend
+):
+    """Create the K8S resources of an inference engine.
+
+    Args:
+        client (ApiClient): K8S client
+        manifests (Dict[str, Dict]): Manifests from `render_engine`
+        backend (ServiceBackend): Service backend
+    """
+    custom_api = CustomObjectsApi(client)
+    if backend == ServiceBackend.KNATIVE:
+        custom_api.create_namespaced_custom_object(
+            group="serving.knative.dev",
+            version="v1",
+            namespace=config.IE_NAMESPACE,
+            plural="services",
+            body=manifests["service"],
+        )
+    elif backend == ServiceBackend.EMISSARY:
+        AppsV1Api(client).create_namespaced_deployment(
+            namespace=config.IE_NAMESPACE, body=manifests["deployment"]
+        )
+        CoreV1Api(client).create_namespaced_service(
+            namespace=config.IE_NAMESPACE, body=manifests["service"]
+        )
+        custom_api.create_namespaced_custom_object(
+            group="getambassador.io",
+            version="v2",
+            namespace=config.IE_NAMESPACE,
+            plural="mappings",
+            body=manifests["mapping"],
+        )
+
+
+def release_engine(
+    client: ApiClient, engine_name: str, backend: ServiceBackend
+):
+    """Let a handed out engine scale like any service without
+    an autoscaling policy, instead of always having one replica.
+
+    For Knative this creates a new revision, but traffic stays on the
+    warm one until the new revision is ready.
+
+    Args:
+        client (ApiClient): K8S client
+        engine_name (str): Name of the engine
+        backend (ServiceBackend): Service backend
+    """
+    if backend != ServiceBackend.KNATIVE:
+        return  # the deployment already has the default replicas
+    prefix = "/spec/template/metadata/annotations/autoscaling.knative.dev~1"
+    CustomObjectsApi(client).patch_namespaced_custom_object(
+        group="serving.knative.dev",
+        version="v1",
+        plural="services",
+        namespace=config.IE_NAMESPACE,
+        name=engine_name,
+        body=[
+            {"op": "remove", "path": prefix + "min-scale"},
+            {"op": "remove", "path": prefix + "max-scale"},
+        ],
+    )
+
+
+def delete_engine(
+    client: ApiClient, engine_name: str, backend: ServiceBackend
+):
+    """Delete the K8S resources of an inference engine,
+    ignoring those that do not exist.
+
+    Args:
+        client (ApiClient): K8S client
+        engine_name (str): Name of the engine
+        backend (ServiceBackend): Service backend
+    """
+    custom_api = CustomObjectsApi(client)
+    if backend == ServiceBackend.KNATIVE:
+        deletes = [
+            lambda: custom_api.delete_namespaced_custom_object(
+                group="serving.knative.dev",
+                version="v1",
+                plural="services",
+                namespace=config.IE_NAMESPACE,
+                name=engine_name,
+            )
+        ]
+    else:
+        deletes = [
+            lambda: CoreV1Api(client).delete_namespaced_service(
+                namespace=config.IE_NAMESPACE, name=engine_name
+            ),
+            lambda: AppsV1Api(client).delete_namespaced_deployment(
+                namespace=config.IE_NAMESPACE,
+                name=engine_name + "-deployment",
+            ),
+            lambda: custom_api.delete_namespaced_custom_object(
+                group="getambassador.io",
+                version="v2",
+                plural="mappings",
+                namespace=config.IE_NAMESPACE,
+                name=engine_name + "-ingress",
+            ),
+        ]
+    for delete in deletes:
+        try:
+            delete()
+        except K8sAPIException as err:
+            if err.status != 404:
+                raise err
+
+
+def is_engine_ready(
+    client: ApiClient, engine_name: str, backend: ServiceBackend
+) -> bool:
+    """Check if an inference engine is ready to serve requests.
+
+    Args:
+        client (ApiClient): K8S client
+        engine_name (str): Name of the engine
+        backend (ServiceBackend): Service backend
+
+    Returns:
+        bool: If ready
+    """
+    if backend == ServiceBackend.KNATIVE:
+        result = CustomObjectsApi(client).get_namespaced_custom_object(
+            group="serving.knative.dev",
+            version="v1",
+            namespace=config.IE_NAMESPACE,
+            plural="services",
+            name=engine_name,
+        )
+        conditions = result.get("status", {}).get("conditions", [])
+        return len(conditions) > 0 and all(
+            condition["status"] == "True" for condition in conditions
+        )
+    result = AppsV1Api(client).read_namespaced_deployment_status(
+        name=engine_name + "-deployment", namespace=config.IE_NAMESPACE
+    )
+    return bool(result.status.ready_replicas)
+
+
+async def claim_warm_engine(
+    db: AsyncIOMotorDatabase,
+    client: ApiClient,
+    service: CreateInferenceEngineService,
+    backend: ServiceBackend,
+) -> Optional[str]:
+    """Take a warm engine matching a new service out of the pool.
+
+    Ready engines are handed out first. The service must have the
+    default pod spec of a warm engine (e.g no environment variables).
+
+    Args:
+        db (AsyncIOMotorDatabase): MongoDB database
+        client (ApiClient): K8S client
+        service (CreateInferenceEngineService): Service to create
+        backend (ServiceBackend): Service backend
+
+    Returns:
+        Optional[str]: Name of the engine, or None if none match
+    """
+    # Atomic, so that an engine is never handed out twice
+    engine = await db[WARM_POOL_COLLECTION].find_one_and_delete(
+        {
+            "imageUri": service.image_uri,
+            "containerPort": service.container_port,
+            "numGpus": service.num_gpus,
+            "backend": backend,
+            # Its resources are still being created
+            "starting": {"$ne": True},
+        },
+        sort=[("ready", -1), ("created", 1)],
+    )
+    if engine is None:
+        await _record_stats(db, misses=1)
+        return None
+    engine_name = engine["serviceName"]
+    release_engine(client, engine_name, backend)
+    # Time to ready that the new service did not have to wait for
+    if engine.get("ready"):
+        seconds_saved = engine["readySeconds"]
+    else:
+        seconds_saved = (
+            datetime.datetime.now() - engine["created"]
+        ).total_seconds()
+    await _record_stats(db, claims=1, secondsSaved=seconds_saved)
+    print(
+        f"INFO: Handed out warm engine {engine_name}, "
+        + f"saving {seconds_saved:.0f}s of startup"
+    )
+    return engine_name
+
+
+async def _record_stats(db: AsyncIOMotorDatabase, **increments: float):
+    await db["stats"].update_one(
+        {"_id": WARM_POOL_STATS_ID}, {"$inc": increments}, upsert=True
+    )
+
+
+async def get_warm_pool_stats(db: AsyncIOMotorDatabase) -> Dict:
+    """Get the engines in the pool, and how much time they saved.
+
+    Args:
+        db (AsyncIOMotorDatabase): MongoDB database
+
+    Returns:
+        Dict: Pool size, engines, claims, misses and seconds saved
+    """
+    stats = await db["stats"].find_one({"_id": WARM_POOL_STATS_ID}) or {}
+    engines = (
+        await db[WARM_POOL_COLLECTION]
+        .find({}, {"_id": 0})
+        .to_list(length=None)
+    )
+    claims = stats.get("claims", 0)
+    seconds_saved = stats.get("secondsSaved", 0)
+    return {
+        "poolSize": config.IE_WARM_POOL_SIZE,
+        "engines": engines,
+        "claims": claims,
+        "misses": stats.get("misses", 0),
+        "secondsSaved": seconds_saved,
+        "averageSecondsSaved": seconds_saved / claims if claims else 0,
+    }
+
+
+async def _acquire_lease(db: AsyncIOMotorDatabase) -> bool:
+    now = datetime.datetime.now()
+    try:
+        # Fails with a duplicate key if another worker holds the lease
+        await db["locks"].update_one(
+            {"_id": "warmPoolReplenish", "expires": {"$lt": now}},
+            {
+                "$set": {
+                    "expires": now
+                    + datetime.timedelta(seconds=REPLENISH_LEASE_SECONDS)
+                }
+            },
+            upsert=True,
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+async def replenish_warm_pool():
+    """Start warm engines until each pool image has
+    `IE_WARM_POOL_SIZE` of them, and track when they become ready.
+    Engines of images no longer in the pool are removed."""
+    db, _ = get_db()
+    if not await _acquire_lease(db):
+        return
+    try:
+        await _replenish(db)
+    finally:
+        # Let the next run start right away
+        await db["locks"].delete_one({"_id": "warmPoolReplenish"})
+
+
+async def _replenish(db: AsyncIOMotorDatabase):
+    backend = config.IE_SERVICE_TYPE
+    used = []
+    if config.IE_WARM_POOL_TOP_IMAGES > 0:
+        used = [
+            service["imageUri"]
+            for service in await db["services"]
+            .find({}, {"imageUri": 1})
+            .to_list(length=None)
+        ]
+    images = []
+    if config.IE_WARM_POOL_SIZE > 0:
+        images = select_pool_images(
+            config.IE_WARM_POOL_IMAGES, used, config.IE_WARM_POOL_TOP_IMAGES
+        )
+    engines = await db[WARM_POOL_COLLECTION].find().to_list(length=None)
+    counts: Dict[Tuple[str, str], int] = Counter()
+    now = datetime.datetime.now()
+    with get_k8s_client() as client:
+        for engine in engines:
+            engine_name = engine["serviceName"]
+            key = (engine["imageUri"], engine["backend"])
+            # Left behind by a worker which stopped while creating it
+            abandoned = (
+                engine.get("starting")
+                and (now - engine["created"]).total_seconds()
+                > REPLENISH_LEASE_SECONDS
+            )
+            if (
+                abandoned
+                or engine["imageUri"] not in images
+                or engine["backend"] != backend
+                or counts[key] >= config.IE_WARM_POOL_SIZE
+            ):
+                # Only delete it if it was not handed out meanwhile
+                result = await db[WARM_POOL_COLLECTION].delete_one(
+                    {"serviceName": engine_name}
+                )
+                if result.deleted_count == 1:
+                    print(f"INFO: Removing warm engine {engine_name}")
+                    delete_engine(client, engine_name, engine["backend"])
+                continue
+            counts[key] += 1
+            if engine.get("ready") or engine.get("starting"):
+                continue
+            try:
+                ready = is_engine_ready(client, engine_name, backend)
+            except K8sAPIException as err:
+                print(f"WARN: Could not get status of {engine_name}: {err}")
+                continue
+            if ready:
+                ready_seconds = (
+                    datetime.datetime.now() - engine["created"]
+                ).total_seconds()
+                await db[WARM_POOL_COLLECTION].update_one(
+                    {"serviceName": engine_name},
+                    {"$set": {"ready": True, "readySeconds": ready_seconds}},
+                )
+        for image in images:
+            for _ in range(
+                config.IE_WARM_POOL_SIZE - counts[(image, backend)]
+            ):
+                engine_name = k8s_safe_name(f"warm-{uuid4()}"[:22])
+                # Recorded first, so that its resources are never left
+                # running without being tracked by the pool
+                await db[WARM_POOL_COLLECTION].insert_one(
+                    {
+                        "serviceName": engine_name,
+                        "imageUri": image,
+                        # Only matches previews using the defaults
+                        "containerPort": None,
+                        "numGpus": 0,
+                        "backend": backend,
+                        "created": datetime.datetime.now(),
+                        "ready": False,
+                        "starting": True,
+                    }
+                )
+                try:
+                    create_engine(
+                        client,
+                        render_engine(
+                            engine_name, image, None, None, 0, backend
+                        ),
+                        backend,
+                    )
+                except K8sAPIException as err:
+                    print(f"ERROR: Failed to start warm engine: {err}")
+                    await db[WARM_POOL_COLLECTION].delete_one(
+                        {"serviceName": engine_name}
+                    )
+                    # Remove any resources created before the failure
+                    delete_engine(client, engine_name, backend)
+                    break
+                await db[WARM_POOL_COLLECTION].update_one(
+                    {"serviceName": engine_name},
+                    {"$unset": {"starting": ""}},
+                )
+                print(f"INFO: Started warm engine {engine_name} for {image}")
+
+
+# Reference to the background task, so it is not garbage collected
+_warm_pool_task: Optional[asyncio.Task] = None
+
+
+async def start_warm_pool():
+    """Start replenishing the warm pool in the background, if enabled."""
+    global _warm_pool_task
+    if config.IE_WARM_POOL_SIZE > 0 and _warm_pool_task is None:
+        _warm_pool_task = asyncio.create_task(run_warm_pool())
+
+
+async def run_warm_pool():
+    """Replenish the warm pool periodically, while the app runs."""
+    while True:
+        try:
+            await replenish_warm_pool()
+        except Exception as err:  # keep the loop alive
+            print(f"ERROR: Failed to replenish warm pool: {err}")
+        await asyncio.sleep(config.IE_WARM_POOL_REFRESH_SECONDS)
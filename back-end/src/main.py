@@ -13,8 +13,10 @@ from fastapi.staticfiles import StaticFiles
 
 from .config.config import config
 from .internal.auth import check_is_admin, get_current_user
+from .internal.autoscaling import start_idle_reaper
 from .internal.tasks import init_db
-from .routers import auth, buckets, datasets, engines, experiments, iam, models, exports
+from .internal.warm_pool import start_warm_pool
+from .routers import auth, buckets, datasets, engines, experiments, iam, models, exports, wake
 
 with open(
     Path(__file__).parent.parent.joinpath("README.md"), "r", encoding="utf-8"
@@ -59,7 +61,7 @@ fastapi_app = FastAPI(
     title="Model Zoo",
     description=description,
     openapi_tags=tags_metadata,
-    on_startup=[init_db],
+    on_startup=[init_db, start_warm_pool, start_idle_reaper],
     docs_url=None,
     redoc_url=None,
 )
@@ -109,6 +111,8 @@ app.app.include_router(exports.router, dependencies=[Depends(check_is_admin)])
 app.app.include_router(datasets.router, dependencies=[Depends(get_current_user)])
 app.app.include_router(iam.router, dependencies=[Depends(check_is_admin)])
 app.app.include_router(engines.router, dependencies=[Depends(get_current_user)])
+# Requests to idle engines, which are not authenticated by the back-end
+app.app.include_router(wake.router)
 
 
 @app.app.get("/")
@@ -1,5 +1,8 @@
 """Data models for bucket endpoints."""
-from pydantic import BaseModel, validator
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, root_validator, validator
 
 
 class VideoUploadResponse(BaseModel):
@@ -13,3 +16,78 @@ class VideoUploadResponse(BaseModel):
         if not value.startswith("s3://"):
             raise ValueError("Video location must point to an S3 bucket.")
         return value
+
+
+class UploadPurpose(str, Enum):
+    """What a resumable upload will be used for."""
+
+    VIDEO = "video"
+    DATASET = "dataset"
+
+
+class InitUploadRequest(BaseModel):
+    """Request model for starting a resumable upload."""
+
+    filename: str
+    content_type: str = "application/octet-stream"
+    purpose: UploadPurpose
+    size: Optional[int] = Field(default=None, ge=0)
+
+    @root_validator(skip_on_failure=True)
+    def check_size(cls, values):
+        """Require the size of datasets, which it is limited by."""
+        if (
+            values.get("purpose") == UploadPurpose.DATASET
+            and values.get("size") is None
+        ):
+            raise ValueError("Size of the dataset must be given")
+        return values
+
+
+class InitUploadResponse(BaseModel):
+    """Response model for starting a resumable upload."""
+
+    upload_id: str
+    object_name: str
+    part_size: int
+    max_parts: int
+
+
+class UploadedPart(BaseModel):
+    """A part of a resumable upload that has been uploaded."""
+
+    part_number: int = Field(..., ge=1, le=10000)
+    etag: str
+    size: Optional[int] = None
+
+
+class UploadStatusResponse(BaseModel):
+    """Response model for checking which parts have been uploaded,
+    so that an interrupted upload can be resumed."""
+
+    upload_id: str
+    purpose: UploadPurpose
+    part_size: int
+    completed: bool = False
+    parts: List[UploadedPart] = []
+
+
+class CompleteUploadRequest(BaseModel):
+    """Request model for completing a resumable upload.
+    If parts are not given, all uploaded parts are used."""
+
+    parts: Optional[List[UploadedPart]] = None
+
+
+class CompleteUploadResponse(BaseModel):
+    """Response model for completing a resumable upload."""
+
+    upload_id: str
+    location: str
+
+    @validator("location")
+    def validate_location(cls, value):
+        """Validate upload location."""
+        if not value.startswith("s3://"):
+            raise ValueError("Upload location must point to an S3 bucket.")
+        return value
@@ -1,32 +1,30 @@
 """Data models for inference engine services."""
 from __future__ import annotations
 
+import math
 from datetime import datetime
 from enum import Enum
 from typing import Dict, Optional
 
 from bson import ObjectId
-from pydantic import BaseModel, Field, PositiveInt, constr, validator
+from pydantic import (
+    BaseModel,
+    Field,
+    PositiveInt,
+    constr,
+    root_validator,
+    validator,
+)
 
 from ..internal.utils import sanitize_for_url, to_camel_case
 from .common import PyObjectId
 
-# NOTE: disabled ability to set resource limits
-# TODO: Improve implementation of resource limits
-# class ResourceLimits(BaseModel):
-#     cpu_cores: float = Field(
-#         default=1, gt=0, lt=16, description="CPU cores (0.5, 1, 2, 4, 8, 16)"
-#     )
-#     memory_gb: int = Field(
-#         default=2,
-#         gt=0,
-#         lt=32,
-#         description="Memory in GB (1, 2, 4, 8, 16, 32)",
-#     )
-
 IMAGE_URI_REGEX = "^(?:(?=[^:\/]{1,253})(?!-)[a-zA-Z0-9-]{1,63}(?<!-)(?:\.(?!-)[a-zA-Z0-9-]{1,63}(?<!-))*(?::[0-9]{1,5})?/)?((?![._-])(?:[a-z0-9._-]*)(?<![._-])(?:/(?![._-])[a-z0-9._-]*(?<![._-]))*)(?::(?![.-])[a-zA-Z0-9_.-]{1,128})?$"
 
 ContainerURI = constr(regex=IMAGE_URI_REGEX)
+ProbePath = constr(regex=r"^/[\w\-./]*$")
+
+MAX_REPLICAS = 3  # same cap as manually scaling a service
 
 
 class ServiceBackend(str, Enum):
@@ -63,16 +61,178 @@ class InferenceServiceStatus(BaseModel):
         alias_generator = to_camel_case
 
 
+class ResourceLimits(BaseModel):
+    """CPU and memory of an inference engine.
+
+    The pod is scheduled with `cpu_cores` and `memory_gb`, and may use
+    up to the max values if set. If `guaranteed`, the limits are set to
+    the requests instead, giving the pod Guaranteed QoS. With a whole
+    number of CPU cores, nodes using the static CPU manager policy then
+    pin the pod to dedicated cores.
+    """
+
+    cpu_cores: float = Field(
+        default=1, gt=0, le=16, description="CPU cores (0.5, 1, 2, 4, 8, 16)"
+    )
+    memory_gb: float = Field(
+        default=2,
+        gt=0,
+        le=32,
+        description="Memory in GB (1, 2, 4, 8, 16, 32)",
+    )
+    max_cpu_cores: Optional[float] = Field(default=None, gt=0, le=16)
+    max_memory_gb: Optional[float] = Field(default=None, gt=0, le=32)
+    guaranteed: bool = False
+
+    @root_validator(skip_on_failure=True)
+    def check_limits(cls, values: Dict) -> Dict:
+        """Checks that the limits are not below the requests.
+
+        Args:
+            values (Dict): Field values
+
+        Raises:
+            ValueError: If a max value is less than its request
+
+        Returns:
+            Dict: Field values
+        """
+        for request, limit in (
+            ("cpu_cores", "max_cpu_cores"),
+            ("memory_gb", "max_memory_gb"),
+        ):
+            if values[limit] is not None and values[limit] < values[request]:
+                raise ValueError(
+                    f"{to_camel_case(limit)} must be at least "
+                    + to_camel_case(request)
+                )
+        return values
+
+    @property
+    def cpu_limit(self) -> Optional[float]:
+        """CPU limit of the pod, if any."""
+        return self.cpu_cores if self.guaranteed else self.max_cpu_cores
+
+    @property
+    def memory_limit(self) -> Optional[float]:
+        """Memory limit of the pod in GB, if any."""
+        return self.memory_gb if self.guaranteed else self.max_memory_gb
+
+    @property
+    def num_threads(self) -> int:
+        """Threads math libraries (OpenMP, MKL, ...) should use, as they
+        otherwise start one per core of the node, not of the pod."""
+        return max(math.ceil(self.cpu_limit or self.cpu_cores), 1)
+
+    class Config:
+        """Pydantic config to allow creation of data model
+        from a JSON object with camelCase keys.
+        """
+
+        allow_population_by_field_name = True
+        alias_generator = to_camel_case
+
+
+class AutoscalingPolicy(BaseModel):
+    """Autoscaling policy of an inference engine service.
+
+    For the Emissary backend, a HorizontalPodAutoscaler scales between
+    `min_replicas` (at least 1) and `max_replicas`, and the service is
+    scaled to zero after serving no requests for `idle_timeout_seconds`.
+    It is woken up again by the next request to the service, or when its
+    status is requested. For Knative, the policy is set as autoscaling
+    annotations.
+    """
+
+    min_replicas: int = Field(default=1, ge=0, le=MAX_REPLICAS)
+    max_replicas: int = Field(default=1, ge=1, le=MAX_REPLICAS)
+    target_cpu_utilization: Optional[int] = Field(
+        default=None, gt=0, le=100, description="Average CPU usage in %"
+    )
+    target_requests_per_second: Optional[float] = Field(
+        default=None, gt=0, description="Average requests/s per replica"
+    )
+    idle_timeout_seconds: Optional[PositiveInt] = Field(
+        default=None, description="Scale to zero after being idle this long"
+    )
+
+    @root_validator(skip_on_failure=True)
+    def check_replicas(cls, values: Dict) -> Dict:
+        """Checks that the replica range is not empty.
+
+        Args:
+            values (Dict): Field values
+
+        Raises:
+            ValueError: If max_replicas is less than min_replicas
+
+        Returns:
+            Dict: Field values
+        """
+        if values["max_replicas"] < values["min_replicas"]:
+            raise ValueError("maxReplicas must be at least minReplicas")
+        return values
+
+    @property
+    def scales_on_cpu(self) -> bool:
+        """If replicas are scaled on CPU utilization, which is relative
+        to the CPU request of the pod. This is the default of the HPA
+        of Emissary engines."""
+        if self.max_replicas <= max(self.min_replicas, 1):
+            return False
+        return bool(
+            self.target_cpu_utilization or not self.target_requests_per_second
+        )
+
+    class Config:
+        """Pydantic config to allow creation of data model
+        from a JSON object with camelCase keys.
+        """
+
+        allow_population_by_field_name = True
+        alias_generator = to_camel_case
+
+
+def require_cpu_request(values: Dict) -> Dict:
+    """Checks that an engine scaled on CPU utilization requests CPU, as
+    the utilization cannot be computed otherwise and it never scales.
+
+    Args:
+        values (Dict): Field values
+
+    Raises:
+        ValueError: If autoscaling uses CPU without resource limits
+
+    Returns:
+        Dict: Field values
+    """
+    autoscaling: Optional[AutoscalingPolicy] = values.get("autoscaling")
+    if (
+        autoscaling is not None
+        and autoscaling.scales_on_cpu
+        and values.get("resource_limits") is None
+    ):
+        raise ValueError(
+            "resourceLimits must be set to autoscale on CPU utilization, "
+            + "else set targetRequestsPerSecond"
+        )
+    return values
+
+
 class CreateInferenceEngineService(BaseModel):
     """Request model for creating an inference engine service."""
 
     model_id: str  # NOTE: actually model title, will convert to model id in backend
     image_uri: ContainerURI
-    # resource_limits: ResourceLimits
+    resource_limits: Optional[ResourceLimits] = None
     container_port: Optional[PositiveInt] = None
     env: Optional[Dict[str, str]] = None
     # float to allow for fractional GPUs
     num_gpus: float = Field(default=0, ge=0, le=2)
+    autoscaling: Optional[AutoscalingPolicy] = None
+    # HTTP path that returns 200 once the app is ready (e.g /ready),
+    # else readiness is checked by connecting to the port
+    readiness_path: Optional[ProbePath] = None
 
     @validator("model_id")
     def sanitize_model_name(cls, v: str) -> str:
@@ -86,6 +246,11 @@ class CreateInferenceEngineService(BaseModel):
         """
         return sanitize_for_url(v)
 
+    @root_validator(skip_on_failure=True)
+    def check_cpu_request(cls, values: Dict) -> Dict:
+        """Checks that CPU is requested if autoscaling on CPU."""
+        return require_cpu_request(values)
+
     class Config:
         """Pydantic config to allow creation of data model
         from a JSON object with camelCase keys.
@@ -108,6 +273,11 @@ class InferenceEngineService(CreateInferenceEngineService):
     protocol: str = Field(default="http")
     backend: ServiceBackend
 
+    @root_validator(skip_on_failure=True)
+    def check_cpu_request(cls, values: Dict) -> Dict:
+        """Services already created are returned as they are."""
+        return values
+
     class Config:
         """Pydantic config to allow creation of data model
         from a JSON object with camelCase keys and to convert
@@ -125,9 +295,16 @@ class UpdateInferenceEngineService(BaseModel):
 
     image_uri: ContainerURI
     container_port: Optional[PositiveInt] = None
-    # resource_limits: ResourceLimits
+    resource_limits: Optional[ResourceLimits] = None
     env: Optional[dict] = None
     num_gpus: float = Field(default=0, ge=0, le=2)
+    autoscaling: Optional[AutoscalingPolicy] = None
+    readiness_path: Optional[ProbePath] = None
+
+    @root_validator(skip_on_failure=True)
+    def check_cpu_request(cls, values: Dict) -> Dict:
+        """Checks that CPU is requested if autoscaling on CPU."""
+        return require_cpu_request(values)
 
     class Config:
         """Pydantic config to allow creation of data model
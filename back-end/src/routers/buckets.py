@@ -1,20 +1,53 @@
 """Endpoints for handling object storage buckets."""
+import datetime
+import math
 import uuid
-from typing import Dict
+from typing import Dict, Optional
 
 from colorama import Fore
-from fastapi import APIRouter, Depends, Form, HTTPException, UploadFile, status
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    Form,
+    HTTPException,
+    Path,
+    Request,
+    UploadFile,
+    status,
+)
 from miniopy_async import Minio
+from miniopy_async.datatypes import Part
 
 from ..config.config import config
-from ..internal.dependencies.file_validator import ValidateFileUpload
+from ..internal.auth import get_current_user
+from ..internal.dependencies.file_validator import (
+    ValidateFileUpload,
+    clean_filename,
+)
 from ..internal.dependencies.minio_client import (
+    abort_multipart_upload,
+    complete_multipart_upload,
+    create_multipart_upload,
+    list_parts,
     minio_api_client,
     remove_data,
     upload_data,
+    upload_part,
 )
 from ..internal.dependencies.mongo_client import get_db
-from ..models.buckets import VideoUploadResponse
+from ..internal.tasks import abort_stale_uploads
+from ..models.buckets import (
+    CompleteUploadRequest,
+    CompleteUploadResponse,
+    InitUploadRequest,
+    InitUploadResponse,
+    UploadedPart,
+    UploadPurpose,
+    UploadStatusResponse,
+    VideoUploadResponse,
+)
+from ..models.iam import TokenData, UserRoles
 
 router = APIRouter(prefix="/buckets", tags=["Buckets"])
 
@@ -22,6 +55,11 @@ BUCKET_NAME = config.MINIO_BUCKET_NAME or "default"
 
 MAX_UPLOAD_SIZE_MB = 10
 BYTES_PER_MB = 1000000
+BYTES_PER_MIB = 1024 * 1024
+BYTES_PER_GB = 1024 * 1024 * 1024
+MAX_PARTS = 10000  # S3 limit on number of parts in a multipart upload
+# Same limit as the frontend's video picker
+MAX_VIDEO_SIZE = MAX_UPLOAD_SIZE_MB * BYTES_PER_MIB
 video_validator = ValidateFileUpload(
     max_upload_size=int(BYTES_PER_MB * MAX_UPLOAD_SIZE_MB),
     accepted_content_types=[
@@ -136,3 +174,419 @@ async def replace_video(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Something went wrong with the upload",
         ) from err
+
+
+async def get_upload(
+    upload_id: str, db, user: TokenData, completed: Optional[bool] = False
+) -> Dict:
+    """Get a resumable upload owned by the user
+
+    Args:
+        upload_id (str): Upload ID
+        db (AsyncIOMotorDatabase): MongoDB connection
+        user (TokenData): Current user
+        completed (Optional[bool], optional): Required completion state of
+            the upload. If None, any state is accepted. Defaults to False.
+
+    Raises:
+        HTTPException: 404 if upload does not exist
+        HTTPException: 403 if upload belongs to another user
+        HTTPException: 409 if upload is not in the required state
+
+    Returns:
+        Dict: Upload document
+    """
+    upload = await db["uploads"].find_one({"uploadId": upload_id})
+    if upload is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Upload with ID {upload_id} not found",
+        )
+    if upload["ownerId"] != user.user_id and user.role != UserRoles.admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User does not have access to this upload",
+        )
+    if completed is not None and upload["completed"] != completed:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload with ID {upload_id} is "
+            + ("not yet completed" if completed else "already completed"),
+        )
+    return upload
+
+
+def max_upload_size(purpose: UploadPurpose) -> Optional[int]:
+    """Get the largest file that can be uploaded for a purpose
+
+    Args:
+        purpose (UploadPurpose): What the file will be used for
+
+    Returns:
+        Optional[int]: Size in bytes, or None if unlimited
+    """
+    if purpose == UploadPurpose.VIDEO:
+        return MAX_VIDEO_SIZE
+    if config.MAX_UPLOAD_SIZE_GB is None:
+        return None
+    return int(config.MAX_UPLOAD_SIZE_GB * BYTES_PER_GB)
+
+
+@router.post(
+    "/uploads",
+    status_code=status.HTTP_201_CREATED,
+    response_model=InitUploadResponse,
+)
+async def init_upload(
+    item: InitUploadRequest,
+    tasks: BackgroundTasks,
+    s3_client: Minio = Depends(minio_api_client),
+    db=Depends(get_db),
+    user: TokenData = Depends(get_current_user),
+) -> Dict:
+    """Start a resumable upload. The file is then uploaded in parts
+    (which can be sent in parallel and retried individually), and
+    assembled in the bucket when the upload is completed.
+
+    Args:
+        item (InitUploadRequest): File to be uploaded
+        tasks (BackgroundTasks): Background tasks, to abort stale uploads
+        s3_client (Minio, optional): Minio client. Defaults to Depends(minio_api_client).
+        db (_type_, optional): Connection to MongoDB. Defaults to Depends(get_db).
+        user (TokenData, optional): Current user. Defaults to Depends(get_current_user).
+
+    Raises:
+        HTTPException: 413 if file is too large
+        HTTPException: 415 if video has an unsupported content type
+        HTTPException: 500 if something went wrong
+
+    Returns:
+        Dict: Upload ID and size of each part to upload
+    """
+    part_size = config.UPLOAD_PART_SIZE_MB * BYTES_PER_MIB
+    if item.purpose == UploadPurpose.VIDEO:
+        if item.content_type not in video_validator.accepted_content_types:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail=f"We accept only the following file types: {video_validator.accepted_content_types}",
+            )
+        object_name = f"videos/{uuid.uuid4().hex}.{item.content_type.replace('video/','')}"
+    else:
+        object_name = f"uploads/datasets/{uuid.uuid4().hex}/{clean_filename(item.filename)}"
+    max_size = max_upload_size(item.purpose)
+    if item.size is not None:
+        if max_size is not None and item.size > max_size:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File is too large. Max size is {max_size} bytes",
+            )
+        # Parts are checked against the declared size
+        max_size = item.size
+    if item.size is not None:
+        # Ensure file fits within the max number of parts
+        part_size = max(part_size, math.ceil(item.size / MAX_PARTS))
+    try:
+        upload_id = await create_multipart_upload(
+            s3_client, object_name, BUCKET_NAME, item.content_type
+        )
+    except Exception as err:
+        print(f"{Fore.RED}ERROR{Fore.WHITE}:\t  {err}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unable to start upload",
+        ) from err
+    db, _ = db
+    await db["uploads"].insert_one(
+        {
+            "uploadId": upload_id,
+            "objectName": object_name,
+            "bucketName": BUCKET_NAME,
+            "filename": item.filename,
+            "contentType": item.content_type,
+            "purpose": item.purpose.value,
+            "partSize": part_size,
+            "maxSize": max_size,
+            "ownerId": user.user_id,
+            "completed": False,
+            "created": str(datetime.datetime.now()),
+        }
+    )
+    tasks.add_task(abort_stale_uploads)
+    return {
+        "upload_id": upload_id,
+        "object_name": object_name,
+        "part_size": part_size,
+        "max_parts": MAX_PARTS,
+    }
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadStatusResponse)
+async def get_upload_status(
+    upload_id: str,
+    s3_client: Minio = Depends(minio_api_client),
+    db=Depends(get_db),
+    user: TokenData = Depends(get_current_user),
+) -> Dict:
+    """Get the parts that have already been uploaded,
+    so that an interrupted upload can be resumed.
+
+    Args:
+        upload_id (str): Upload ID
+        s3_client (Minio, optional): Minio client. Defaults to Depends(minio_api_client).
+        db (_type_, optional): Connection to MongoDB. Defaults to Depends(get_db).
+        user (TokenData, optional): Current user. Defaults to Depends(get_current_user).
+
+    Returns:
+        Dict: Upload status and uploaded parts
+    """
+    db, _ = db
+    upload = await get_upload(upload_id, db, user, completed=None)
+    parts = []
+    if not upload["completed"]:
+        parts = [
+            {
+                "part_number": part.part_number,
+                "etag": part.etag,
+                "size": part.size,
+            }
+            for part in await list_parts(
+                s3_client,
+                upload["objectName"],
+                upload["bucketName"],
+                upload_id,
+            )
+        ]
+    return {
+        "upload_id": upload_id,
+        "purpose": upload["purpose"],
+        "part_size": upload["partSize"],
+        "completed": upload["completed"],
+        "parts": parts,
+    }
+
+
+async def read_part(request: Request, max_size: int) -> bytes:
+    """Read the body of a part upload, without reading more than
+    the part size into memory.
+
+    Args:
+        request (Request): Request containing raw part bytes
+        max_size (int): Max size of the part
+
+    Raises:
+        HTTPException: 413 if the part is larger than max_size
+
+    Returns:
+        bytes: Part bytes
+    """
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Part is too large. Max size of this part is {max_size}",
+    )
+    # Reject before reading anything if the client says it is too large
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_size:
+        raise too_large
+    blob = bytearray()
+    async for chunk in request.stream():
+        blob.extend(chunk)
+        if len(blob) > max_size:
+            raise too_large
+    return bytes(blob)
+
+
+@router.put(
+    "/uploads/{upload_id}/parts/{part_number}",
+    response_model=UploadedPart,
+)
+async def upload_file_part(
+    upload_id: str,
+    request: Request,
+    part_number: int = Path(..., ge=1, le=MAX_PARTS),
+    s3_client: Minio = Depends(minio_api_client),
+    db=Depends(get_db),
+    user: TokenData = Depends(get_current_user),
+) -> Dict:
+    """Upload a single part of a resumable upload. The request body
+    is the raw bytes of the part. Re-uploading a part number
+    replaces the previously uploaded part.
+
+    Args:
+        upload_id (str): Upload ID
+        request (Request): Request containing raw part bytes
+        part_number (int): Part number, starting from 1
+        s3_client (Minio, optional): Minio client. Defaults to Depends(minio_api_client).
+        db (_type_, optional): Connection to MongoDB. Defaults to Depends(get_db).
+        user (TokenData, optional): Current user. Defaults to Depends(get_current_user).
+
+    Raises:
+        HTTPException: 409 if upload is already completed
+        HTTPException: 413 if part is larger than the part size,
+            or goes past the size of the file
+        HTTPException: 500 if something went wrong
+
+    Returns:
+        Dict: Part number and ETag of uploaded part
+    """
+    db, _ = db
+    upload = await get_upload(upload_id, db, user, completed=False)
+    max_part_size = upload["partSize"]
+    if upload.get("maxSize") is not None:
+        offset = (part_number - 1) * upload["partSize"]
+        if part_number > 1 and offset >= upload["maxSize"]:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Part {part_number} is past the end of the file",
+            )
+        max_part_size = min(max_part_size, upload["maxSize"] - offset)
+    blob = await read_part(request, max_part_size)
+    try:
+        etag = await upload_part(
+            s3_client,
+            blob,
+            upload["objectName"],
+            upload["bucketName"],
+            upload_id,
+            part_number,
+        )
+    except Exception as err:
+        print(f"{Fore.RED}ERROR{Fore.WHITE}:\t  {err}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Something went wrong uploading part {part_number}",
+        ) from err
+    return {"part_number": part_number, "etag": etag, "size": len(blob)}
+
+
+@router.post(
+    "/uploads/{upload_id}/complete",
+    response_model=CompleteUploadResponse,
+)
+async def complete_upload(
+    upload_id: str,
+    item: Optional[CompleteUploadRequest] = None,
+    s3_client: Minio = Depends(minio_api_client),
+    db=Depends(get_db),
+    user: TokenData = Depends(get_current_user),
+) -> Dict:
+    """Complete a resumable upload, assembling the uploaded
+    parts into a single object in the bucket.
+
+    Args:
+        upload_id (str): Upload ID
+        item (Optional[CompleteUploadRequest], optional): Parts to assemble.
+            If not given, all uploaded parts are assembled. Defaults to None.
+        s3_client (Minio, optional): Minio client. Defaults to Depends(minio_api_client).
+        db (_type_, optional): Connection to MongoDB. Defaults to Depends(get_db).
+        user (TokenData, optional): Current user. Defaults to Depends(get_current_user).
+
+    Raises:
+        HTTPException: 400 if no parts have been uploaded
+        HTTPException: 409 if upload is already completed
+        HTTPException: 413 if the parts are larger than the file, in which
+            case the upload is aborted
+        HTTPException: 500 if something went wrong
+
+    Returns:
+        Dict: Location of the assembled object in the bucket
+    """
+    db, _ = db
+    upload = await get_upload(upload_id, db, user, completed=False)
+    try:
+        # Sizes come from the bucket, not from the client
+        uploaded = await list_parts(
+            s3_client,
+            upload["objectName"],
+            upload["bucketName"],
+            upload_id,
+        )
+        if item is not None and item.parts:
+            parts = [
+                Part(part.part_number, part.etag)
+                for part in sorted(item.parts, key=lambda x: x.part_number)
+            ]
+        else:
+            parts = uploaded
+        if len(parts) == 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No parts have been uploaded",
+            )
+        sizes = {part.part_number: part.size for part in uploaded}
+        total_size = sum(sizes.get(part.part_number, 0) for part in parts)
+        if (
+            upload.get("maxSize") is not None
+            and total_size > upload["maxSize"]
+        ):
+            await abort_multipart_upload(
+                s3_client,
+                upload["objectName"],
+                upload["bucketName"],
+                upload_id,
+            )
+            await db["uploads"].delete_one({"uploadId": upload_id})
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Upload is too large. Max size is {upload['maxSize']} bytes",
+            )
+        location = await complete_multipart_upload(
+            s3_client,
+            parts,
+            upload["objectName"],
+            upload["bucketName"],
+            upload_id,
+        )
+    except HTTPException as err:
+        raise err
+    except Exception as err:
+        print(f"{Fore.RED}ERROR{Fore.WHITE}:\t  {err}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Something went wrong completing the upload",
+        ) from err
+    await db["uploads"].update_one(
+        {"uploadId": upload_id},
+        {
+            "$set": {
+                "completed": True,
+                "location": location,
+                "lastModified": str(datetime.datetime.now()),
+            }
+        },
+    )
+    return {"upload_id": upload_id, "location": location}
+
+
+@router.delete("/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload(
+    upload_id: str,
+    s3_client: Minio = Depends(minio_api_client),
+    db=Depends(get_db),
+    user: TokenData = Depends(get_current_user),
+):
+    """Abort a resumable upload, removing any uploaded parts
+    (or the assembled object if the upload was completed).
+
+    Args:
+        upload_id (str): Upload ID
+        s3_client (Minio, optional): Minio client. Defaults to Depends(minio_api_client).
+        db (_type_, optional): Connection to MongoDB. Defaults to Depends(get_db).
+        user (TokenData, optional): Current user. Defaults to Depends(get_current_user).
+    """
+    db, _ = db
+    upload = await get_upload(upload_id, db, user, completed=None)
+    try:
+        if upload["completed"]:
+            await remove_data(
+                s3_client, upload["objectName"], upload["bucketName"]
+            )
+        else:
+            await abort_multipart_upload(
+                s3_client,
+                upload["objectName"],
+                upload["bucketName"],
+                upload_id,
+            )
+    except Exception as err:
+        print(f"{Fore.YELLOW}WARNING{Fore.WHITE}:  {err}")
+    await db["uploads"].delete_one({"uploadId": upload_id})
@@ -1,25 +1,36 @@
 """Endpoint to handle datasets"""
 import tempfile
 from datetime import datetime
-from os import remove
-from pathlib import Path
-from shutil import unpack_archive
-from typing import Dict, List, Optional
+from typing import BinaryIO, Dict, List, Optional
 
 import filetype
 from fastapi import APIRouter, Depends, File, Form, Query, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.exceptions import HTTPException
+from miniopy_async import Minio
 
 from ..config.config import config
+from ..internal.archive_extractor import (
+    StreamingExtractor,
+    UnsafeArchiveMemberException,
+)
+from ..internal.auth import get_current_user
 from ..internal.data_connector import Dataset
 from ..internal.dependencies.file_validator import (
     MaxFileSizeException,
-    MaxFileSizeValidator,
     ValidateFileUpload,
-    clean_filename,
     determine_safe_file_size,
 )
+from ..internal.dependencies.minio_client import (
+    get_data,
+    minio_api_client,
+    remove_data,
+)
+from ..internal.dependencies.mongo_client import get_db
+from ..models.buckets import UploadPurpose
 from ..models.dataset import Connector, DatasetModel, FindDatasetModel
+from ..models.iam import TokenData
+from .buckets import get_upload
 
 ACCEPTED_CONTENT_TYPES = [
     "application/zip",
@@ -27,7 +38,8 @@ ACCEPTED_CONTENT_TYPES = [
     "application/gzip",
     "application/x-bzip2",
 ]
-CHUNK_SIZE = 1024
+MIME_SNIFF_BYTES = 261  # bytes needed by filetype to guess MIME type
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
 BYTES_PER_GB = 1024 * 1024 * 1024
 MAX_UPLOAD_SIZE_GB = config.MAX_UPLOAD_SIZE_GB
 file_validator = ValidateFileUpload(
@@ -136,6 +148,7 @@ async def create_dataset(
         output_url (Optional[str], optional): Remote URL to upload file to. Defaults to Form(default=None).
 
     Raises:
+        HTTPException: 400 Bad Request if archive has unsafe paths (e.g ../)
         HTTPException: 413 Request Entity Too Large if dataset size is too large
         HTTPException: 415 Unsupported Media Type if wrong file type
         HTTPException: 500 Internal Server Error if any IOErrors
@@ -143,67 +156,169 @@ async def create_dataset(
     Returns:
         DatasetModel : Created dataset
     """
-    # Write dataset to temp directory
-    # NOTE: not using aiofiles for async read and write as performance is slow
-    # https://stackoverflow.com/questions/73442335/how-to-upload-a-large-file-%E2%89%A53gb-to-fastapi-backend
-    # First determine max file size
-    max_file_size = determine_safe_file_size("/", clearance=5)
-    file_size_validator = MaxFileSizeValidator(max_size=max_file_size)
-    path = None
-    # TODO: Refactor code to make it more readable
+    # Extraction and the upload to the connector block the event loop
+    return await run_in_threadpool(
+        create_dataset_from_archive,
+        file.file,
+        filename=file.filename,
+        dataset_name=dataset_name,
+        project_name=project_name,
+        connector=connector,
+        output_url=output_url,
+    )
+
+
+@router.post(
+    "/uploads/{upload_id}",
+    status_code=status.HTTP_201_CREATED,
+    response_model=DatasetModel,
+)
+async def create_dataset_from_upload(
+    upload_id: str,
+    dataset_name: str = Form(...),
+    project_name: str = Form(...),
+    connector: Connector = Form(...),
+    output_url: Optional[str] = Form(default=None),
+    s3_client: Minio = Depends(minio_api_client),
+    db=Depends(get_db),
+    user: TokenData = Depends(get_current_user),
+) -> DatasetModel:
+    """Create a new dataset from an archive uploaded through
+    the resumable upload API (`/buckets/uploads`).
+
+    Args:
+        upload_id (str): ID of completed resumable upload
+        dataset_name (str, optional): Name of dataset. Defaults to Form(...).
+        project_name (str, optional): Name of project to uplaod to. Defaults to Form(...).
+        connector(Connector): Data connector to use.
+        output_url (Optional[str], optional): Remote URL to upload file to. Defaults to Form(default=None).
+        s3_client (Minio, optional): Minio client. Defaults to Depends(minio_api_client).
+        db (_type_, optional): Connection to MongoDB. Defaults to Depends(get_db).
+        user (TokenData, optional): Current user. Defaults to Depends(get_current_user).
+
+    Raises:
+        HTTPException: 400 if upload was not meant for a dataset
+        HTTPException: 400 Bad Request if archive has unsafe paths (e.g ../)
+        HTTPException: 413 Request Entity Too Large if dataset size is too large
+        HTTPException: 415 Unsupported Media Type if wrong file type
+        HTTPException: 500 Internal Server Error if any IOErrors
+
+    Returns:
+        DatasetModel : Created dataset
+    """
+    db, _ = db
+    upload = await get_upload(upload_id, db, user, completed=True)
+    if upload["purpose"] != UploadPurpose.DATASET:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Upload with ID {upload_id} is not a dataset",
+        )
+    with tempfile.TemporaryFile(prefix="dataset-") as archive:
+        try:
+            response = await get_data(
+                s3_client, upload["objectName"], upload["bucketName"]
+            )
+            async for chunk in response.content.iter_chunked(
+                DOWNLOAD_CHUNK_SIZE
+            ):
+                archive.write(chunk)
+            response.close()
+            await response.release()
+        except Exception as err:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="There was an error reading the uploaded file",
+            ) from err
+        archive.seek(0)
+        # Extraction and upload to the connector block, so keep them
+        # off the event loop
+        dataset = await run_in_threadpool(
+            create_dataset_from_archive,
+            archive,
+            filename=upload["filename"],
+            dataset_name=dataset_name,
+            project_name=project_name,
+            connector=connector,
+            output_url=output_url,
+        )
+    # Uploaded archive is no longer needed
+    await remove_data(s3_client, upload["objectName"], upload["bucketName"])
+    await db["uploads"].delete_one({"uploadId": upload_id})
+    return dataset
+
+
+def create_dataset_from_archive(
+    fileobj: BinaryIO,
+    filename: Optional[str],
+    dataset_name: str,
+    project_name: str,
+    connector: Connector,
+    output_url: Optional[str] = None,
+) -> DatasetModel:
+    """Extract an archive and upload its contents as a new dataset
+
+    Args:
+        fileobj (BinaryIO): Seekable archive file object
+        filename (Optional[str]): Original filename of archive
+        dataset_name (str): Name of dataset
+        project_name (str): Name of project to upload to
+        connector (Connector): Data connector to use
+        output_url (Optional[str], optional): Remote URL to upload file to. Defaults to None.
+
+    Raises:
+        HTTPException: 400 Bad Request if archive has unsafe paths (e.g ../)
+        HTTPException: 413 Request Entity Too Large if dataset size is too large
+        HTTPException: 415 Unsupported Media Type if wrong file type
+        HTTPException: 500 Internal Server Error if any IOErrors
+
+    Returns:
+        DatasetModel: Created dataset
+    """
+    # NOTE: the uploaded file is already spooled to disk by starlette,
+    # so extract entries directly from it instead of writing another
+    # copy of the archive and calling unpack_archive on it.
+    # Extraction is limited by the actual number of decompressed bytes
+    # (free disk space) and by the compression ratio of the archive.
+    extractor = StreamingExtractor(
+        max_bytes=determine_safe_file_size("/", clearance=1),
+        max_ratio=config.MAX_DECOMPRESSION_RATIO,
+        max_workers=config.DATASET_EXTRACTION_WORKERS,
+    )
     with tempfile.TemporaryDirectory(prefix="dataset-") as dirpath:
-        # write file to fs
         try:
-            path = Path(dirpath, clean_filename(file.filename))
-            # First get file size
-            with open(path, "wb") as f:
-                while content := file.file.read(
-                    CHUNK_SIZE
-                ):  # Read in chunks to avoid memory issues
-                    file_size_validator(
-                        content
-                    )  # checks total file size of all files uploaded
-                    f.write(content)
             # Validate File type
-            content_type = filetype.guess_mime(path)
+            content_type = filetype.guess_mime(fileobj.read(MIME_SNIFF_BYTES))
+            fileobj.seek(0)
             if content_type not in ACCEPTED_CONTENT_TYPES:
                 raise ValueError
+            extractor.extract(
+                fileobj,
+                content_type=content_type,
+                dest=dirpath,
+                filename=filename,
+            )
         except MaxFileSizeException as err:
-            if path:
-                remove(path)
             raise HTTPException(
                 status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
                 detail="Dataset uploaded was too large for the server to handle.",
             ) from err
-        except ValueError as err:
-            if path:
-                remove(path)
+        except UnsafeArchiveMemberException as err:
+            # Subclass of ValueError, so must be caught first
             raise HTTPException(
-                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
-                detail=f"File type of compressed file {file.filename} is not supported.",
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Archive {filename} contains a file outside of "
+                + f"the dataset directory ({err})",
             ) from err
-        except Exception as err:
-            if path:
-                remove(path)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="There was an error reading the file",
-            ) from err
-        try:
-            unpack_archive(filename=path, extract_dir=dirpath)
-        except ValueError as err:  # Redundant?
+        except ValueError as err:
             raise HTTPException(
                 status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
-                detail=f"File type of compressed file {file.filename} is not supported.",
+                detail=f"File type of compressed file {filename} is not supported.",
             ) from err
         except Exception as err:
             raise HTTPException(
                 status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Error when decompressing dataset",
             ) from err
-        finally:
-            # this will still run even if HTTPException is raised
-            remove(path)  # remove zipfile so it is not uploaded
         dataset = Dataset.from_connector(connector).create(
             name=dataset_name,
             project=project_name,
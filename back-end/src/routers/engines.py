@@ -24,15 +24,30 @@ from yaml import safe_load
 
 from ..config.config import config
 from ..internal.auth import get_current_user
+from ..internal.autoscaling import (
+    apply_hpa,
+    delete_hpa,
+    delete_wake_mapping,
+    finish_waking,
+    get_autoscaling_policy,
+    record_activity,
+    wake_engine,
+)
 from ..internal.dependencies.k8s_client import get_k8s_client
 from ..internal.dependencies.mongo_client import get_db
 from ..internal.tasks import delete_orphan_services
 from ..internal.templates import template_env
 from ..internal.utils import k8s_safe_name, uncased_to_snake_case
+from ..internal.warm_pool import (
+    claim_warm_engine,
+    get_warm_pool_stats,
+    replenish_warm_pool,
+)
 from ..models.engine import (
     CreateInferenceEngineService,
     InferenceEngineService,
     InferenceServiceStatus,
+    ResourceLimits,
     ServiceBackend,
     UpdateInferenceEngineService,
 )
@@ -146,6 +161,16 @@ async def scale_inference_engine_deployments(
                     namespace=config.IE_NAMESPACE,
                     body={"spec": {"replicas": replicas}},
                 )
+                # Manually scaled, so not woken up on the next request
+                await db["services"].update_one(
+                    {"serviceName": service_name},
+                    {
+                        "$set": {
+                            "scaledToZero": False,
+                            "lastActive": datetime.datetime.now(),
+                        }
+                    },
+                )
                 return {
                     "message": "Deployment scaled successfully",
                     "replicas": replicas,
@@ -295,6 +320,12 @@ async def get_inference_engine_service_status(
                 service_api.read_namespaced_service(
                     name=service_name, namespace=config.IE_NAMESPACE
                 )
+                # Wake up the service if it was scaled down for being idle
+                woken_replicas = None
+                if service.get("scaledToZero"):
+                    woken_replicas = await wake_engine(db, client, service)
+                else:
+                    await record_activity(db, service_name)
                 # Get status
                 result = api.read_namespaced_deployment_status(
                     name=service_name + "-deployment",
@@ -304,10 +335,22 @@ async def get_inference_engine_service_status(
                 return_status.expected_replicas = int(
                     result.status.replicas if result.status.replicas else 0
                 )
+                if woken_replicas is not None:
+                    # Deployment status does not reflect the scale up yet
+                    return_status.expected_replicas = woken_replicas
+                    return_status.ready = False
+                    return_status.message += "Waking up idle service\n"
                 for condition in result.status.conditions:
                     if condition.status != "True":
                         return_status.ready = False
                         return_status.message += f"Message: {condition.message}\nReason: {condition.reason}"
+                if (
+                    service.get("wakeMapping")
+                    and woken_replicas is None
+                    and result.status.ready_replicas
+                ):
+                    # Woken up and ready, send requests to it again
+                    await finish_waking(db, client, service_name)
                 # Find out if pods in deployment are schedulable
                 # Get pods in deployment
                 core_api = CoreV1Api(client)
@@ -390,14 +433,19 @@ async def get_available_inference_engine_services(
 @router.post("/", response_model=InferenceEngineService)
 async def create_inference_engine_service(
     service: CreateInferenceEngineService,
+    tasks: BackgroundTasks,
     k8s_client: ApiClient = Depends(get_k8s_client),
     db: Tuple[AsyncIOMotorDatabase, AsyncIOMotorClient] = Depends(get_db),
     user: TokenData = Depends(get_current_user),
 ) -> Dict:
     """Create an inference engine service
 
+    If the warm pool is enabled and has an engine for the image,
+    that engine is handed out instead of starting a new one.
+
     Args:
         service (CreateInferenceEngineService): Service details
+        tasks (BackgroundTasks): Used to replace handed out warm engines
         k8s_client (ApiClient, optional): K8S client. Defaults to Depends(get_k8s_client).
         db (Tuple[AsyncIOMotorDatabase, AsyncIOMotorClient], optional): MongoDB connection.
             Defaults to Depends(get_db).
@@ -456,7 +504,30 @@ async def create_inference_engine_service(
                     name=ingress_name, namespace=ingress_namespace
                 )
                 host = ingress.status.load_balancer.ingress[0].ip
-            if service_backend == ServiceBackend.KNATIVE:
+            db, mongo_client = db
+            warm_engine = None
+            # Warm engines only have the default pod spec
+            if (
+                config.IE_WARM_POOL_SIZE > 0
+                and service.resource_limits is None
+                and service.autoscaling is None
+                and service.readiness_path is None
+                and not service.env
+            ):
+                warm_engine = await claim_warm_engine(
+                    db, client, service, service_backend
+                )
+            if warm_engine is not None:
+                # Already running, so only the name changes
+                service_name = path = warm_engine
+                if service_backend == ServiceBackend.KNATIVE:
+                    url = f"{protocol}://{service_name}.{config.IE_NAMESPACE}.{host}"
+                    if not config.IE_DOMAIN:
+                        url += ".sslip.io"
+                else:
+                    url = f"{protocol}://{host}/{path}/"
+                tasks.add_task(replenish_warm_pool)
+            elif service_backend == ServiceBackend.KNATIVE:
                 service_template = template_env.get_template(
                     "knative/inference-engine-knative-service.yaml.j2"
                 )
@@ -468,6 +539,9 @@ async def create_inference_engine_service(
                             "port": service.container_port,
                             "env": service.env,
                             "num_gpus": service.num_gpus,
+                            "resource_limits": service.resource_limits,
+                            "autoscaling": service.autoscaling,
+                            "readiness_path": service.readiness_path,
                         }
                     )
                 )
@@ -512,6 +586,9 @@ async def create_inference_engine_service(
                             "port": service.container_port,
                             "env": service.env,
                             "num_gpus": service.num_gpus,
+                            "resource_limits": service.resource_limits,
+                            "autoscaling": service.autoscaling,
+                            "readiness_path": service.readiness_path,
                         }
                     )
                 )
@@ -537,19 +614,23 @@ async def create_inference_engine_service(
                     plural="mappings",
                     body=mapping_render,
                 )
+                if service.autoscaling is not None:
+                    apply_hpa(client, service_name, service.autoscaling)
             else:
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                     detail="Invalid service type",
                 )
             # Save info into DB
-            db, mongo_client = db
             service_metadata = jsonable_encoder(
                 InferenceEngineService(
                     image_uri=service.image_uri,
                     container_port=service.container_port,
                     env=service.env,
                     num_gpus=service.num_gpus,
+                    resource_limits=service.resource_limits,
+                    autoscaling=service.autoscaling,
+                    readiness_path=service.readiness_path,
                     owner_id=user.user_id,
                     protocol=protocol,
                     host=host,
@@ -561,8 +642,7 @@ async def create_inference_engine_service(
                     last_modified=datetime.datetime.now(),
                     inference_url=url,
                     service_name=service_name,
-                    backend=service_backend
-                    # resource_limits=service.resource_limits,
+                    backend=service_backend,
                 ),
                 by_alias=True,  # convert snake_case to camelCase
             )
@@ -697,6 +777,8 @@ async def delete_inference_engine_service(
                                 pass
                             else:
                                 raise err
+                        delete_hpa(client, service_name)
+                        delete_wake_mapping(client, service_name)
                 except (K8sAPIException, HTTPError) as err:
                     raise HTTPException(
                         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -828,6 +910,11 @@ async def update_inference_engine_service(
                 if result.modified_count != 1:
                     # Not necessary to update service?
                     return updated_service
+                resource_limits = (
+                    ResourceLimits.parse_obj(updated_service["resourceLimits"])
+                    if updated_service.get("resourceLimits")
+                    else None
+                )
                 # Get the backend
                 # Deploy Service on K8S
                 with k8s_client as client:
@@ -837,7 +924,7 @@ async def update_inference_engine_service(
                         custom_api = CustomObjectsApi(client)
                         if service_type == ServiceBackend.KNATIVE:
                             template = template_env.get_template(
-                                "knative/inference-engine-service.yaml.j2"
+                                "knative/inference-engine-knative-service.yaml.j2"
                             )
                             service_template = safe_load(
                                 template.render(
@@ -851,6 +938,13 @@ async def update_inference_engine_service(
                                         ],
                                         "env": updated_service["env"],
                                         "num_gpus": updated_service["numGpus"],
+                                        "resource_limits": resource_limits,
+                                        "autoscaling": get_autoscaling_policy(
+                                            updated_service
+                                        ),
+                                        "readiness_path": updated_service.get(
+                                            "readinessPath"
+                                        ),
                                     }
                                 )
                             )
@@ -905,6 +999,13 @@ async def update_inference_engine_service(
                                         ],
                                         "env": updated_service["env"],
                                         "num_gpus": updated_service["numGpus"],
+                                        "resource_limits": resource_limits,
+                                        "autoscaling": get_autoscaling_policy(
+                                            updated_service
+                                        ),
+                                        "readiness_path": updated_service.get(
+                                            "readinessPath"
+                                        ),
                                     }
                                 )
                             )
@@ -955,6 +1056,11 @@ async def update_inference_engine_service(
                                     name=service_name + "-ingress",
                                     body=mapping_render,
                                 )
+                            apply_hpa(
+                                client,
+                                service_name,
+                                get_autoscaling_policy(updated_service),
+                            )
                         return updated_service
                     except (K8sAPIException, HTTPError) as err:
                         session.abort_transaction()
@@ -1012,6 +1118,11 @@ async def restore_inference_engine_service(
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Service not found"
         )
+    resource_limits = (
+        ResourceLimits.parse_obj(service["resourceLimits"])
+        if service.get("resourceLimits")
+        else None
+    )
     with k8s_client as client:
         custom_api = CustomObjectsApi(client)
         core_api = CoreV1Api(client)
@@ -1029,6 +1140,9 @@ async def restore_inference_engine_service(
                         "port": service["containerPort"],
                         "env": service["env"],
                         "num_gpus": service["numGpus"],
+                        "resource_limits": resource_limits,
+                        "autoscaling": get_autoscaling_policy(service),
+                        "readiness_path": service.get("readinessPath"),
                     }
                 )
             )
@@ -1065,6 +1179,9 @@ async def restore_inference_engine_service(
                         "port": service["containerPort"],
                         "env": service["env"],
                         "num_gpus": service["numGpus"],
+                        "resource_limits": resource_limits,
+                        "autoscaling": get_autoscaling_policy(service),
+                        "readiness_path": service.get("readinessPath"),
                     }
                 )
             )
@@ -1104,6 +1221,13 @@ async def restore_inference_engine_service(
             except K8sAPIException as err:
                 print("Mapping probably already exists")
                 print(f"Error: {err}")
+
+            try:
+                apply_hpa(
+                    client, service_name, get_autoscaling_policy(service)
+                )
+            except K8sAPIException as err:
+                print(f"Error restoring HPA: {err}")
         else:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1112,6 +1236,33 @@ async def restore_inference_engine_service(
     return {"message": "Service restored", "service": service}
 
 
+@router.get("/admin/warm-pool")
+async def get_warm_pool(
+    db: Tuple[AsyncIOMotorDatabase, AsyncIOMotorClient] = Depends(get_db),
+    user: TokenData = Depends(get_current_user),
+) -> Dict:
+    """Get the engines in the warm pool, and the startup time they saved
+
+    Args:
+        db (Tuple[AsyncIOMotorDatabase, AsyncIOMotorClient], optional): MongoDB connection.
+            Defaults to Depends(get_db).
+        user (TokenData, optional): User details and info. Defaults to Depends(get_current_user).
+
+    Raises:
+        HTTPException: 403 Forbidden if user is not an admin
+
+    Returns:
+        Dict: Pool size, engines, claims, misses and seconds saved
+    """
+    if user.role != UserRoles.admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User does not have sufficient privilege to view the warm pool!",
+        )
+    db, _ = db
+    return await get_warm_pool_stats(db)
+
+
 @router.delete("/admin/clear", status_code=status.HTTP_204_NO_CONTENT)
 async def wipe_orphaned_services(
     user: TokenData = Depends(get_current_user),
@@ -1,11 +1,13 @@
 import logging
-from typing import Dict
+from typing import Dict, Optional
 
 from clearml.backend_api.session.client import APIClient
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 
 from ..internal.dependencies.clearml_client import clearml_api_client
+from ..internal.downsample import DownsampleMethod
 from ..internal.experiment_connector import Experiment
+from ..internal.experiment_connector.cache import experiment_cache
 from ..models.experiment import (
     ClonePackageModel,
     Connector,
@@ -16,11 +18,13 @@ router = APIRouter(prefix="/experiments", tags=["Experiments"])
 
 
 @router.get("/{exp_id}", response_model=ExperimentResponse)
-def get_experiment(
+async def get_experiment(
     exp_id: str,
     connector: Connector,
     return_plots: bool = True,
     return_artifacts: bool = True,
+    max_points: Optional[int] = Query(default=None, ge=3),
+    downsample_method: DownsampleMethod = DownsampleMethod.LTTB,
 ) -> Dict:
     """Get experiment by ID.
 
@@ -29,6 +33,10 @@ def get_experiment(
         connector (Connector): Connector to use
         return_plots (bool, optional): If plots should be returned. Defaults to True.
         return_artifacts (bool, optional): If artifacts should be returned. Defaults to True.
+        max_points (Optional[int], optional): Max points per scalar series. If set,
+            scalars are downsampled on the server. Defaults to None.
+        downsample_method (DownsampleMethod, optional): Algorithm used to downsample
+            scalars. Defaults to DownsampleMethod.LTTB.
 
     Raises:
         HTTPException: 404 Not Found if experiment does not exist
@@ -38,10 +46,18 @@ def get_experiment(
         Dict: Experiment details
     """
     try:
-        exp = Experiment.from_connector(connector).get(exp_id=exp_id)
+        # Experiment and its properties are cached, and concurrent
+        # requests for the same experiment share a single fetch
+        exp, _ = await experiment_cache.get(connector, exp_id)
+        fields = ["models", "tags", "config"]
+        if return_plots:
+            fields.extend(["metrics", "plots"])
+        if return_artifacts:
+            fields.append("artifacts")
+        values = await experiment_cache.get_fields(connector, exp_id, fields)
         # Extract framework from models
         frameworks = set()
-        for model in exp.models.values():
+        for model in values["models"].values():
             frameworks.add(model.framework)
 
         data = {
@@ -49,22 +65,24 @@ def get_experiment(
             "name": exp.exp_name,
             "output_url": exp.output_url,
             "project_name": exp.project_name,
-            "tags": exp.tags,
+            "tags": values["tags"],
             "frameworks": list(frameworks),
-            "config": exp.config,
+            "config": values["config"],
             "owner": exp.user,
         }
 
         if return_plots:
             # scalars are raw data logged during exp
-            data["scalars"] = exp.metrics
+            data["scalars"] = await experiment_cache.get_metrics(
+                connector, exp_id, max_points, downsample_method
+            )
             # plots are already plotly compatible
-            data["plots"] = exp.plots
+            data["plots"] = values["plots"]
 
         if return_artifacts:
             data["artifacts"] = {}
-            data["artifacts"].update(exp.artifacts)
-            data["artifacts"].update(exp.models)
+            data["artifacts"].update(values["artifacts"])
+            data["artifacts"].update(values["models"])
         return data
     except ValueError as err:
         logging.error(err)
@@ -26,7 +26,7 @@ from ..internal.dependencies.minio_client import (
     minio_api_client,
 )
 from ..internal.dependencies.mongo_client import get_db
-from ..internal.experiment_connector import Experiment
+from ..internal.experiment_connector.cache import experiment_cache
 from ..internal.preprocess_html import (
     preprocess_html_get,
     preprocess_html_post,
@@ -398,10 +398,8 @@ async def create_model_card_metadata(
     card.markdown = await preprocess_html_post(card.markdown)
     card.performance = await preprocess_html_post(card.performance)
     if card.experiment.connector != "" and card.experiment.connector is not None:
-        card.experiment.output_url = (
-            Experiment.from_connector(card.experiment.connector)
-            .get(exp_id=card.experiment.experiment_id)
-            .output_url
+        card.experiment.output_url = await experiment_cache.get_output_url(
+            card.experiment.connector, card.experiment.experiment_id
         )
     card_dict: dict = jsonable_encoder(
         ModelCardModelDB(
@@ -469,10 +467,11 @@ async def update_model_card_metadata_by_id(
         if card_dict["experiment"]["connector"] == "":
             card_dict["experiment"]["outputUrl"] = None
         else:
-            card_dict["experiment"]["outputUrl"] = (
-                Experiment.from_connector(card_dict["experiment"]["connector"])
-                .get(exp_id=card_dict["experiment"]["experimentId"])
-                .output_url
+            card_dict["experiment"][
+                "outputUrl"
+            ] = await experiment_cache.get_output_url(
+                card_dict["experiment"]["connector"],
+                card_dict["experiment"]["experimentId"],
             )
     if "markdown" in card_dict:
         # Upload base64 encoded image to S3
@@ -0,0 +1,78 @@
+"""Endpoint waking up inference engines scaled to zero for being idle.
+
+Emissary sends requests to an engine scaled to zero here, see
+`internal.autoscaling`. It is not authenticated, as the requests are
+meant for the engine, which does not require it either.
+"""
+from typing import Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import RedirectResponse
+from kubernetes.client import ApiClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+from ..internal.autoscaling import finish_waking, wait_until_ready, wake_engine
+from ..internal.dependencies.k8s_client import get_k8s_client
+from ..internal.dependencies.mongo_client import get_db
+
+router = APIRouter(prefix="/wake", tags=["Inference Engines"])
+
+WAKE_METHODS = ["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"]
+
+
+@router.api_route(
+    "/{service_name}/{path:path}",
+    methods=WAKE_METHODS,
+    include_in_schema=False,
+)
+async def wake_inference_engine_service(
+    service_name: str,
+    path: str,
+    request: Request,
+    k8s_client: ApiClient = Depends(get_k8s_client),
+    db: Tuple[AsyncIOMotorDatabase, AsyncIOMotorClient] = Depends(get_db),
+) -> RedirectResponse:
+    """Wake up an idle inference engine, and once it is ready,
+    redirect the request back to it.
+
+    Args:
+        service_name (str): Name of the service
+        path (str): Path of the request within the service
+        request (Request): Request meant for the service
+        k8s_client (ApiClient, optional): K8S Client. Defaults to Depends(get_k8s_client).
+        db (Tuple[AsyncIOMotorDatabase, AsyncIOMotorClient], optional):
+            MongoDB Connection. Defaults to Depends(get_db).
+
+    Raises:
+        HTTPException: 404 Not Found if service does not exist
+        HTTPException: 503 Service Unavailable if service is not ready in time
+
+    Returns:
+        RedirectResponse: Redirect (keeping the method and body) to
+            the same URL, which now goes to the service
+    """
+    db, _ = db
+    service = await db["services"].find_one({"serviceName": service_name})
+    if service is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Service {service_name} not found",
+        )
+    with k8s_client as client:
+        if service.get("scaledToZero"):
+            await wake_engine(db, client, service)
+        if not await wait_until_ready(client, service_name):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Service {service_name} is still starting up",
+                headers={"Retry-After": "10"},
+            )
+        await finish_waking(db, client, service_name)
+    url = f"/{service_name}/{path}"
+    if request.url.query:
+        url += f"?{request.url.query}"
+    # Emissary may take a moment to stop sending requests here, in which
+    # case the engine is already ready and the request is redirected again
+    return RedirectResponse(
+        url, status_code=status.HTTP_307_TEMPORARY_REDIRECT
+    )
@@ -84,3 +84,117 @@ async def test_update_video(
     assert len(objects) == 1  # type: ignore #ignore
     new_object_name = objects[0].object_name  # type: ignore #ignore
     assert old_object_name != new_object_name
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("flush_s3", "flush_db")
+@pytest.mark.parametrize("file_path", ["./test_data/video1.mp4"])
+async def test_resumable_upload_video(
+    file_path: str, client: TestClient, s3_client: Minio
+):
+    blob = Path(__file__).parent.joinpath(file_path).read_bytes()
+    response = client.post(
+        "/buckets/uploads",
+        json={
+            "filename": "video1.mp4",
+            "content_type": "video/mp4",
+            "purpose": "video",
+            "size": len(blob),
+        },
+    )
+    response.raise_for_status()
+    upload_id = response.json()["upload_id"]
+    part_size = response.json()["part_size"]
+
+    # Parts larger than the part size are rejected
+    response = client.put(
+        f"/buckets/uploads/{upload_id}/parts/1", data=b"0" * (part_size + 1)
+    )
+    assert response.status_code == 413
+
+    response = client.put(f"/buckets/uploads/{upload_id}/parts/1", data=blob)
+    response.raise_for_status()
+
+    # Uploaded part should be listed, so upload can be resumed
+    response = client.get(f"/buckets/uploads/{upload_id}")
+    response.raise_for_status()
+    assert [part["part_number"] for part in response.json()["parts"]] == [1]
+
+    response = client.post(f"/buckets/uploads/{upload_id}/complete")
+    response.raise_for_status()
+    location: str = response.json()["location"]
+    bucket, object_name = location.removeprefix("s3://").split("/", maxsplit=1)
+    assert bucket == BUCKET_NAME
+
+    s3_response: client_reqrep.ClientResponse = await s3_client.get_object(
+        BUCKET_NAME, object_name
+    )
+    assert await s3_response.read() == blob
+    s3_response.close()
+    await s3_response.release()
+
+
+@pytest.mark.usefixtures("flush_s3", "flush_db")
+def test_resumable_upload_invalid_video_type(client: TestClient):
+    response = client.post(
+        "/buckets/uploads",
+        json={
+            "filename": "video.exe",
+            "content_type": "application/x-msdownload",
+            "purpose": "video",
+        },
+    )
+    assert response.status_code == 415
+
+
+@pytest.mark.usefixtures("flush_s3", "flush_db")
+def test_resumable_upload_size_limit(client: TestClient):
+    # Datasets are limited by their size, so it must be given
+    response = client.post(
+        "/buckets/uploads",
+        json={"filename": "dataset.zip", "purpose": "dataset"},
+    )
+    assert response.status_code == 422
+
+    # Videos are capped, like in the frontend
+    response = client.post(
+        "/buckets/uploads",
+        json={
+            "filename": "video.mp4",
+            "content_type": "video/mp4",
+            "purpose": "video",
+            "size": 11 * 1024 * 1024,
+        },
+    )
+    assert response.status_code == 413
+
+    response = client.post(
+        "/buckets/uploads",
+        json={
+            "filename": "video.mp4",
+            "content_type": "video/mp4",
+            "purpose": "video",
+            "size": 10,
+        },
+    )
+    response.raise_for_status()
+    upload_id = response.json()["upload_id"]
+
+    # Parts cannot go past the declared size
+    response = client.put(
+        f"/buckets/uploads/{upload_id}/parts/1", data=b"0" * 11
+    )
+    assert response.status_code == 413
+    response = client.put(f"/buckets/uploads/{upload_id}/parts/2", data=b"0")
+    assert response.status_code == 413
+
+    response = client.put(
+        f"/buckets/uploads/{upload_id}/parts/1", data=b"0" * 10
+    )
+    response.raise_for_status()
+    response = client.post(f"/buckets/uploads/{upload_id}/complete")
+    response.raise_for_status()
+
+    # Completed uploads cannot be changed
+    response = client.put(f"/buckets/uploads/{upload_id}/parts/1", data=b"0")
+    assert response.status_code == 409
@@ -1,3 +1,5 @@
+import io
+import zipfile
 from pathlib import Path
 from typing import Dict, Set
 
@@ -112,3 +114,21 @@ def test_create_dataset_invalid_filetype():
 @pytest.mark.xfail(reason="Too large dataset")
 def test_create_dataset_filelimit():
     test_create_dataset("./test_data/large_dataset.zip")
+
+
+def test_create_dataset_path_traversal(client: TestClient):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as f:
+        f.writestr("../../evil.txt", "evil")
+    archive.seek(0)
+    response = client.post(
+        "/datasets/",
+        data={
+            "dataset_name": "dataset_42",
+            "project_name": "test_create_dataset",
+            "connector": "clearml",
+        },
+        files={"file": ("evil.zip", archive, "application/zip")},
+    )
+    # Rejected as unsafe, not as an unsupported file type
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,123 @@
+import bz2
+import gzip
+import io
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from src.internal.archive_extractor import (
+    ExtractionLimitException,
+    StreamingExtractor,
+    UnsafeArchiveMemberException,
+)
+
+
+def make_zip(files: dict) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as f:
+        for name, data in files.items():
+            f.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+def make_tar(files: dict, mode: str = "w:gz") -> io.BytesIO:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as f:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            f.addfile(info, io.BytesIO(data))
+    buffer.seek(0)
+    return buffer
+
+
+FILES = {
+    "train/a.txt": b"hello",
+    "train/b.txt": b"world",
+    "test/c.txt": b"!" * 100,
+}
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_extract_zip(tmp_path: Path, max_workers: int):
+    extractor = StreamingExtractor(max_bytes=1024, max_workers=max_workers)
+    extracted = extractor.extract(make_zip(FILES), "application/zip", tmp_path)
+    assert len(extracted) == len(FILES)
+    for name, data in FILES.items():
+        assert tmp_path.joinpath(name).read_bytes() == data
+
+
+@pytest.mark.parametrize(
+    "mode,content_type",
+    [
+        ("w", "application/x-tar"),
+        ("w:gz", "application/gzip"),
+        ("w:bz2", "application/x-bzip2"),
+    ],
+)
+def test_extract_tar(tmp_path: Path, mode: str, content_type: str):
+    extractor = StreamingExtractor(max_bytes=1024)
+    extractor.extract(make_tar(FILES, mode), content_type, tmp_path)
+    for name, data in FILES.items():
+        assert tmp_path.joinpath(name).read_bytes() == data
+
+
+@pytest.mark.parametrize(
+    "compress,content_type",
+    [
+        (gzip.compress, "application/gzip"),
+        (bz2.compress, "application/x-bzip2"),
+    ],
+)
+def test_extract_single_file(tmp_path: Path, compress, content_type: str):
+    extractor = StreamingExtractor(max_bytes=1024)
+    extracted = extractor.extract(
+        io.BytesIO(compress(b"a,b\n1,2\n")),
+        content_type,
+        tmp_path,
+        filename="data.csv.gz",
+    )
+    assert extracted == [tmp_path.resolve().joinpath("data.csv")]
+    assert extracted[0].read_bytes() == b"a,b\n1,2\n"
+
+
+@pytest.mark.parametrize("archive", [make_zip, make_tar])
+def test_extract_exceeds_budget(tmp_path: Path, archive):
+    extractor = StreamingExtractor(max_bytes=50)
+    content_type = (
+        "application/zip" if archive is make_zip else "application/gzip"
+    )
+    with pytest.raises(ExtractionLimitException):
+        extractor.extract(archive(FILES), content_type, tmp_path)
+
+
+def test_extract_exceeds_ratio(tmp_path: Path):
+    # 20 MiB of zeros compresses to a few KiB
+    bomb = make_tar({"zeros.bin": bytes(20 * 1024 * 1024)})
+    extractor = StreamingExtractor(max_bytes=1024**3, max_ratio=100)
+    with pytest.raises(ExtractionLimitException):
+        extractor.extract(bomb, "application/gzip", tmp_path)
+
+
+@pytest.mark.parametrize("archive", [make_zip, make_tar])
+def test_extract_path_traversal(tmp_path: Path, archive):
+    extractor = StreamingExtractor(max_bytes=1024)
+    content_type = (
+        "application/zip" if archive is make_zip else "application/gzip"
+    )
+    with pytest.raises(UnsafeArchiveMemberException):
+        extractor.extract(
+            archive({"../../evil.txt": b"evil"}),
+            content_type,
+            tmp_path.joinpath("out"),
+        )
+    assert not tmp_path.joinpath("evil.txt").exists()
+
+
+def test_extract_unsupported_type(tmp_path: Path):
+    extractor = StreamingExtractor(max_bytes=1024)
+    with pytest.raises(ValueError):
+        extractor.extract(io.BytesIO(b"data"), "image/png", tmp_path)
@@ -0,0 +1,103 @@
+import datetime
+
+import pytest
+from pydantic import ValidationError
+
+from src.internal.autoscaling import is_idle, render_hpa, sum_request_rate
+from src.models.engine import (
+    AutoscalingPolicy,
+    CreateInferenceEngineService,
+    UpdateInferenceEngineService,
+)
+
+
+def test_policy_replica_range():
+    with pytest.raises(ValidationError):
+        AutoscalingPolicy(min_replicas=2, max_replicas=1)
+    policy = AutoscalingPolicy.parse_obj(
+        {"minReplicas": 0, "maxReplicas": 2, "idleTimeoutSeconds": 60}
+    )
+    assert policy.min_replicas == 0
+    assert policy.idle_timeout_seconds == 60
+
+
+def test_cpu_autoscaling_needs_cpu_request():
+    service = {"modelId": "model", "imageUri": "image:latest"}
+    # HPA defaults to CPU utilization, which needs a CPU request
+    with pytest.raises(ValidationError):
+        CreateInferenceEngineService.parse_obj(
+            {**service, "autoscaling": {"maxReplicas": 2}}
+        )
+    with pytest.raises(ValidationError):
+        UpdateInferenceEngineService.parse_obj(
+            {
+                "imageUri": "image:latest",
+                "autoscaling": {"maxReplicas": 2, "targetCpuUtilization": 50},
+            }
+        )
+    CreateInferenceEngineService.parse_obj(
+        {**service, "autoscaling": {"maxReplicas": 2}, "resourceLimits": {}}
+    )
+    # Not scaled on CPU
+    CreateInferenceEngineService.parse_obj(
+        {
+            **service,
+            "autoscaling": {"maxReplicas": 2, "targetRequestsPerSecond": 5},
+        }
+    )
+    CreateInferenceEngineService.parse_obj(
+        {**service, "autoscaling": {"maxReplicas": 1}}
+    )
+
+
+def test_render_hpa():
+    # Fixed number of replicas, no HPA needed
+    assert render_hpa("engine", None) is None
+    assert render_hpa("engine", AutoscalingPolicy(max_replicas=1)) is None
+
+    manifest = render_hpa(
+        "engine", AutoscalingPolicy(min_replicas=0, max_replicas=3)
+    )
+    assert manifest["spec"]["scaleTargetRef"]["name"] == "engine-deployment"
+    assert manifest["spec"]["minReplicas"] == 1
+    assert manifest["spec"]["maxReplicas"] == 3
+    # Defaults to CPU
+    assert [metric["type"] for metric in manifest["spec"]["metrics"]] == [
+        "Resource"
+    ]
+
+    manifest = render_hpa(
+        "engine",
+        AutoscalingPolicy(max_replicas=2, target_requests_per_second=5),
+    )
+    assert [metric["type"] for metric in manifest["spec"]["metrics"]] == [
+        "Pods"
+    ]
+
+
+def test_is_idle():
+    now = datetime.datetime(2023, 1, 1, 12)
+    service = {
+        "autoscaling": {"idleTimeoutSeconds": 600},
+        "lastModified": str(now - datetime.timedelta(hours=1)),
+    }
+    assert is_idle(service, now)
+    # Recently used
+    service["lastActive"] = now - datetime.timedelta(minutes=5)
+    assert not is_idle(service, now)
+    # Already scaled down
+    service["lastActive"] = now - datetime.timedelta(hours=1)
+    service["scaledToZero"] = True
+    assert not is_idle(service, now)
+    # No idle timeout
+    assert not is_idle({"lastModified": str(now)}, now)
+
+
+def test_sum_request_rate():
+    metrics = {
+        "kind": "MetricValueList",
+        "items": [{"value": "500m"}, {"value": "2"}],
+    }
+    assert sum_request_rate(metrics) == 2.5
+    # No pods running
+    assert sum_request_rate({"items": []}) == 0
@@ -0,0 +1,48 @@
+import asyncio
+import time
+
+import pytest
+
+from src.internal.cache import RequestCoalescer, TTLCache
+
+
+def test_ttl_cache_expiry():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert "b" not in cache
+
+
+def test_ttl_cache_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # a is now most recently used
+    cache.set("c", 3)
+    assert "a" in cache
+    assert "b" not in cache
+    assert len(cache) == 2
+
+
+@pytest.mark.asyncio
+async def test_request_coalescer():
+    coalescer = RequestCoalescer()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(
+        *(coalescer.run("key", fetch) for _ in range(10))
+    )
+    assert results == [1] * 10
+    assert calls == 1
+    assert len(coalescer) == 0
+    # Once complete, a new request triggers a new call
+    assert await coalescer.run("key", fetch) == 2
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from src.internal.downsample import (
+    DownsampleMethod,
+    downsample_plotly,
+    downsample_series,
+    lttb_indices,
+    minmax_indices,
+)
+
+
+@pytest.mark.parametrize("n_out", [3, 10, 100])
+def test_lttb_indices(n_out: int):
+    x = np.arange(1000, dtype=float)
+    y = np.sin(x / 50)
+    indices = lttb_indices(x, y, n_out)
+    assert len(indices) == n_out
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_lttb_keeps_spike():
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[500] = 100
+    assert 500 in lttb_indices(x, y, 20)
+
+
+@pytest.mark.parametrize("n_out", [3, 4, 99, 100])
+def test_minmax_indices(n_out: int):
+    y = np.random.default_rng(0).normal(size=1000)
+    indices = minmax_indices(y, n_out)
+    assert len(indices) <= n_out
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+    if n_out >= 4:
+        assert np.argmax(y) in indices and np.argmin(y) in indices
+
+
+@pytest.mark.parametrize("method", list(DownsampleMethod))
+def test_downsample_series(method: DownsampleMethod):
+    x = list(range(10000))
+    y = [float(i % 100) for i in x]
+    new_x, new_y = downsample_series(x, y, 500, method)
+    assert len(new_x) == len(new_y) <= 500
+    assert new_x[0] == 0 and new_x[-1] == 9999
+    assert all(isinstance(value, int) for value in new_x)
+
+
+def test_downsample_series_short_or_invalid():
+    assert downsample_series([1, 2], [3, 4], 10, DownsampleMethod.LTTB) == (
+        [1, 2],
+        [3, 4],
+    )
+    x = [f"epoch {i}" for i in range(100)]
+    assert (
+        downsample_series(x, list(range(100)), 10, DownsampleMethod.LTTB)[0]
+        is x
+    )
+
+
+def test_downsample_plotly_does_not_modify_input():
+    figures = [
+        {
+            "data": [{"x": list(range(1000)), "y": list(range(1000))}],
+            "layout": {"title": "loss"},
+        }
+    ]
+    output = downsample_plotly(figures, 50)
+    assert len(output[0]["data"][0]["x"]) == 50
+    assert len(figures[0]["data"][0]["x"]) == 1000
+    assert output[0]["layout"] == {"title": "loss"}
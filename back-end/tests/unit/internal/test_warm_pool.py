@@ -0,0 +1,61 @@
+from src.internal.warm_pool import render_engine, select_pool_images
+from src.models.engine import ServiceBackend
+
+
+def test_select_pool_images():
+    used = ["a", "b", "b", "c", "c", "c"]
+    # Configured images first, then the most used ones
+    assert select_pool_images(["x"], used, 2) == ["x", "c", "b"]
+    assert select_pool_images(["c", "c"], used, 1) == ["c", "b"]
+    assert select_pool_images(["x"], used, 0) == ["x"]
+    assert select_pool_images([], [], 3) == []
+
+
+def test_render_engine():
+    manifests = render_engine(
+        "warm-1234",
+        "dev.local/test:1.0",
+        None,
+        {"A": "1"},
+        0,
+        ServiceBackend.EMISSARY,
+    )
+    assert set(manifests) == {"service", "deployment", "mapping"}
+    container = manifests["deployment"]["spec"]["template"]["spec"][
+        "containers"
+    ][0]
+    assert container["image"] == "dev.local/test:1.0"
+    assert container["env"] == [{"name": "A", "value": "1"}]
+    assert manifests["mapping"]["spec"]["prefix"] == "/warm-1234/"
+
+    manifests = render_engine(
+        "warm-1234",
+        "dev.local/test:1.0",
+        8000,
+        None,
+        0,
+        ServiceBackend.KNATIVE,
+    )
+    assert manifests["service"]["metadata"]["name"] == "warm-1234"
+    # Not scaled to zero while in the pool
+    annotations = manifests["service"]["spec"]["template"]["metadata"][
+        "annotations"
+    ]
+    assert annotations["autoscaling.knative.dev/min-scale"] == "1"
+
+
+def test_render_engine_probes():
+    manifests = render_engine(
+        "warm-1234",
+        "dev.local/test:1.0",
+        7860,
+        None,
+        0,
+        ServiceBackend.EMISSARY,
+    )
+    container = manifests["deployment"]["spec"]["template"]["spec"][
+        "containers"
+    ][0]
+    # Every probe uses the configured port
+    for probe in ("readinessProbe", "startupProbe", "livenessProbe"):
+        assert container[probe]["tcpSocket"]["port"] == 7860
@@ -7,6 +7,7 @@ from src.models.engine import (
     InferenceEngineService,
     InferenceServiceStatus,
     K8SPhase,
+    ResourceLimits,
     UpdateInferenceEngineService,
 )
 
@@ -41,3 +42,18 @@ def test_update_inference_engine_service(
     service: UpdateInferenceEngineService,
 ):
     assert service.num_gpus <= 2 and service.num_gpus >= 0
+
+
+@given(
+    st.builds(
+        ResourceLimits,
+        cpu_cores=st.floats(min_value=0.1, max_value=16),
+        guaranteed=st.booleans(),
+    )
+)
+def test_resource_limits(limits: ResourceLimits):
+    assert limits.num_threads >= 1
+    if limits.guaranteed:
+        # Guaranteed QoS needs limits equal to requests
+        assert limits.cpu_limit == limits.cpu_cores
+        assert limits.memory_limit == limits.memory_gb
@@ -44,13 +44,15 @@ export const useExperimentStore = defineStore('experiment', {
      * @param connector Experiment connector to use
      * @param returnPlots Whether to return plots or not
      * @param returnArtifacts Whether to return artifacts or not
+     * @param maxPoints Max points per scalar series, downsampled by the server
      * @returns Experiment data
      */
     async getExperimentByID(
       experimentId: string,
       connector: string,
       returnPlots = false,
-      returnArtifacts = false
+      returnArtifacts = false,
+      maxPoints = 1000
     ): Promise<Experiment> {
       try {
         const res = await api.get(`experiments/${experimentId}`, {
@@ -58,6 +60,7 @@ export const useExperimentStore = defineStore('experiment', {
             connector: connector,
             return_plots: returnPlots,
             return_artifacts: returnArtifacts,
+            max_points: maxPoints,
           },
         });
         const data: Experiment = res.data;
@@ -11,6 +11,37 @@ export interface MediaUploadResponse {
   }[];
 }
 
+export type UploadPurpose = 'video' | 'dataset';
+
+interface UploadedPart {
+  part_number: number;
+  etag: string;
+  size?: number;
+}
+
+interface ResumableUpload {
+  upload_id: string;
+  part_size: number;
+}
+
+export interface CompletedUpload {
+  upload_id: string;
+  location: string;
+}
+
+const MAX_PART_RETRIES = 3;
+
+/**
+ * Key used to remember an in-progress upload of a file,
+ * so that it can be resumed after a page reload or network error
+ * @param file File being uploaded
+ * @param purpose What the upload will be used for
+ * @returns Local storage key
+ */
+function uploadKey(file: File, purpose: UploadPurpose): string {
+  return `upload:${purpose}:${file.name}:${file.size}:${file.lastModified}`;
+}
+
 export const useUploadStore = defineStore('users', {
   state: () => ({
     files: [] as File[],
@@ -22,28 +53,113 @@ export const useUploadStore = defineStore('users', {
      * @returns Promise that resolves to the location of the uploaded video
      */
     async uploadVideo(videoFile: File): Promise<string> {
-      const form = new FormData();
-      form.append('video', videoFile[0]);
       let videoLocation = '';
-      console.log(form);
-      await api
-        .post('buckets/video', form, {
-          headers: {
-            'Content-Type': 'multipart/form-data',
-          },
-        })
-        .then((data) => {
-          videoLocation = data.data.video_location;
-        })
-        .catch((err) => {
-          console.error(err);
-          Notify.create({
-            message: 'Video upload failed.',
-            type: 'negative',
-          });
+      try {
+        videoLocation = (await this.resumableUpload(videoFile[0], 'video'))
+          .location;
+      } catch (err) {
+        console.error(err);
+        Notify.create({
+          message: 'Video upload failed.',
+          type: 'negative',
         });
+      }
       return videoLocation;
     },
+    /**
+     * Uploads a file in parts through the resumable upload API.
+     * Parts are uploaded in parallel and retried individually,
+     * and an interrupted upload of the same file is resumed
+     * from the parts that were already uploaded.
+     * @param file File to upload
+     * @param purpose What the upload will be used for
+     * @param concurrency Number of parts to upload in parallel
+     * @param onProgress Callback with fraction of file uploaded
+     * @returns Promise that resolves to the upload ID and location of the uploaded file
+     */
+    async resumableUpload(
+      file: File,
+      purpose: UploadPurpose,
+      concurrency = 4,
+      onProgress?: (progress: number) => void
+    ): Promise<CompletedUpload> {
+      const key = uploadKey(file, purpose);
+      let upload: ResumableUpload | null = null;
+      const uploaded = new Set<number>();
+      // Attempt to resume an existing upload
+      const existingId = localStorage.getItem(key);
+      if (existingId) {
+        try {
+          const res = await api.get(`buckets/uploads/${existingId}`);
+          if (!res.data.completed) {
+            upload = res.data;
+            for (const part of res.data.parts as UploadedPart[]) {
+              uploaded.add(part.part_number);
+            }
+          }
+        } catch (err) {
+          localStorage.removeItem(key);
+        }
+      }
+      if (!upload) {
+        const res = await api.post('buckets/uploads', {
+          filename: file.name,
+          content_type: file.type || 'application/octet-stream',
+          purpose: purpose,
+          size: file.size,
+        });
+        upload = res.data as ResumableUpload;
+        localStorage.setItem(key, upload.upload_id);
+      }
+      const { upload_id, part_size } = upload;
+      const numParts = Math.max(1, Math.ceil(file.size / part_size));
+      const pending: number[] = [];
+      for (let partNumber = 1; partNumber <= numParts; partNumber++) {
+        if (!uploaded.has(partNumber)) {
+          pending.push(partNumber);
+        }
+      }
+      let done = numParts - pending.length;
+      onProgress?.(done / numParts);
+      const uploadPart = async (partNumber: number) => {
+        const blob = file.slice(
+          (partNumber - 1) * part_size,
+          partNumber * part_size
+        );
+        for (let attempt = 1; ; attempt++) {
+          try {
+            await api.put(
+              `buckets/uploads/${upload_id}/parts/${partNumber}`,
+              blob,
+              { headers: { 'Content-Type': 'application/octet-stream' } }
+            );
+            return;
+          } catch (err) {
+            if (attempt >= MAX_PART_RETRIES) {
+              throw err;
+            }
+            // Exponential backoff before retrying part
+            await new Promise((resolve) =>
+              setTimeout(resolve, 500 * 2 ** attempt)
+            );
+          }
+        }
+      };
+      const worker = async () => {
+        let partNumber: number | undefined;
+        while ((partNumber = pending.shift()) !== undefined) {
+          await uploadPart(partNumber);
+          done++;
+          onProgress?.(done / numParts);
+        }
+      };
+      await Promise.all(
+        Array.from({ length: Math.min(concurrency, pending.length) }, worker)
+      );
+      const res = await api.post(`buckets/uploads/${upload_id}/complete`);
+      localStorage.removeItem(key);
+      return res.data;
+    },
     /**
      * Replaces a video on the server and returns the URL
      * @param videoFile Video file to upload
@@ -0,0 +1,449 @@
+"""Load test and latency benchmark for inference services.
+
+Sends a mix of requests at one or more concurrency levels, and reports
+p50/p95/p99 latency and throughput, optionally as a JSON report for the
+performance section of a model card. Targets are either:
+
+- a running Gradio app, over HTTP (--url)
+- the predict function of an app, imported directly (--predict)
+- a stand-in predict function which only sleeps (--stand-in), to check
+  the harness itself (e.g in CI) without a model
+
+Examples:
+
+    python benchmark.py --url http://localhost:8080 \
+        --mix mixes/zero-shot.json -c 1,4,16 -n 200 -o report.json
+    python benchmark.py --predict ../examples/xlm-roberta/src/predict.py \
+        -c 1,8 -n 100
+    python benchmark.py --stand-in -c 1,8 -n 100
+"""
+import argparse
+import base64
+import importlib
+import json
+import math
+import mimetypes
+import os
+import platform
+import random
+import sys
+import threading
+import time
+import urllib.request
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Called with the inputs of a request, raises on failure
+Target = Callable[[List[Any]], Any]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Percentile with linear interpolation between closest ranks
+
+    Args:
+        values (List[float]): Sorted values
+        q (float): Percentile, between 0 and 100
+
+    Returns:
+        float: Value at the percentile
+    """
+    if len(values) == 0:
+        return math.nan
+    rank = (len(values) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Latency statistics in milliseconds
+
+    Args:
+        latencies (List[float]): Latencies in seconds
+
+    Returns:
+        Dict[str, float]: p50, p95, p99, mean, min and max
+    """
+    values = sorted(latency * 1000 for latency in latencies)
+    if len(values) == 0:
+        return {}
+    return {
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "mean": sum(values) / len(values),
+        "min": values[0],
+        "max": values[-1],
+    }
+
+
+def load_mix(path: str) -> List[Dict[str, Any]]:
+    """Loads a request mix, a JSON list of requests like
+    {"name": "short", "inputs": ["Hello world", "greeting,insult"],
+    "weight": 3}. An input of {"file": "cat.jpg"} is a file, relative
+    to the mix file.
+
+    Args:
+        path (str): Path to JSON file
+
+    Returns:
+        List[Dict[str, Any]]: Requests with name, inputs and weight
+    """
+    with open(path, encoding="utf-8") as f:
+        mix = json.load(f)
+    base_dir = Path(path).resolve().parent
+    for i, request in enumerate(mix):
+        request.setdefault("name", f"request-{i}")
+        request.setdefault("weight", 1)
+        request["inputs"] = [
+            {"file": str(base_dir / value["file"])}
+            if isinstance(value, dict) and "file" in value
+            else value
+            for value in request["inputs"]
+        ]
+    return mix
+
+
+def http_target(url: str, api_path: str, timeout: float) -> Target:
+    """Calls the predict API of a Gradio app, which takes
+    {"data": [inputs...]} for both Gradio 2 and 3
+
+    Args:
+        url (str): Base URL of the app
+        api_path (str): Path of the predict API
+        timeout (float): Seconds to wait for each response
+
+    Returns:
+        Target: Sends a request
+    """
+    endpoint = url.rstrip("/") + api_path
+
+    def encode(value: Any) -> Any:
+        # Gradio takes files as base64 data URLs
+        if isinstance(value, dict) and "file" in value:
+            mime = mimetypes.guess_type(value["file"])[0]
+            with open(value["file"], "rb") as f:
+                data = base64.b64encode(f.read()).decode()
+            return f"data:{mime or 'application/octet-stream'};base64,{data}"
+        return value
+
+    def send(inputs: List[Any]) -> Any:
+        body = json.dumps(
+            {"data": [encode(value) for value in inputs], "fn_index": 0}
+        ).encode()
+        request = urllib.request.Request(
+            endpoint,
+            data=body,
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            result = json.loads(response.read())
+        if "error" in result and result["error"]:
+            raise RuntimeError(result["error"])
+        return result.get("data")
+
+    return send
+
+
+def import_predict(path: str) -> Any:
+    """Imports the predict module of an app, the same way app.py does
+
+    Args:
+        path (str): Path to predict.py
+
+    Returns:
+        Any: Predict module
+    """
+    module_path = Path(path).resolve()
+    # Apps import their siblings (e.g config) as top level modules
+    sys.path.insert(0, str(module_path.parent))
+    module = importlib.import_module(module_path.stem)
+    try:
+        from inference_engine.lazy import LazyLoader
+
+        LazyLoader.wait_all()
+    except ImportError:
+        pass
+    return module
+
+
+def predict_target(module: Any, function: str) -> Target:
+    """Calls the predict function of an app directly
+
+    Args:
+        module (Any): Predict module
+        function (str): Name of the function
+
+    Returns:
+        Target: Sends a request
+    """
+    fn = getattr(module, function)
+
+    def send(inputs: List[Any]) -> Any:
+        # Files are passed as paths, like Gradio "filepath" inputs
+        return fn(
+            *(
+                value["file"] if isinstance(value, dict) else value
+                for value in inputs
+            )
+        )
+
+    return send
+
+
+def stand_in_target(latency_ms: float, jitter_ms: float, seed: int) -> Target:
+    """A predict function which only sleeps, with a lock so that calls
+    are serialized like a model on a single device
+
+    Args:
+        latency_ms (float): Mean time per call
+        jitter_ms (float): Standard deviation of time per call
+        seed (int): Random seed
+
+    Returns:
+        Target: Sends a request
+    """
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def send(inputs: List[Any]) -> Any:
+        with lock:
+            time.sleep(max(rng.gauss(latency_ms, jitter_ms), 0) / 1000)
+        return inputs
+
+    return send
+
+
+def run_level(
+    target: Target,
+    mix: List[Dict[str, Any]],
+    concurrency: int,
+    num_requests: int,
+    duration: Optional[float],
+    seed: int,
+) -> Dict[str, Any]:
+    """Sends requests from `concurrency` threads, each sending its next
+    request as soon as the previous one returns
+
+    Args:
+        target (Target): Target to send requests to
+        mix (List[Dict[str, Any]]): Weighted requests to pick from
+        concurrency (int): Number of concurrent clients
+        num_requests (int): Total requests to send
+        duration (Optional[float]): If set, send requests for this many
+            seconds instead
+        seed (int): Random seed for picking requests
+
+    Returns:
+        Dict[str, Any]: Results of the level
+    """
+    rng = random.Random(seed)
+    weights = [request["weight"] for request in mix]
+    lock = threading.Lock()
+    sent = 0
+    # (request name, latency in seconds, error)
+    records: List[tuple] = []
+
+    def client():
+        nonlocal sent
+        while True:
+            with lock:
+                if duration is None and sent >= num_requests:
+                    return
+                if duration is not None and time.perf_counter() > deadline:
+                    return
+                sent += 1
+                request = rng.choices(mix, weights)[0]
+            error = None
+            start = time.perf_counter()
+            try:
+                target(request["inputs"])
+            except Exception as err:
+                error = f"{type(err).__name__}: {err}"
+            latency = time.perf_counter() - start
+            with lock:
+                records.append((request["name"], latency, error))
+
+    start = time.perf_counter()
+    deadline = start + (duration or 0)
+    clients = [
+        threading.Thread(target=client, name=f"client-{i}")
+        for i in range(concurrency)
+    ]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    ok = [record for record in records if record[2] is None]
+    errors = [record[2] for record in records if record[2] is not None]
+    by_request = {}
+    for request in mix:
+        latencies = [r[1] for r in ok if r[0] == request["name"]]
+        by_request[request["name"]] = {
+            "requests": len(latencies),
+            "latency_ms": summarize(latencies),
+        }
+    return {
+        "concurrency": concurrency,
+        "requests": len(records),
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+        "duration_seconds": elapsed,
+        "throughput_rps": len(ok) / elapsed if elapsed > 0 else 0.0,
+        "latency_ms": summarize([record[1] for record in ok]),
+        "by_request": by_request,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="\n".join(__doc__.splitlines()[2:]),
+    )
+    target_group = parser.add_mutually_exclusive_group(required=True)
+    target_group.add_argument("--url", help="Base URL of a Gradio app")
+    target_group.add_argument(
+        "--predict", help="Path to the predict.py of an app"
+    )
+    target_group.add_argument(
+        "--stand-in", action="store_true", help="Use a sleeping stand-in"
+    )
+    parser.add_argument(
+        "--function", default="predict", help="Function of --predict"
+    )
+    parser.add_argument(
+        "--api-path", default="/api/predict/", help="Predict API of --url"
+    )
+    parser.add_argument(
+        "--mix",
+        help="JSON request mix, defaults to the examples of --predict",
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        default="1,4,16",
+        help="Comma separated concurrency levels",
+    )
+    parser.add_argument(
+        "-n", "--requests", type=int, default=100, help="Requests per level"
+    )
+    parser.add_argument(
+        "-d",
+        "--duration",
+        type=float,
+        default=None,
+        help="Seconds per level, instead of a number of requests",
+    )
+    parser.add_argument(
+        "-w", "--warmup", type=int, default=5, help="Requests before timing"
+    )
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--stand-in-latency-ms", type=float, default=20)
+    parser.add_argument("--stand-in-jitter-ms", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--max-error-rate",
+        type=float,
+        default=None,
+        help="Exit with an error if a level has more errors than this",
+    )
+    parser.add_argument("-o", "--output", help="Path to save JSON report to")
+    args = parser.parse_args()
+
+    mix = load_mix(args.mix) if args.mix else None
+    if args.url:
+        target = http_target(args.url, args.api_path, args.timeout)
+        description = {"type": "http", "url": args.url}
+    elif args.predict:
+        module = import_predict(args.predict)
+        target = predict_target(module, args.function)
+        description = {
+            "type": "predict",
+            "path": args.predict,
+            "function": args.function,
+        }
+        if mix is None and getattr(module, "examples", None):
+            mix = [
+                {
+                    "name": f"example-{i}",
+                    "inputs": list(example)
+                    if isinstance(example, (list, tuple))
+                    else [example],
+                    "weight": 1,
+                }
+                for i, example in enumerate(module.examples)
+            ]
+    else:
+        target = stand_in_target(
+            args.stand_in_latency_ms, args.stand_in_jitter_ms, args.seed
+        )
+        description = {
+            "type": "stand-in",
+            "latency_ms": args.stand_in_latency_ms,
+            "jitter_ms": args.stand_in_jitter_ms,
+        }
+        mix = mix or [{"name": "stand-in", "inputs": ["hello"], "weight": 1}]
+    if not mix:
+        parser.error("--mix is required when the target has no examples")
+
+    for i in range(args.warmup):
+        target(mix[i % len(mix)]["inputs"])
+
+    report = {
+        "target": description,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "settings": {
+            "requests_per_level": None if args.duration else args.requests,
+            "duration_seconds": args.duration,
+            "warmup": args.warmup,
+            "mix": [
+                {"name": request["name"], "weight": request["weight"]}
+                for request in mix
+            ],
+        },
+        "results": [],
+    }
+    print(
+        f"{'clients':>7} {'requests':>8} {'errors':>6} {'req/s':>8} "
+        + f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    failed = False
+    for level in (int(c) for c in args.concurrency.split(",")):
+        result = run_level(
+            target, mix, level, args.requests, args.duration, args.seed
+        )
+        report["results"].append(result)
+        latency = result["latency_ms"]
+        print(
+            f"{level:>7} {result['requests']:>8} {result['errors']:>6} "
+            + f"{result['throughput_rps']:>8.1f} "
+            + " ".join(
+                f"{latency.get(key, math.nan):>8.1f}"
+                for key in ("p50", "p95", "p99")
+            )
+        )
+        error_rate = result["errors"] / max(result["requests"], 1)
+        if args.max_error_rate is not None and (
+            error_rate > args.max_error_rate
+        ):
+            failed = True
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved report to {args.output}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
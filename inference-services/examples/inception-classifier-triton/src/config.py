@@ -30,6 +30,31 @@ class Config(BaseSettings):
         default=10, env="TOP_K", description="Top k results to show"
     )
 
+    # Batching Settings
+    batch_max_size: int = Field(
+        default=8,
+        env="BATCH_MAX_SIZE",
+        description="Max requests per model call, 1 disables batching",
+    )
+    batch_max_latency_ms: float = Field(
+        default=10,
+        env="BATCH_MAX_LATENCY_MS",
+        description="Max time to wait for a batch to fill up",
+    )
+
+    # Result Cache Settings
+    cache_max_bytes: int = Field(
+        default=0,
+        env="CACHE_MAX_BYTES",
+        description="Memory for results of repeated inputs (e.g examples), "
+        + "0 disables the cache. Only for deterministic predictions",
+    )
+    cache_ttl_seconds: float = Field(
+        default=3600,
+        env="CACHE_TTL_SECONDS",
+        description="Seconds before a cached result expires, 0 to never expire",
+    )
+
     # Triton Settings
     triton_url: str = Field(default="localhost:8001", env="TRITON_URL")
     triton_mode: TritonMode = Field(
@@ -52,22 +77,53 @@ class Config(BaseSettings):
     triton_client_timeout: float = Field(
         default=300, env="TRITON_CLIENT_TIMEOUT"
     )
+    triton_health_check_interval: float = Field(
+        default=5,
+        env="TRITON_HEALTH_CHECK_INTERVAL",
+        description="Seconds between background readiness checks",
+    )
+    triton_idle_unload_seconds: float = Field(
+        default=300,
+        env="TRITON_IDLE_UNLOAD_SECONDS",
+        description="In explicit mode, unload the model after this many "
+        + "seconds without requests. If negative, never unload",
+    )
+    triton_shared_memory: bool = Field(
+        default=False,
+        env="TRITON_SHARED_MEMORY",
+        description="Send inputs through system shared memory. Requires "
+        + "Triton to share /dev/shm with the app (e.g sidecar in same pod)",
+    )
 
     # Model Settings
     model_name: str = Field(default="inception_graphdef", env="MODEL_NAME")
     model_version: str = Field(default="1", env="MODEL_VERSION")
-    num_labels: int = Field(default=1001, env="NUM_LABELS")
-    img_width: int = Field(default=299, env="IMG_WIDTH")
-    img_height: int = Field(default=299, env="IMG_HEIGHT")
-    img_tensor_format: TensorFormat = Field(
-        default=TensorFormat.nhwc, env="TENSOR_FORMAT"
+    # Left unset, the layers, image size, tensor format and number of
+    # labels are read from the model config in Triton
+    num_labels: Optional[int] = Field(default=None, env="NUM_LABELS")
+    labels_path: Optional[str] = Field(
+        default=None,
+        env="LABELS_PATH",
+        description="File with one label per line. If set, labels are "
+        + "looked up locally instead of decoded from Triton's output",
+    )
+    img_width: Optional[int] = Field(default=None, env="IMG_WIDTH")
+    img_height: Optional[int] = Field(default=None, env="IMG_HEIGHT")
+    img_tensor_format: Optional[TensorFormat] = Field(
+        default=None, env="TENSOR_FORMAT"
     )
     normalize_img: bool = Field(default=True, env="NORMALIZE_IMG")
     normalize_mean: float = Field(default=127.5, env="NORMALIZE_MEAN")
     normalize_std: float = Field(default=127.5, env="NORMALIZE_STD")
-    input_layer: str = Field(default="input", env="INPUT_LAYER")
-    output_layer: str = Field(
-        default="InceptionV3/Predictions/Softmax", env="OUTPUT_LAYER"
+    input_layer: Optional[str] = Field(
+        default=None,
+        env="INPUT_LAYER",
+        description="Defaults to the first input of the model",
+    )
+    output_layer: Optional[str] = Field(
+        default=None,
+        env="OUTPUT_LAYER",
+        description="Defaults to the first output of the model",
     )
 
 
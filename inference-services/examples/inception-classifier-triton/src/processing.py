@@ -0,0 +1,187 @@
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from PIL import Image
+
+
+class ImagePreprocessor:
+    """Converts images into a model input batch without temporaries.
+
+    Each image is cast, normalized and transposed in a single pass,
+    straight into a preallocated contiguous batch buffer. Buffers are
+    reused across requests, with one buffer per thread so that
+    concurrent requests never share one.
+    """
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        tensor_format: str,
+        max_batch_size: int = 1,
+        mean: Optional[float] = None,
+        std: Optional[float] = None,
+    ):
+        """Initialize the preprocessor
+
+        :param width: Image width
+        :type width: int
+        :param height: Image height
+        :type height: int
+        :param tensor_format: Layout of the model input, either
+            "NHWC" or "NCHW" (see config.TensorFormat)
+        :type tensor_format: str
+        :param max_batch_size: Number of images the buffer holds. Larger
+            batches get a temporary buffer, defaults to 1
+        :type max_batch_size: int, optional
+        :param mean: Value to subtract, None to skip normalization,
+            defaults to None
+        :type mean: Optional[float], optional
+        :param std: Value to divide by, defaults to None
+        :type std: Optional[float], optional
+        """
+        # Width, Height of the images taken in
+        self.size = (width, height)
+        if tensor_format == "NHWC":
+            self.image_shape = (height, width, 3)
+            # Images are Width, Height, 3, convert to Height, Width, 3
+            self.axes = (1, 0, 2)
+        elif tensor_format == "NCHW":
+            self.image_shape = (3, height, width)
+            # Convert to 3, Height, Width
+            self.axes = (2, 1, 0)
+        else:
+            raise NotImplementedError("Format not supported yet")
+        self.max_batch_size = max(1, max_batch_size)
+        self.mean = mean
+        self.scale = None if mean is None else 1 / (std or 1)
+        self._local = threading.local()
+
+    def _buffer(self, batch_size: int) -> np.ndarray:
+        if batch_size > self.max_batch_size:
+            return np.empty((batch_size, *self.image_shape), np.float32)
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            buffer = np.empty(
+                (self.max_batch_size, *self.image_shape), np.float32
+            )
+            self._local.buffer = buffer
+        return buffer[:batch_size]
+
+    def __call__(self, images: List[np.ndarray]) -> np.ndarray:
+        """Preprocess a batch of images
+
+        :param images: RGB images
+        :type images: List[np.ndarray]
+        :return: Contiguous FP32 batch. It is overwritten by the next
+            call from the same thread
+        :rtype: np.ndarray
+        """
+        batch = self._buffer(len(images))
+        for image, out in zip(images, batch):
+            if image.shape[:2] != self.size:
+                image = self.resize(image)
+            # Transposing only creates a view, the copy happens below
+            image = image.transpose(self.axes)
+            if self.mean is None:
+                np.copyto(out, image, casting="unsafe")
+            else:
+                np.subtract(image, self.mean, out=out, casting="unsafe")
+                out *= self.scale
+        return batch
+
+    def resize(self, image: np.ndarray) -> np.ndarray:
+        """Resize an image to the model input size, e.g when the
+        input component does not resize uploads
+
+        :param image: RGB image
+        :type image: np.ndarray
+        :return: Resized image
+        :rtype: np.ndarray
+        """
+        width, height = self.size
+        # PIL sizes are the reverse of the array's first two axes
+        return np.asarray(
+            Image.fromarray(image.astype(np.uint8, copy=False)).resize(
+                (height, width), Image.BILINEAR
+            )
+        )
+
+
+class LabelTable:
+    """Decodes classification results using precomputed label strings."""
+
+    def __init__(self, labels: Optional[List[str]] = None):
+        """Initialize the table
+
+        :param labels: Label of each class index. If None, labels are
+            taken from Triton's class_count output, defaults to None
+        :type labels: Optional[List[str]], optional
+        """
+        self.labels = labels
+        # Maps the "index:label" suffix of a class_count result to
+        # its decoded label, so each label is only decoded once
+        self._suffixes: Dict[bytes, str] = {}
+
+    @classmethod
+    def from_file(cls, path: str) -> "LabelTable":
+        """Load labels from a file with one label per line,
+        like a Triton labels file
+
+        :param path: Path to labels file
+        :type path: str
+        :return: Label table
+        :rtype: LabelTable
+        """
+        with open(path, encoding="utf-8") as f:
+            return cls([line.strip() for line in f])
+
+    def top_k(self, probs: np.ndarray, k: int) -> List[Dict[str, float]]:
+        """Decode the top k classes of raw model outputs
+
+        :param probs: Class probabilities with shape [batch, classes]
+        :type probs: np.ndarray
+        :param k: Number of classes to return per image
+        :type k: int
+        :return: Label to probability, for each image
+        :rtype: List[Dict[str, float]]
+        """
+        if self.labels is None:
+            raise ValueError("Labels are required to decode raw outputs")
+        k = min(k, probs.shape[1])
+        # Partial sort, only the top k are ordered
+        indices = np.argpartition(-probs, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(probs, indices, axis=1)
+        return [
+            {self.labels[i]: score for i, score in zip(row, row_scores)}
+            for row, row_scores in zip(indices.tolist(), scores.tolist())
+        ]
+
+    def decode(self, preds: np.ndarray) -> List[Dict[str, float]]:
+        """Decode Triton class_count outputs ("confidence:index:label")
+
+        :param preds: Byte strings with shape [batch, class_count]
+        :type preds: np.ndarray
+        :return: Label to probability, for each image
+        :rtype: List[Dict[str, float]]
+        """
+        results = []
+        for row in preds.tolist():
+            image_results = {}
+            for result in row:
+                confidence, _, suffix = result.partition(b":")
+                label = self._suffixes.get(suffix)
+                if label is None:
+                    label = self._label(suffix)
+                    self._suffixes[suffix] = label
+                image_results[label] = float(confidence)
+            results.append(image_results)
+        return results
+
+    def _label(self, suffix: bytes) -> str:
+        index, _, label = suffix.partition(b":")
+        if self.labels is not None:
+            return self.labels[int(index)]
+        # Without a labels file on the server, only the index is returned
+        return (label or index).decode("utf-8")
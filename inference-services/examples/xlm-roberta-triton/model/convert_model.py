@@ -12,17 +12,21 @@ tokenizer = XLMRobertaTokenizer.from_pretrained(
 )
 
 premise = "Earth is warming up"
-hypothesis = "This text is about climate change"
+hypotheses = [
+    "This text is about climate change",
+    "This text is about sports",
+]
 
 # run through model pre-trained on MNLI
-x = tokenizer.encode(
-    premise,
-    hypothesis,
+# Trace with a batch of pairs, as predict scores all labels in one batch
+x = tokenizer(
+    [premise] * len(hypotheses),
+    hypotheses,
     return_tensors="pt",
     truncation=True,
     max_length=256,
     padding="max_length",
-)
+)["input_ids"]
 
 mask = x != 1
 mask = mask.long()
@@ -44,3 +48,30 @@ class PyTorch_to_TorchScript(torch.nn.Module):
 model = PyTorch_to_TorchScript().eval()
 tracer = torch.jit.trace(model, (x, mask))
 tracer.save("xlm_roberta_zsl/1/model.pt")
+
+# The batch and sequence dimensions are dynamic in config.pbtxt
+# (max_batch_size: 16, dims: [-1]), so check the traced model still
+# matches the original model at other batch sizes and lengths
+with torch.no_grad():
+    for batch_size in (1, 2, 16):
+        for length in (32, 64, 128, 256, 512):
+            # Cycle through the hypotheses to fill the batch
+            batch_hypotheses = [
+                hypotheses[i % len(hypotheses)] for i in range(batch_size)
+            ]
+            x_test = tokenizer(
+                [premise] * batch_size,
+                batch_hypotheses,
+                return_tensors="pt",
+                truncation=True,
+                max_length=length,
+                padding="max_length",
+            )["input_ids"]
+            mask_test = (x_test != 1).long()
+            expected = model(x_test, mask_test)[0]
+            actual = tracer(x_test, mask_test)[0]
+            assert actual.shape == (batch_size, 3), (batch_size, length)
+            assert torch.allclose(expected, actual, atol=1e-4), (
+                batch_size,
+                length,
+            )
@@ -2,10 +2,13 @@ import logging
 
 import gradio as gr
 from config import config
-from predict import examples, inputs, outputs, predict
+from inference_engine.health import readiness
+from predict import examples, inputs, outputs, predict, warmup
 
 if __name__ == "__main__":
     logging.basicConfig(format="[%(asctime)s] %(levelname)s: %(message)s")
+    # Ready (GET /ready) once the model has been warmed up
+    readiness.start(warmup)
     app = gr.Interface(
         predict,
         inputs=inputs,
@@ -14,6 +17,9 @@ if __name__ == "__main__":
         description="Zero Shot Inference using a Roberta model",
         examples=examples,
     )
+    from gradio.routes import app as server_app
+
+    readiness.add_route(server_app)
     app.launch(
         server_name="0.0.0.0", server_port=config.port, enable_queue=True
     )
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import AnyUrl, BaseSettings, Field
 
@@ -25,6 +25,19 @@ class Config(BaseSettings):
         default=10, env="TOP_K", description="Top k results to show"
     )
 
+    # Result Cache Settings
+    cache_max_bytes: int = Field(
+        default=0,
+        env="CACHE_MAX_BYTES",
+        description="Memory for results of repeated inputs (e.g examples), "
+        + "0 disables the cache. Only for deterministic predictions",
+    )
+    cache_ttl_seconds: float = Field(
+        default=3600,
+        env="CACHE_TTL_SECONDS",
+        description="Seconds before a cached result expires, 0 to never expire",
+    )
+
     # Triton Settings
     triton_url: str = Field(default="localhost:8001", env="TRITON_URL")
     triton_mode: TritonMode = Field(
@@ -47,10 +60,39 @@ class Config(BaseSettings):
     triton_client_timeout: float = Field(
         default=300, env="TRITON_CLIENT_TIMEOUT"
     )
+    triton_health_check_interval: float = Field(
+        default=5,
+        env="TRITON_HEALTH_CHECK_INTERVAL",
+        description="Seconds between background readiness checks",
+    )
+    triton_idle_unload_seconds: float = Field(
+        default=300,
+        env="TRITON_IDLE_UNLOAD_SECONDS",
+        description="In explicit mode, unload the model after this many "
+        + "seconds without requests. If negative, never unload",
+    )
 
     # Model Settings
     model_name: str = Field(default="xlm_roberta_zsl", env="MODEL_NAME")
     model_version: str = Field(default="1", env="MODEL_VERSION")
+    tokenizer_path: str = Field(
+        default="joeddav/xlm-roberta-large-xnli",
+        env="TOKENIZER_PATH",
+        description="Local directory or Hugging Face Hub name of tokenizer",
+    )
+    max_seq_length: int = Field(default=256, env="MAX_SEQ_LENGTH")
+    seq_length_buckets: List[int] = Field(
+        default=[32, 64, 128, 256],
+        env="SEQ_LENGTH_BUCKETS",
+        description="Pad each batch to the smallest bucket that fits. "
+        + "If empty, always pad to max_seq_length (for fixed shape models)",
+    )
+    max_batch_size: Optional[int] = Field(
+        default=None,
+        env="MAX_BATCH_SIZE",
+        description="Max labels per request, defaults to the "
+        + "max_batch_size in the model config",
+    )
 
 
 config = Config()
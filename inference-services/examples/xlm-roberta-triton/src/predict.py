@@ -1,13 +1,21 @@
 import logging
-from typing import Dict, Optional
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
 import gradio.inputs as gr_inputs
 import gradio.outputs as gr_outputs
 import numpy as np
 import tritonclient.grpc as tr
-from config import config
-from transformers import XLMRobertaTokenizer
-from triton_utils import get_client, load_model, unload_model
+from config import TritonMode, config
+from inference_engine.cache import ResultCache, content_key
+from inference_engine.health import readiness
+from inference_engine.lazy import LazyLoader
+from inference_engine.triton_utils import (
+    ModelManager,
+    ModelSpec,
+    TensorSpec,
+    TritonClient,
+)
 
 inputs = [
     gr_inputs.Textbox(placeholder="Text to classify", label="Text"),
@@ -18,9 +26,105 @@ inputs = [
 outputs = gr_outputs.Label(num_top_classes=config.top_k)
 examples = [["Hello world", "greeting,insult"]]
 
-tokenizer = XLMRobertaTokenizer.from_pretrained(
-    "joeddav/xlm-roberta-large-xnli"
-)  # TODO: Cache vocab file first to improve cold start time
+
+def load_tokenizer():
+    # transformers is slow to import, so only import it when loading
+    from transformers import AutoTokenizer
+
+    # Loads the fast tokenizer from a local directory, if the image was
+    # built with a baked tokenizer (inference_engine.save_huggingface_cache)
+    return AutoTokenizer.from_pretrained(config.tokenizer_path, use_fast=True)
+
+
+# Starts loading while the app starts up
+tokenizer = LazyLoader(load_tokenizer, "tokenizer").start()
+
+
+# Shared by all requests, so that the gRPC channel is reused
+triton = TritonClient(
+    config.triton_url,
+    config.model_name,
+    config.model_version,
+    ssl=config.triton_ssl,
+    root_certificates=config.triton_root_certs,
+    private_key=config.triton_private_key,
+    certificate_chain=config.triton_cert_chain,
+    health_check_interval=config.triton_health_check_interval,
+)
+
+# Keeps the model loaded while requests are flowing in explicit mode
+models = ModelManager(
+    triton,
+    explicit=config.triton_mode == TritonMode.explicit,
+    idle_timeout=config.triton_idle_unload_seconds,
+)
+
+
+class ModelIO(NamedTuple):
+    """How to call the model, from the config and the model in Triton"""
+
+    token_ids: TensorSpec
+    mask: TensorSpec
+    output: TensorSpec
+    batch_size: int
+    # False if the model does not take a batch dimension
+    batched: bool
+    # Sequence length of fixed shape models, else None
+    seq_length: Optional[int]
+
+
+def create_model_io(spec: ModelSpec) -> ModelIO:
+    """Works out how to call the model. The first two inputs are
+    taken as the token IDs and the attention mask
+
+    :param spec: Model config from Triton
+    :type spec: ModelSpec
+    :raises ValueError: If the model takes less than two inputs
+    :return: Model IO
+    :rtype: ModelIO
+    """
+    if len(spec.inputs) < 2:
+        raise ValueError(
+            f"Model {spec.name} should take token IDs and an attention mask"
+        )
+    token_ids, mask = spec.inputs[:2]
+    seq_length = token_ids.dims[-1] if token_ids.dims else -1
+    return ModelIO(
+        token_ids=token_ids,
+        mask=mask,
+        output=spec.output(),
+        batch_size=spec.batch_size(
+            config.max_batch_size or spec.max_batch_size
+        ),
+        batched=spec.max_batch_size > 0,
+        seq_length=seq_length if seq_length > 0 else None,
+    )
+
+
+model_io: Optional[ModelIO] = None
+model_io_lock = threading.Lock()
+
+
+def get_model_io() -> ModelIO:
+    """Model IO, created once the model config is known
+
+    :return: Model IO
+    :rtype: ModelIO
+    """
+    global model_io
+    with model_io_lock:
+        if model_io is None:
+            model_io = create_model_io(triton.model_spec())
+            logging.info(f"Model IO: {model_io}")
+        return model_io
+
+
+if config.triton_mode == TritonMode.polling:
+    # The model is already loaded, so the config can be fetched now
+    triton.prefetch_model_spec()
+    # Stop traffic while Triton is down. Not in explicit mode, where
+    # the model is unloaded while idle
+    readiness.add_check(lambda: triton.ready)
 
 
 def softmax(x: np.ndarray, axis: Optional[int] = None) -> np.ndarray:
@@ -38,91 +142,165 @@ def softmax(x: np.ndarray, axis: Optional[int] = None) -> np.ndarray:
     return exp_x_shifted / np.sum(exp_x_shifted, axis=axis, keepdims=True)
 
 
-def get_probability(logits: np.ndarray) -> float:
+def get_probabilities(logits: np.ndarray) -> np.ndarray:
     """Get probabilty that a text is
-    of a proposed class
+    of each proposed class
 
-    :param logits: Model logits
+    :param logits: Model logits, one row per proposed class
     :type logits: np.ndarray
-    :return: Probability (0-1)
-    :rtype: float
+    :return: Probabilities (0-1), one per proposed class
+    :rtype: np.ndarray
     """
     logits = logits.astype(np.float32)
-    # Model gives prob of 2 classes (neutral, entailment)
+    # Model gives logits of 3 classes (contradiction, neutral, entailment)
     # entailment is the probability that a statement supports
     # a hypothesis (e.g hypo = This example is {label})
     entail_contradiction_logits = logits[:, [0, 2]]
-    probs = softmax(entail_contradiction_logits)
-    true_prob = probs[:, 1].item()  # Entailment prob
-    return true_prob
+    probs = softmax(entail_contradiction_logits, axis=1)
+    return probs[:, 1]  # Entailment prob
 
 
-def predict(text: str, classes: str) -> Dict[str, float]:
-    """Takes in an image, and
-    calls Triton to infer it's class
+def bucket_length(length: int) -> int:
+    """Get the padded length of a batch
+
+    :param length: Length of the longest sequence in the batch
+    :type length: int
+    :return: Smallest configured bucket that fits the batch, or
+        max_seq_length if no buckets are configured
+    :rtype: int
+    """
+    for bucket in sorted(config.seq_length_buckets):
+        if length <= bucket:
+            return min(bucket, config.max_seq_length)
+    return config.max_seq_length
+
+
+def pad_to_bucket(
+    token_ids: np.ndarray, mask: np.ndarray, length: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Pad or trim a batch along the sequence dimension,
+    to the bucket length of its longest sequence
 
-    :param image: Image
-    :type image: np.ndarray
+    :param token_ids: Token IDs, padded to the longest sequence or more
+    :type token_ids: np.ndarray
+    :param mask: Attention mask
+    :type mask: np.ndarray
+    :param length: Fixed length to use instead of a bucket,
+        defaults to None
+    :type length: Optional[int], optional
+    :return: Token IDs and attention mask with bucketed sequence length
+    :rtype: Tuple[np.ndarray, np.ndarray]
+    """
+    if length is None:
+        length = bucket_length(int(mask.sum(axis=1).max()))
+    if length <= token_ids.shape[1]:
+        return token_ids[:, :length], mask[:, :length]
+    pad_width = ((0, 0), (0, length - token_ids.shape[1]))
+    return (
+        np.pad(
+            token_ids, pad_width, constant_values=tokenizer.get().pad_token_id
+        ),
+        np.pad(mask, pad_width, constant_values=0),
+    )
+
+
+def parse_labels(classes: str) -> List[str]:
+    """Split comma separated labels, dropping empty and duplicate labels
+
+    :param classes: Comma separated labels
+    :type classes: str
+    :return: Labels
+    :rtype: List[str]
+    """
+    labels = (label.strip() for label in classes.split(","))
+    return list(dict.fromkeys(label for label in labels if label))
+
+
+# Opt-in (CACHE_MAX_BYTES), repeated requests skip Triton
+cache = ResultCache(config.cache_max_bytes, config.cache_ttl_seconds)
+
+
+def classify(text: str, labels: List[str]) -> Dict[str, float]:
+    """Calls Triton to score every label in a single batch
+
+    :param text: Text to classify
+    :type text: str
+    :param labels: Possible labels
+    :type labels: List[str]
     :return: Predicted classes with confidence
     :rtype: Dict[str, float]
     """
-    # Initialize Triton GRPC Client
-    logging.info("Request received")
-    client = get_client(
-        config.triton_url,
-        config.triton_ssl,
-        config.triton_root_certs,
-        config.triton_private_key,
-        config.triton_cert_chain,
-    )
-    logging.info("Loaded Triton client")
-    try:
-        load_model(
-            client,
-            config.model_name,
-            config.model_version,
-            config.triton_mode == "POLLING",
+    with models.use():
+        io = get_model_io()
+        # Tokenize every (premise, hypothesis) pair in one call
+        encoded = tokenizer.get()(
+            [text] * len(labels),
+            [f"This example is {label}." for label in labels],
+            max_length=min(
+                config.max_seq_length, io.seq_length or config.max_seq_length
+            ),
+            padding="longest",
+            truncation=True,
+            return_tensors="np",
         )
-        logging.info("Loaded model for inference")
-        # Perform preprocessing
-        # Tokenize Input
-        classes_list = classes.strip().split(",")
-        results = {}
-        text_input = tr.InferInput("input__0", [1, 256], "INT32")
-        mask_input = tr.InferInput("input__1", [1, 256], "INT32")
-        expected_output = tr.InferRequestedOutput("output__0")
-        for possible_label in classes_list:
-            hypothesis = f"This example is ${possible_label}"
-            token_ids = tokenizer.encode(
-                text,
-                hypothesis,
-                max_length=256,
-                padding="max_length",
-                truncation=True,
-            )
-            token_ids = np.array(token_ids, dtype=np.int32)
-            mask = token_ids != 1
-            mask = np.array(mask, dtype=np.int32)
-            mask = mask.reshape(1, 256)
-            token_ids = token_ids.reshape(1, 256)
-
-            # Set data
-            text_input.set_data_from_numpy(token_ids)
-            mask_input.set_data_from_numpy(mask)
+        token_ids = encoded["input_ids"].astype(io.token_ids.np_dtype)
+        mask = encoded["attention_mask"].astype(io.mask.np_dtype)
 
-            # Send Inference
+        # Send one request per chunk of up to batch_size labels,
+        # each only padded as far as its longest pair needs
+        logits = []
+        for start in range(0, len(labels), io.batch_size):
+            end = start + io.batch_size
+            chunk_ids, chunk_mask = pad_to_bucket(
+                token_ids[start:end], mask[start:end], io.seq_length
+            )
+            if not io.batched:
+                chunk_ids, chunk_mask = chunk_ids[0], chunk_mask[0]
+            text_input = tr.InferInput(
+                io.token_ids.name, list(chunk_ids.shape), io.token_ids.datatype
+            )
+            mask_input = tr.InferInput(
+                io.mask.name, list(chunk_mask.shape), io.mask.datatype
+            )
+            text_input.set_data_from_numpy(np.ascontiguousarray(chunk_ids))
+            mask_input.set_data_from_numpy(np.ascontiguousarray(chunk_mask))
             logging.info("Sending infer request to Triton")
-            logits = client.infer(
-                model_name=config.model_name,
+            output = triton.infer(
                 inputs=[text_input, mask_input],
-                outputs=[expected_output],
+                outputs=[tr.InferRequestedOutput(io.output.name)],
                 client_timeout=config.triton_client_timeout,
-            ).as_numpy("output__0")
-            prob = get_probability(logits)
-            results[possible_label] = prob
-        return results
-    finally:
-        # No matter what, unload model after prediction
-        if config.triton_mode == "EXPLICIT" and client is not None:
-            logging.info("Unloading model")
-            unload_model(client, config.model_name)
+            ).as_numpy(io.output.name)
+            # One row per label, with or without a batch dimension
+            logits.append(output.reshape(-1, output.shape[-1]))
+        probs = get_probabilities(np.concatenate(logits))
+        return dict(zip(labels, probs.tolist()))
+
+
+def warmup():
+    """Classifies a text, so that the first request does not wait for
+    the tokenizer, the connection to Triton or the model to load
+    """
+    classify("Hello world", ["greeting", "insult"])
+
+
+def predict(text: str, classes: str) -> Dict[str, float]:
+    """Takes in a text and possible labels, and
+    calls Triton to score every label in a single batch
+
+    :param text: Text to classify
+    :type text: str
+    :param classes: Comma separated labels
+    :type classes: str
+    :return: Predicted classes with confidence
+    :rtype: Dict[str, float]
+    """
+    logging.info("Request received")
+    labels = parse_labels(classes)
+    if len(labels) == 0:
+        return {}
+    # Keyed on the parsed labels, so spacing and duplicates don't matter
+    result = cache.get_or_compute(
+        content_key(text, labels), lambda: classify(text, labels)
+    )
+    cache.log_metrics()
+    return result
@@ -0,0 +1,75 @@
+"""Export a sequence classification model to ONNX for ONNX Runtime.
+
+The batch and sequence axes are dynamic, so the exported model takes
+any number of (text, hypothesis) pairs of any length. With --quantize,
+weights are dynamically quantized to int8, which usually speeds up
+transformers on CPU for a small drop in accuracy.
+
+Serve the exported model with BACKEND=onnxruntime and ONNX_MODEL_PATH.
+"""
+import tempfile
+from pathlib import Path
+
+import click
+import torch
+from inference_engine.onnx_utils import quantize_model
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+
+@click.command()
+@click.option(
+    "-m",
+    "--model",
+    type=str,
+    required=True,
+    help="Model name or directory (e.g /artifacts/xlm-roberta-large-xnli).",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False),
+    required=True,
+    help="Path to save the ONNX model to.",
+)
+@click.option(
+    "-q",
+    "--quantize",
+    is_flag=True,
+    help="Save a dynamically int8 quantized model instead.",
+)
+@click.option("--opset", type=int, default=14, help="ONNX opset version.")
+def main(model: str, output: str, quantize: bool, opset: int):
+    tokenizer = AutoTokenizer.from_pretrained(model, use_fast=True)
+    hf_model = AutoModelForSequenceClassification.from_pretrained(model)
+    hf_model.config.return_dict = False
+    hf_model.eval()
+    # Any pairs work, the axes are dynamic
+    dummy = tokenizer(
+        ["Hello world", "Hello world"],
+        ["This example is greeting.", "This example is insult."],
+        return_tensors="pt",
+    )
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        export_path = str(Path(tmp_dir) / "model.onnx") if quantize else output
+        with torch.no_grad():
+            torch.onnx.export(
+                hf_model,
+                (dummy["input_ids"], dummy["attention_mask"]),
+                export_path,
+                input_names=["input_ids", "attention_mask"],
+                output_names=["logits"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "logits": {0: "batch"},
+                },
+                opset_version=opset,
+            )
+        if quantize:
+            quantize_model(export_path, output)
+    click.echo(f"Saved {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,10 @@ if __name__ == "__main__":
         description="Zero Shot Inference using a Roberta model",
         examples=examples,
     )
+    # The queue runs one request at a time, leaving nothing to batch,
+    # so it is only enabled if batching is disabled
     app.launch(
-        server_name="0.0.0.0", server_port=config.port, enable_queue=True
+        server_name="0.0.0.0",
+        server_port=config.port,
+        enable_queue=config.batch_max_size == 1,
     )
@@ -1,7 +1,20 @@
-import torch
+from enum import Enum
+
 from pydantic import BaseSettings, Field
 
 
+class Backend(str, Enum):
+    pytorch = "pytorch"
+    onnxruntime = "onnxruntime"
+
+
+class GraphOptimization(str, Enum):
+    disable = "disable"
+    basic = "basic"
+    extended = "extended"
+    all = "all"
+
+
 class Config(BaseSettings):
     """Define any config here.
 
@@ -18,12 +31,75 @@ class Config(BaseSettings):
         default=10, env="TOP_K", description="Top k results to show"
     )
 
+    # Batching Settings
+    batch_max_size: int = Field(
+        default=8,
+        env="BATCH_MAX_SIZE",
+        description="Max requests per model call, 1 disables batching",
+    )
+    batch_max_latency_ms: float = Field(
+        default=10,
+        env="BATCH_MAX_LATENCY_MS",
+        description="Max time to wait for a batch to fill up",
+    )
+
+    # Result Cache Settings
+    cache_max_bytes: int = Field(
+        default=0,
+        env="CACHE_MAX_BYTES",
+        description="Memory for results of repeated inputs (e.g examples), "
+        + "0 disables the cache. Only for deterministic predictions",
+    )
+    cache_ttl_seconds: float = Field(
+        default=3600,
+        env="CACHE_TTL_SECONDS",
+        description="Seconds before a cached result expires, 0 to never expire",
+    )
+
     # Model Settings
     model_name: str = Field(
         default="joeddav/xlm-roberta-large-xnli", env="MODEL_NAME"
     )
     device: str = Field(
-        default="cuda:0" if torch.cuda.is_available() else "cpu"
+        default="auto",
+        env="DEVICE",
+        description="Device to run on, auto uses a GPU if available",
+    )
+    backend: Backend = Field(default=Backend.pytorch, env="BACKEND")
+    batch_size: int = Field(
+        default=32,
+        env="BATCH_SIZE",
+        description="Max (text, label) pairs per forward pass",
+    )
+    num_threads: int = Field(
+        default=0,
+        env="NUM_THREADS",
+        description="PyTorch CPU threads, 0 keeps the default",
+    )
+    hypothesis_cache_size: int = Field(
+        default=1024,
+        env="HYPOTHESIS_CACHE_SIZE",
+        description="Label sets whose tokenized hypotheses are cached",
+    )
+
+    # ONNX Runtime Settings
+    onnx_model_path: str = Field(
+        default="/artifacts/onnx/model.onnx",
+        env="ONNX_MODEL_PATH",
+        description="Exported with scripts/export_onnx.py",
+    )
+    ort_intra_op_threads: int = Field(
+        default=0,
+        env="ORT_INTRA_OP_THREADS",
+        description="Threads per operator, 0 uses one per physical core",
+    )
+    ort_inter_op_threads: int = Field(
+        default=0,
+        env="ORT_INTER_OP_THREADS",
+        description="Threads to run independent operators in parallel",
+    )
+    ort_graph_optimization: GraphOptimization = Field(
+        default=GraphOptimization.all, env="ORT_GRAPH_OPTIMIZATION"
     )
 
 
@@ -1,10 +1,14 @@
 import logging
-from typing import Dict
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
 
 import gradio.inputs as gr_inputs
 import gradio.outputs as gr_outputs
-from config import config
-from transformers import pipeline
+import numpy as np
+from config import Backend, config
+from inference_engine.batcher import MicroBatcher
+from inference_engine.cache import ResultCache, content_key
+from inference_engine.lazy import LazyLoader
 
 inputs = [
     gr_inputs.Textbox(placeholder="Text to classify", label="Text"),
@@ -14,10 +18,224 @@ inputs = [
 ]
 outputs = gr_outputs.Label(num_top_classes=config.top_k)
 examples = [["Hello world", "greeting,insult"]]
+# Same as the zero-shot-classification pipeline
+HYPOTHESIS_TEMPLATE = "This example is {}."
 
-classifier = pipeline(
-    "zero-shot-classification", model=config.model_name, device=config.device
+
+class Classifier(NamedTuple):
+    tokenizer: Any
+    # Takes input_ids and attention_mask, returns NLI logits
+    score: Callable[[np.ndarray, np.ndarray], np.ndarray]
+    entailment_id: int
+    contradiction_id: int
+
+
+def nli_label_ids(label2id: Dict[str, int]) -> Tuple[int, int]:
+    """Finds the entailment and contradiction logits of an NLI model
+
+    Args:
+        label2id (Dict[str, int]): label2id of the model config
+
+    Returns:
+        Tuple[int, int]: Index of the entailment and contradiction logits
+    """
+    ids = {label.lower(): i for label, i in label2id.items()}
+    return ids.get("entailment", -1), ids.get("contradiction", 0)
+
+
+def load_classifier() -> Classifier:
+    """Loads the tokenizer and PyTorch model
+
+    Returns:
+        Classifier: Loaded classifier
+    """
+    # transformers and torch are slow to import, so only import
+    # them when loading
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    if config.num_threads > 0:
+        torch.set_num_threads(config.num_threads)
+    device = config.device
+    if device == "auto":
+        device = "cuda:0" if torch.cuda.is_available() else "cpu"
+    # model_name may be a local directory with baked weights
+    # (see inference_engine.save_huggingface_cache)
+    tokenizer = AutoTokenizer.from_pretrained(config.model_name, use_fast=True)
+    model = AutoModelForSequenceClassification.from_pretrained(
+        config.model_name
+    )
+    model = model.to(device).eval()
+
+    def score(input_ids: np.ndarray, attention_mask: np.ndarray):
+        with torch.inference_mode():
+            logits = model(
+                input_ids=torch.from_numpy(input_ids).to(device),
+                attention_mask=torch.from_numpy(attention_mask).to(device),
+            ).logits
+        return logits.float().cpu().numpy()
+
+    return Classifier(tokenizer, score, *nli_label_ids(model.config.label2id))
+
+
+def load_onnx_classifier() -> Classifier:
+    """Loads the tokenizer and an ONNX Runtime session of a model
+    exported with scripts/export_onnx.py
+
+    Returns:
+        Classifier: Loaded classifier
+    """
+    from inference_engine.onnx_utils import create_session, run
+    from transformers import AutoConfig, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(config.model_name, use_fast=True)
+    label2id = AutoConfig.from_pretrained(config.model_name).label2id
+    session = create_session(
+        config.onnx_model_path,
+        intra_op_threads=config.ort_intra_op_threads,
+        inter_op_threads=config.ort_inter_op_threads,
+        graph_optimization=config.ort_graph_optimization,
+    )
+
+    def score(input_ids: np.ndarray, attention_mask: np.ndarray):
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        return run(session, inputs)[0]
+
+    return Classifier(tokenizer, score, *nli_label_ids(label2id))
+
+
+# Starts loading while the app starts up
+if config.backend == Backend.onnxruntime:
+    classifier = LazyLoader(load_onnx_classifier, "classifier").start()
+else:
+    classifier = LazyLoader(load_classifier, "classifier").start()
+
+
+def parse_labels(classes: str) -> Tuple[str, ...]:
+    """Splits comma separated classes, dropping blanks and duplicates
+
+    Args:
+        classes (str): Comma separated classes
+
+    Returns:
+        Tuple[str, ...]: Classes in order
+    """
+    labels = (label.strip() for label in classes.split(","))
+    return tuple(dict.fromkeys(label for label in labels if label))
+
+
+@lru_cache(maxsize=config.hypothesis_cache_size)
+def encode_hypotheses(labels: Tuple[str, ...]) -> Tuple[List[int], ...]:
+    """Tokenizes the hypothesis of each label, without special tokens.
+    Label sets are usually reused across requests, so they are cached
+
+    Args:
+        labels (Tuple[str, ...]): Possible classes
+
+    Returns:
+        Tuple[List[int], ...]: Token ids of each hypothesis
+    """
+    hypotheses = [HYPOTHESIS_TEMPLATE.format(label) for label in labels]
+    tokenizer = classifier.get().tokenizer
+    return tuple(tokenizer(hypotheses, add_special_tokens=False)["input_ids"])
+
+
+def score_pairs(pairs: List[List[int]]) -> np.ndarray:
+    """Runs tokenized pairs through the model, config.batch_size at a
+    time. Pairs are sorted by length, so that each batch is padded as
+    little as possible
+
+    Args:
+        pairs (List[List[int]]): Token ids of each pair, with special tokens
+
+    Returns:
+        np.ndarray: NLI logits of each pair, in the same order
+    """
+    model = classifier.get()
+    pad_id = model.tokenizer.pad_token_id
+    order = np.argsort([len(pair) for pair in pairs], kind="stable")
+    logits: List[np.ndarray] = []
+    for start in range(0, len(pairs), config.batch_size):
+        batch = [pairs[i] for i in order[start : start + config.batch_size]]
+        input_ids = np.full(
+            (len(batch), len(batch[-1])), pad_id, dtype=np.int64
+        )
+        attention_mask = np.zeros_like(input_ids)
+        for row, pair in enumerate(batch):
+            input_ids[row, : len(pair)] = pair
+            attention_mask[row, : len(pair)] = 1
+        logits.append(model.score(input_ids, attention_mask))
+    results = np.empty_like(np.concatenate(logits))
+    results[order] = np.concatenate(logits)
+    return results
+
+
+def predict_batch(requests: List[Tuple[str, str]]) -> List[Dict[str, float]]:
+    """Classifies texts from concurrent requests. The (text, label) pairs
+    of every request are scored together, in batches of config.batch_size
+
+    Args:
+        requests (List[Tuple[str, str]]): Text and comma separated
+            possible classes of each request
+
+    Returns:
+        List[Dict[str, float]]: Probability of each class, for each request
+    """
+    model = classifier.get()
+    tokenizer = model.tokenizer
+    labels = [parse_labels(classes) for _, classes in requests]
+    # Each text is tokenized once, and reused for each of its labels
+    texts = tokenizer(
+        [text for text, _ in requests], add_special_tokens=False
+    )["input_ids"]
+    max_length = min(tokenizer.model_max_length, 512)
+    max_length -= tokenizer.num_special_tokens_to_add(pair=True)
+
+    pairs = []
+    for text_ids, request_labels in zip(texts, labels):
+        if len(request_labels) == 0:
+            continue
+        for hypothesis_ids in encode_hypotheses(request_labels):
+            # Truncate the text, like truncation="only_first"
+            premise = text_ids[: max(max_length - len(hypothesis_ids), 0)]
+            pairs.append(
+                tokenizer.build_inputs_with_special_tokens(
+                    premise, hypothesis_ids
+                )
+            )
+    logits = score_pairs(pairs) if pairs else np.empty((0, 3))
+
+    results: List[Dict[str, float]] = []
+    start = 0
+    for request_labels in labels:
+        request_logits = logits[start : start + len(request_labels)]
+        start += len(request_labels)
+        if len(request_labels) == 0:
+            results.append({})
+        elif len(request_labels) == 1:
+            # Like the pipeline, a single label is scored as entailment
+            # against contradiction
+            request_logits = request_logits[
+                :, [model.contradiction_id, model.entailment_id]
+            ]
+            exp = np.exp(request_logits - request_logits.max(1, keepdims=True))
+            probs = exp[:, 1] / exp.sum(axis=1)
+            results.append(dict(zip(request_labels, probs.tolist())))
+        else:
+            # Softmax of the entailment logits over the possible classes
+            entailment = request_logits[:, model.entailment_id]
+            exp = np.exp(entailment - entailment.max())
+            probs = exp / exp.sum()
+            results.append(dict(zip(request_labels, probs.tolist())))
+    return results
+
+
+# Concurrent requests are run through the model together
+batcher = MicroBatcher(
+    predict_batch, config.batch_max_size, config.batch_max_latency_ms
 )
+# Opt-in (CACHE_MAX_BYTES), repeated requests skip the model
+cache = ResultCache(config.cache_max_bytes, config.cache_ttl_seconds)
 
 
 def predict(text: str, classes: str) -> Dict[str, float]:
@@ -30,12 +248,13 @@ def predict(text: str, classes: str) -> Dict[str, float]:
         classes (str): Possible classes
 
     Returns:
-        Dict[str, float]: _description_
+        Dict[str, float]: Probability of each class
     """
-    # Initialize Triton GRPC Client
     logging.info("Request received")
-    res = classifier(text, classes)
-    labels = res["labels"]
-    scores = res["scores"]
-    results = {label: score for label, score in zip(labels, scores)}
-    return results
+    # Keyed on the parsed labels, so spacing and duplicates don't matter
+    result = cache.get_or_compute(
+        content_key(text, parse_labels(classes)),
+        lambda: batcher.submit((text, classes)),
+    )
+    cache.log_metrics()
+    return result
@@ -0,0 +1,58 @@
+"""Export YOLOv7 weights to ONNX for ONNX Runtime.
+
+The batch axis is dynamic, and the class names are stored in the model
+metadata. With --quantize, weights are dynamically quantized to int8.
+Convolutions gain less from this than transformers do, so compare both
+with inference_engine.benchmark_backends before switching.
+
+Serve the exported model with BACKEND=onnxruntime and ONNX_MODEL_PATH.
+"""
+import argparse
+import json
+import tempfile
+from pathlib import Path
+
+import onnx
+import torch
+import yolov7
+from inference_engine.onnx_utils import quantize_model
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-w", "--weights", default="/app/yolov7.pt")
+    parser.add_argument("-o", "--output", default="/app/yolov7.onnx")
+    parser.add_argument("-s", "--img-size", type=int, default=640)
+    parser.add_argument("-q", "--quantize", action="store_true")
+    parser.add_argument("--opset", type=int, default=12)
+    args = parser.parse_args()
+
+    # Export the underlying model, without autoShape's pre/postprocessing
+    model = yolov7.load(args.weights, device="cpu", trace=False)
+    net = model.model.float().eval()
+    dummy = torch.zeros(1, 3, args.img_size, args.img_size)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        export_path = str(Path(tmp_dir) / "model.onnx")
+        with torch.no_grad():
+            torch.onnx.export(
+                net,
+                dummy,
+                export_path,
+                input_names=["images"],
+                output_names=["output"],
+                dynamic_axes={"images": {0: "batch"}, "output": {0: "batch"}},
+                opset_version=args.opset,
+            )
+        onnx_model = onnx.load(export_path)
+        meta = onnx_model.metadata_props.add()
+        meta.key, meta.value = "names", json.dumps(list(model.names))
+        onnx.save(onnx_model, export_path)
+        if args.quantize:
+            quantize_model(export_path, args.output)
+        else:
+            onnx.save(onnx_model, args.output)
+    print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,14 @@
 import logging
 
 import gradio as gr
-from predict import examples, inputs, outputs, predict
+from config import config
+from inference_engine.health import readiness
+from predict import examples, inputs, outputs, predict, warmup
 
 if __name__ == "__main__":
     logging.basicConfig(format="[%(asctime)s] %(levelname)s: %(message)s")
+    # Ready (GET /ready) once the model has been warmed up
+    readiness.start(warmup)
     app = gr.Interface(
         predict,
         inputs=inputs,
@@ -13,10 +17,13 @@ if __name__ == "__main__":
         description="Inference service for AI App Store",
         examples=examples,
     )
-    
+    from gradio.routes import app as server_app
+
+    readiness.add_route(server_app)
+    # The queue runs one request at a time, leaving nothing to batch,
+    # so it is only enabled if batching is disabled
     app.launch(
         server_name="0.0.0.0",
-        server_port=8080,
-        enable_queue=True,
+        server_port=config.port,
+        enable_queue=config.batch_max_size == 1,
     )
-    
@@ -1,8 +1,20 @@
-from typing import Optional, Literal
+from enum import Enum
+from typing import Literal, Optional
 
 from pydantic import BaseSettings, Field
 
 
+class Backend(str, Enum):
+    pytorch = "pytorch"
+    onnxruntime = "onnxruntime"
+
+
+class GraphOptimization(str, Enum):
+    disable = "disable"
+    basic = "basic"
+    extended = "extended"
+    all = "all"
+
 
 class Config(BaseSettings):
     """Define any config here.
@@ -10,15 +22,105 @@ class Config(BaseSettings):
     See here for documentation:
     https://pydantic-docs.helpmanual.io/usage/settings/
     """
-    source: Literal["webcam", "upload"] = Field(default="upload", description="Source of input image", env="SOURCE")
-    model_weights: str = Field(default="/app/yolov7.pt", description="Path to model weights", env="MODEL_WEIGHTS")
 
-    nms_conf: float = Field(default=0.45, description="Non-maximum suppression confidence threshold", env="NMS_CONF")
-    nms_iou: float = Field(default=0.45, description="Non-maximum suppression IoU threshold", env="NMS_IOU")
+    # KNative assigns a $PORT environment variable to the container
+    port: int = Field(
+        default=8080, description="Gradio App Server Port", env="PORT"
+    )
+    source: Literal["webcam", "upload"] = Field(
+        default="upload", description="Source of input image", env="SOURCE"
+    )
+    input_mode: Literal["image", "video"] = Field(
+        default="image",
+        description="Detect objects in images or videos",
+        env="INPUT_MODE",
+    )
+    model_weights: str = Field(
+        default="/app/yolov7.pt",
+        description="Path to model weights",
+        env="MODEL_WEIGHTS",
+    )
+
+    nms_conf: float = Field(
+        default=0.45,
+        description="Non-maximum suppression confidence threshold",
+        env="NMS_CONF",
+    )
+    nms_iou: float = Field(
+        default=0.45,
+        description="Non-maximum suppression IoU threshold",
+        env="NMS_IOU",
+    )
+
+    device: str = Field(
+        default="cpu", description="Device to use for inference", env="DEVICE"
+    )
+    img_size: int = Field(
+        default=640,
+        description="Size images are letterboxed to",
+        env="IMG_SIZE",
+    )
+    max_det: int = Field(
+        default=300, description="Max detections per image", env="MAX_DET"
+    )
+    decode_workers: int = Field(
+        default=4,
+        description="Threads which decode, letterbox and render the images of a batch",
+        env="DECODE_WORKERS",
+    )
+    video_max_in_flight: int = Field(
+        default=32,
+        description="Max video frames decoded ahead of the model",
+        env="VIDEO_MAX_IN_FLIGHT",
+    )
+    backend: Backend = Field(
+        default=Backend.pytorch,
+        description="Run with PyTorch or ONNX Runtime",
+        env="BACKEND",
+    )
+
+    onnx_model_path: str = Field(
+        default="/app/yolov7.onnx",
+        description="Exported with scripts/export_onnx.py",
+        env="ONNX_MODEL_PATH",
+    )
+    ort_intra_op_threads: int = Field(
+        default=0,
+        description="Threads per operator, 0 uses one per physical core",
+        env="ORT_INTRA_OP_THREADS",
+    )
+    ort_inter_op_threads: int = Field(
+        default=0,
+        description="Threads to run independent operators in parallel",
+        env="ORT_INTER_OP_THREADS",
+    )
+    ort_graph_optimization: GraphOptimization = Field(
+        default=GraphOptimization.all,
+        description="ONNX Runtime graph optimization level",
+        env="ORT_GRAPH_OPTIMIZATION",
+    )
 
-    device: str = Field(default="cpu", description="Device to use for inference", env="DEVICE")
+    batch_max_size: int = Field(
+        default=8,
+        description="Max requests per model call, 1 disables batching",
+        env="BATCH_MAX_SIZE",
+    )
+    batch_max_latency_ms: float = Field(
+        default=10,
+        description="Max time to wait for a batch to fill up",
+        env="BATCH_MAX_LATENCY_MS",
+    )
 
+    cache_max_bytes: int = Field(
+        default=0,
+        description="Memory for results of repeated inputs (e.g examples), 0 disables the cache",
+        env="CACHE_MAX_BYTES",
+    )
+    cache_ttl_seconds: float = Field(
+        default=3600,
+        description="Seconds before a cached result expires, 0 to never expire",
+        env="CACHE_TTL_SECONDS",
+    )
 
-    
 
 config = Config()
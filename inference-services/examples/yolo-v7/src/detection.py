@@ -0,0 +1,163 @@
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+
+def letterbox(
+    image: np.ndarray, size: int = 640, color: int = 114
+) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """Resizes an image to fit in a size x size square, keeping its
+    aspect ratio, and pads the rest (same as YOLOv7's letterbox)
+
+    :return: Padded image, scale and (left, top) padding
+    """
+    height, width = image.shape[:2]
+    scale = min(size / height, size / width)
+    new_width, new_height = round(width * scale), round(height * scale)
+    if (new_width, new_height) != (width, height):
+        image = cv2.resize(
+            image, (new_width, new_height), interpolation=cv2.INTER_LINEAR
+        )
+    left = (size - new_width) // 2
+    top = (size - new_height) // 2
+    padded = np.full((size, size, 3), color, dtype=np.uint8)
+    padded[top : top + new_height, left : left + new_width] = image
+    return padded, scale, (left, top)
+
+
+def letterbox_into(
+    image: np.ndarray, out: np.ndarray, color: int = 114
+) -> Tuple[float, Tuple[int, int]]:
+    """Letterboxes an RGB image straight into its CHW FP32 slot of a
+    batch, scaled to [0, 1], so that images of a batch can be prepared
+    in parallel without stacking them afterwards
+
+    :param out: Slot of the batch with shape [3, size, size]
+    :return: Scale and (left, top) padding
+    """
+    padded, scale, pad = letterbox(image, out.shape[1], color)
+    np.multiply(padded.transpose(2, 0, 1), 1 / 255, out=out, casting="unsafe")
+    return scale, pad
+
+
+def nms(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    iou: float,
+    max_candidates: int = 30000,
+) -> np.ndarray:
+    """Greedy non-maximum suppression. Each step compares the best
+    remaining box against all others at once
+
+    :param boxes: Boxes (x1, y1, x2, y2) with shape [N, 4]
+    :param scores: Scores with shape [N]
+    :param iou: IoU above which the lower scoring box is dropped
+    :param max_candidates: Only the highest scoring boxes are considered
+    :return: Indices of the boxes kept, highest score first
+    """
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    order = scores.argsort()[::-1][:max_candidates]
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        top_left = np.maximum(boxes[i, :2], boxes[rest, :2])
+        bottom_right = np.minimum(boxes[i, 2:], boxes[rest, 2:])
+        inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=1)
+        overlap = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[overlap <= iou]
+    return np.array(keep, dtype=np.int64)
+
+
+def postprocess(
+    pred: np.ndarray,
+    scale: float,
+    pad: Tuple[int, int],
+    shape: Tuple[int, ...],
+    conf: float = 0.25,
+    iou: float = 0.45,
+    max_det: int = 300,
+) -> np.ndarray:
+    """Decodes the raw YOLOv7 output of a single image
+
+    :param pred: Rows of (cx, cy, w, h, objectness, class scores...)
+    :param scale: Scale from letterbox
+    :param pad: Padding from letterbox
+    :param shape: Shape of the original image
+    :return: Detections (x1, y1, x2, y2, confidence, class) in the
+        original image coordinates, with shape [N, 6]
+    """
+    pred = pred[pred[:, 4] > conf]
+    scores = pred[:, 5:] * pred[:, 4:5]
+    classes = scores.argmax(axis=1)
+    scores = scores[np.arange(len(scores)), classes]
+    mask = scores > conf
+    pred, scores, classes = pred[mask], scores[mask], classes[mask]
+
+    boxes = np.empty((len(pred), 4), dtype=np.float32)
+    boxes[:, :2] = pred[:, :2] - pred[:, 2:4] / 2
+    boxes[:, 2:] = pred[:, :2] + pred[:, 2:4] / 2
+    # Offset boxes by class, so that boxes of different classes
+    # never overlap and NMS runs on all classes at once
+    keep = nms(boxes + classes[:, None] * 4096.0, scores, iou)[:max_det]
+    boxes, scores, classes = boxes[keep], scores[keep], classes[keep]
+
+    # Undo the letterbox
+    boxes -= np.array(pad * 2, dtype=np.float32)
+    boxes /= scale
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, shape[1])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, shape[0])
+    return np.concatenate(
+        [boxes, scores[:, None], classes[:, None].astype(np.float32)], axis=1
+    )
+
+
+def render(
+    image: np.ndarray, detections: np.ndarray, names: List[str]
+) -> np.ndarray:
+    """Draws detections on an image in place with OpenCV, which is much
+    faster than drawing with PIL like autoShape's render"""
+    thickness = max(round(sum(image.shape[:2]) / 2 * 0.003), 2)
+    font_scale = thickness / 3
+    for x1, y1, x2, y2, score, cls in detections.tolist():
+        color = COLORS[int(cls) % len(COLORS)]
+        top_left, bottom_right = (int(x1), int(y1)), (int(x2), int(y2))
+        cv2.rectangle(image, top_left, bottom_right, color, thickness)
+        label = f"{names[int(cls)]} {score:.2f}"
+        (width, height), _ = cv2.getTextSize(
+            label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, max(thickness - 1, 1)
+        )
+        # Filled label background, above the box if it fits
+        above = top_left[1] - height - 3 >= 0
+        label_top = top_left[1] - height - 3 if above else top_left[1]
+        cv2.rectangle(
+            image,
+            (top_left[0], label_top),
+            (top_left[0] + width, label_top + height + 3),
+            color,
+            cv2.FILLED,
+        )
+        cv2.putText(
+            image,
+            label,
+            (top_left[0], label_top + height + 1),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            font_scale,
+            (255, 255, 255),
+            max(thickness - 1, 1),
+            cv2.LINE_AA,
+        )
+    return image
+
+
+# Ultralytics palette
+COLORS = [
+    tuple(int(code[i : i + 2], 16) for i in (0, 2, 4))
+    for code in (
+        "FF3838 FF9D97 FF701F FFB21D CFD231 48F90A 92CC17 3DDB86 "
+        + "1A9334 00D4BB 2C99A8 00C2FF 344593 6473FF 0018EC 8438FF "
+        + "520085 CB38FF FF95C8 FF37C7"
+    ).split()
+]
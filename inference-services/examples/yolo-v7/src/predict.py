@@ -1,29 +1,171 @@
-from typing import Any, List, Optional, Union
+import json
+import tempfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Deque, List, Optional, Tuple, Union
 
-from config import config
-
-import yolov7
-import numpy as np
+import cv2
 import gradio.inputs as gr_inputs
 import gradio.outputs as gr_outputs
+import numpy as np
+from config import Backend, config
+from detection import letterbox_into, postprocess, render
+from inference_engine.batcher import MicroBatcher
+from inference_engine.cache import ResultCache, content_key
+
+if config.input_mode == "video":
+    inputs = [gr_inputs.Video(source=config.source)]
+    outputs = [gr_outputs.Video(label="Detected Objects")]
+    examples: Optional[Union[List[Any], List[List[Any]], str]] = None
+else:
+    inputs = [gr_inputs.Image(source=config.source, type="filepath")]
+    outputs = [gr_outputs.Image(label="Detected Objects")]
+    examples = ["/app/src/data/pexels-edward-jenner-4033148.jpg"]
+
+# An image is a file path or an RGB array (e.g a video frame)
+Image = Union[str, np.ndarray]
+
+
+def load_model() -> Tuple[Callable[[np.ndarray], np.ndarray], List[str]]:
+    # Returns a function from a letterboxed NCHW batch to raw
+    # predictions, and the class names
+    if config.backend == Backend.onnxruntime:
+        from inference_engine.onnx_utils import create_session
+
+        session = create_session(
+            config.onnx_model_path,
+            intra_op_threads=config.ort_intra_op_threads,
+            inter_op_threads=config.ort_inter_op_threads,
+            graph_optimization=config.ort_graph_optimization,
+        )
+        input_name = session.get_inputs()[0].name
+        # Class names are stored in the metadata by scripts/export_onnx.py
+        names = json.loads(
+            session.get_modelmeta().custom_metadata_map["names"]
+        )
+        return lambda batch: session.run(None, {input_name: batch})[0], names
+
+    import torch
+    import yolov7
+
+    # Pre/postprocessing is done here in batches, so only the
+    # underlying model of autoShape is used
+    net = yolov7.load(config.model_weights, device=config.device, trace=False)
+
+    def infer(batch: np.ndarray) -> np.ndarray:
+        with torch.inference_mode():
+            pred = net.model(torch.from_numpy(batch).to(config.device))[0]
+        return pred.float().cpu().numpy()
+
+    return infer, list(net.names)
+
+
+infer, names = load_model()
+# Images of a batch are decoded, letterboxed and rendered in parallel,
+# OpenCV releases the GIL
+pool = ThreadPoolExecutor(config.decode_workers, thread_name_prefix="decode")
 
-inputs = [
-    gr_inputs.Image(
-        source=config.source,
-        type="filepath"
+
+def read_image(path: str) -> np.ndarray:
+    image = cv2.imread(path)
+    if image is None:
+        raise ValueError(f"Could not read image {path}")
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+def predict_batch(images: List[Image]) -> List[np.ndarray]:
+    # Arrays are drawn on in place
+    batch = np.empty(
+        (len(images), 3, config.img_size, config.img_size), dtype=np.float32
     )
-]
-outputs = [gr_outputs.Image(label="Detected Objects")]
 
+    def prepare(i: int) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+        image = images[i]
+        if isinstance(image, str):
+            image = read_image(image)
+        return (image, *letterbox_into(image, batch[i]))
+
+    def finish(
+        prepared: Tuple[np.ndarray, float, Tuple[int, int]], pred: np.ndarray
+    ) -> np.ndarray:
+        image, scale, pad = prepared
+        detections = postprocess(
+            pred,
+            scale,
+            pad,
+            image.shape,
+            config.nms_conf,
+            config.nms_iou,
+            config.max_det,
+        )
+        return render(image, detections, names)
+
+    prepared = list(pool.map(prepare, range(len(images))))
+    preds = infer(batch)
+    return list(pool.map(finish, prepared, preds))
+
+
+# Concurrent requests, and the images and frames of each request,
+# are run through the model together
+batcher = MicroBatcher(
+    predict_batch, config.batch_max_size, config.batch_max_latency_ms
+)
+# Opt-in (CACHE_MAX_BYTES), repeated images skip the model
+cache = ResultCache(config.cache_max_bytes, config.cache_ttl_seconds)
 
-examples: Optional[Union[List[Any], List[List[Any]], str]] = [
-    "/app/src/data/pexels-edward-jenner-4033148.jpg"
-]
 
-model = yolov7.load(config.model_weights, device=config.device)
+def warmup():
+    # Runs a blank image through the model, so that the first request
+    # does not wait for the model to initialize (e.g CUDA kernels)
+    batcher.submit(np.zeros((config.img_size, config.img_size, 3), np.uint8))
+
+
+def predict_image(image: str) -> np.ndarray:
+    # Each upload gets a new path, so key on the file contents
+    result = cache.get_or_compute(
+        content_key(Path(image)), lambda: batcher.submit(image)
+    )
+    cache.log_metrics()
+    return result
+
+
+def predict_video(video: str) -> str:
+    capture = cv2.VideoCapture(video)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 25
+    width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    # VP8 in WebM plays in browsers, and ships with opencv-python
+    output = tempfile.NamedTemporaryFile(suffix=".webm", delete=False).name
+    writer = cv2.VideoWriter(
+        output, cv2.VideoWriter_fourcc(*"VP80"), fps, (width, height)
+    )
+    # Frames are decoded while earlier frames are in the model, with a
+    # bounded number in flight, and written back in order
+    pending: Deque[Future] = deque()
+    try:
+        while True:
+            ok, frame = capture.read()
+            if ok:
+                pending.append(
+                    batcher.submit_future(
+                        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                    )
+                )
+            while pending and (
+                not ok or len(pending) >= config.video_max_in_flight
+            ):
+                writer.write(
+                    cv2.cvtColor(pending.popleft().result(), cv2.COLOR_RGB2BGR)
+                )
+            if not ok:
+                break
+    finally:
+        for future in pending:
+            future.cancel()
+        capture.release()
+        writer.release()
+    return output
 
-def predict(image: np.ndarray) -> np.ndarray:
-    results = model(image)
-    rendered_ouput = results.render()[0]
-    return rendered_ouput
 
+predict = predict_video if config.input_mode == "video" else predict_image
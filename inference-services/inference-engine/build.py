@@ -1,8 +1,270 @@
 import argparse
+import json
+import os
 import subprocess
-
-from typing import List
+import sys
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
 from itertools import product
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Version of the libcudnn8 apt package (CUDNN in gpu.Dockerfile)
+# of each cuDNN release
+CUDNN_PACKAGE_VERSIONS = {
+    "8.6": "8.6.0.163-1",
+    "8.7": "8.7.0.84-1",
+    "8.9": "8.9.7.29-1",
+}
+
+
+class Build(NamedTuple):
+    """A single image in the build matrix"""
+
+    tag: str
+    dockerfile: str
+    build_args: Dict[str, str]
+    # Builds in the same group share their base layers
+    cache_group: Tuple[str, ...]
+    # Relative cost, so that the slowest builds start first
+    weight: int
+
+
+class BuildResult(NamedTuple):
+    """Outcome and timings of a build"""
+
+    tag: str
+    status: str
+    build_seconds: float
+    push_seconds: float
+    log_path: str
+
+
+def get_cudnn_package_version(cudnn: str) -> str:
+    """Map a cuDNN version (e.g 8.6) to the version of its apt package
+
+    Args:
+        cudnn (str): cuDNN version, either major.minor or the full
+            package version (e.g 8.6.0.163-1)
+
+    Raises:
+        ValueError: If the version is not known
+
+    Returns:
+        str: Package version
+    """
+    if "-" in cudnn:
+        return cudnn
+    if cudnn not in CUDNN_PACKAGE_VERSIONS:
+        raise ValueError(
+            f"Unknown cuDNN version {cudnn}, pass the full package "
+            + f"version or one of {list(CUDNN_PACKAGE_VERSIONS)}"
+        )
+    return CUDNN_PACKAGE_VERSIONS[cudnn]
+
+
+def get_builds(
+    python_version: List[str],
+    gradio_version: List[str],
+    cuda_version: List[str],
+    cudnn_version: List[str],
+) -> List[Build]:
+    """Enumerate the CPU and GPU images of every version combination
+
+    Args:
+        python_version (List[str]): List of Python versions to target
+        gradio_version (List[str]): List of Gradio versions to target
+        cuda_version (List[str]): List of CUDA versions to target
+        cudnn_version (List[str]): CUDNN versions to target
+
+    Returns:
+        List[Build]: Builds, without duplicates
+    """
+    builds: Dict[str, Build] = {}
+    for python, cuda, cudnn, gradio in product(
+        python_version, cuda_version, cudnn_version, gradio_version
+    ):
+        build_args = {"PYTHON_VERSION": python, "GRADIO_VERSION": gradio}
+        tag = f"inference-engine:1.1.0-py{python}-gr{gradio}"
+        # The CPU image does not depend on CUDA, so it is only built once
+        builds.setdefault(
+            tag + "-cpu",
+            Build(
+                tag=tag + "-cpu",
+                dockerfile="dockerfiles/cpu.Dockerfile",
+                build_args=build_args,
+                cache_group=("cpu", python),
+                weight=1,
+            ),
+        )
+        gpu_tag = tag + f"-cuda{cuda}-cudnn{cudnn}"
+        builds.setdefault(
+            gpu_tag,
+            Build(
+                tag=gpu_tag,
+                dockerfile="dockerfiles/gpu.Dockerfile",
+                # Names of the args read by gpu.Dockerfile
+                build_args={
+                    **build_args,
+                    "CUDA": cuda,
+                    "CUDNN": get_cudnn_package_version(cudnn),
+                    "CUDNN_MAJOR_VERSION": cudnn.split(".")[0],
+                },
+                cache_group=("gpu", cuda, cudnn),
+                weight=10,
+            ),
+        )
+    return list(builds.values())
+
+
+def order_builds(
+    builds: List[Build],
+) -> Tuple[List[Build], Dict[Tuple[str, ...], List[Build]]]:
+    """Order builds to reuse as many layers as possible.
+
+    The first build of each cache group builds the shared base layers,
+    and the rest of the group waits for it, so that they reuse the
+    cached layers instead of building them at the same time.
+
+    Args:
+        builds (List[Build]): Builds
+
+    Returns:
+        Tuple[List[Build], Dict[Tuple[str, ...], List[Build]]]: First
+            build of each group, slowest first, and the rest of each group
+    """
+    groups: Dict[Tuple[str, ...], List[Build]] = {}
+    for build in builds:
+        groups.setdefault(build.cache_group, []).append(build)
+    first = [group[0] for group in groups.values()]
+    first.sort(key=lambda build: -build.weight)
+    rest = {key: group[1:] for key, group in groups.items()}
+    return first, rest
+
+
+def build_command(build: Build, repo: str, cache_from_repo: bool) -> List[str]:
+    """Format the docker build command of an image
+
+    Args:
+        build (Build): Build
+        repo (str): Repository the image is pushed to
+        cache_from_repo (bool): If should reuse layers of the image
+            previously pushed to the repository
+
+    Returns:
+        List[str]: Command
+    """
+    command = ["docker", "build", "--progress=plain"]
+    for key, value in build.build_args.items():
+        command += ["--build-arg", f"{key}={value}"]
+    # Embed cache metadata in the image, so that the next build
+    # (e.g tomorrow's) can use the pushed image as a cache
+    command += ["--build-arg", "BUILDKIT_INLINE_CACHE=1"]
+    if cache_from_repo:
+        command += ["--cache-from", f"{repo}/{build.tag}"]
+    command += ["-f", build.dockerfile]
+    command += ["-t", build.tag, "-t", f"{repo}/{build.tag}", "."]
+    return command
+
+
+def run_build(
+    build: Build,
+    repo: str,
+    skip_push: bool,
+    cache_from_repo: bool,
+    log_dir: str,
+    dry_run: bool = False,
+) -> BuildResult:
+    """Build an image, and push it to the repository
+
+    Args:
+        build (Build): Build
+        repo (str): Repository to push image to
+        skip_push (bool): If should skip push to registry
+        cache_from_repo (bool): If should reuse layers of the image
+            previously pushed to the repository
+        log_dir (str): Directory to write the build output to
+        dry_run (bool, optional): Only print the commands.
+            Defaults to False.
+
+    Returns:
+        BuildResult: Outcome and timings
+    """
+    log_path = os.path.join(log_dir, build.tag.replace(":", "_") + ".log")
+    commands = [build_command(build, repo, cache_from_repo)]
+    if not skip_push:
+        commands.append(["docker", "push", f"{repo}/{build.tag}"])
+    if dry_run:
+        for command in commands:
+            print(" ".join(command))
+        return BuildResult(build.tag, "skipped", 0, 0, log_path)
+
+    # BuildKit shares its cache between concurrent builds
+    env = dict(os.environ, DOCKER_BUILDKIT="1")
+    seconds = []
+    status = "ok"
+    # Output of concurrent builds would interleave, so each has a log
+    with open(log_path, "w") as log:
+        for command, step in zip(commands, ("build", "push")):
+            print(f"Started {step} of {build.tag}")
+            start = time.perf_counter()
+            process = subprocess.run(
+                command, stdout=log, stderr=subprocess.STDOUT, env=env
+            )
+            seconds.append(time.perf_counter() - start)
+            if process.returncode != 0:
+                status = f"{step} failed"
+                print(f"Error in {step} of {build.tag}, see {log_path}")
+                break
+            print(f"Finished {step} of {build.tag} in {seconds[-1]:.0f}s")
+    seconds += [0] * (2 - len(seconds))
+    return BuildResult(build.tag, status, seconds[0], seconds[1], log_path)
+
+
+def login(username: str, password: str) -> bool:
+    """Log in to the Docker registry once, for every push
+
+    Args:
+        username (str): Docker registry username
+        password (str): Docker registry password
+
+    Returns:
+        bool: If logged in successfully
+    """
+    # Pass the password through stdin, so it is not shown in `ps`
+    process = subprocess.run(
+        ["docker", "login", "-u", username, "--password-stdin"],
+        input=password.encode(),
+    )
+    if process.returncode != 0:
+        print("Error logging in")
+        return False
+    return True
+
+
+def print_report(results: List[BuildResult], total_seconds: float):
+    """Print the timings of every build
+
+    Args:
+        results (List[BuildResult]): Outcome of each build
+        total_seconds (float): Time taken for the whole matrix
+    """
+    width = max([len(result.tag) for result in results] + [5])
+    print(f"\n{'Image':<{width}}  {'Build':>8}  {'Push':>8}  Status")
+    for result in sorted(results, key=lambda result: -result.build_seconds):
+        print(
+            f"{result.tag:<{width}}  {result.build_seconds:>7.0f}s  "
+            + f"{result.push_seconds:>7.0f}s  {result.status}"
+        )
+    sequential = sum(r.build_seconds + r.push_seconds for r in results)
+    print(
+        f"\nBuilt {len(results)} images in {total_seconds:.0f}s "
+        + f"({sequential:.0f}s if run one after another)"
+    )
 
 
 def build_images(
@@ -14,9 +276,17 @@ def build_images(
     cuda_version: List[str],
     cudnn_version: List[str],
     skip_push: bool,
-):
+    jobs: int = 2,
+    cache_from_repo: bool = True,
+    log_dir: str = "build-logs",
+    report_path: Optional[str] = None,
+    dry_run: bool = False,
+) -> List[BuildResult]:
     """Build base images for inference services
 
+    Independent builds run concurrently, up to `jobs` at a time, and
+    each image is pushed as soon as it is built.
+
     # TODO: Check if cuDNN version and CUDA version are compatible
 
     Args:
@@ -28,64 +298,66 @@ def build_images(
         cuda_version (List[str]): List of CUDA versions to target
         cudnn_version (List[str]): CUDNN versions to target
         skip_push (bool): If should skip push to registry
+        jobs (int, optional): Max concurrent builds. Defaults to 2.
+        cache_from_repo (bool, optional): If should reuse layers of
+            images previously pushed to the repository. Defaults to True.
+        log_dir (str, optional): Directory to write the output of each
+            build to. Defaults to "build-logs".
+        report_path (Optional[str], optional): Path to save the timings
+            to as JSON. Defaults to None.
+        dry_run (bool, optional): Only print the commands.
+            Defaults to False.
+
+    Returns:
+        List[BuildResult]: Outcome and timings of each build
     """
-    build_args = [python_version, cuda_version, cudnn_version, gradio_version]
-    combinations = list(product(*build_args))
-
-    login_command = (
-        f"docker login -u {username} -p '{password}'"
-    )
-    try:
-        subprocess.run(login_command, check=True, shell=True)
-    except subprocess.CalledProcessError as err:
-        print(f"Error logging in: {err}")
-
-    for args in combinations:
-        # Format build command
-        python_version, cuda_version, cudnn_version, gradio_version = args
-        command = "docker build "
-        command += f"--build-arg PYTHON_VERSION={python_version} "
-        command += f"--build-arg CUDA_VERSION={cuda_version} "
-        command += f"--build-arg CUDA_VERSION={cudnn_version} "
-        command += f"--build-arg GRADIO_VERSION={gradio_version} "
-
-        tag = f"inference-engine:1.0.0-py{python_version}-gr{gradio_version}"
-        cpu_tag = tag + "-cpu"
-        gpu_tag = tag + f"-cuda{cuda_version}-cudnn{cudnn_version}"
-
-        cpu_command = command + "-f dockerfiles/cpu.Dockerfile "
-        gpu_command = command + "-f dockerfiles/gpu.Dockerfile "
-
-        cpu_command += f"-t {cpu_tag} "
-        gpu_command += f"-t {gpu_tag} "
-
-        cpu_command += "."
-        gpu_command += "."
-
-        # Run build command
-        for build_command in (gpu_command, cpu_command):
-            try:
-                subprocess.run(build_command, check=True, shell=True)
-            except subprocess.CalledProcessError as err:
-                print(f"Error building image for {build_command}: {err}")
-                continue
-
-        # Tag image and push to repository
-        for tag in (cpu_tag, gpu_tag):
-            tag_command = (
-                f"docker tag {tag} {repo}/{tag}"
-            )
-            push_command = (
-                f"docker login -u {username} -p '{password}' && docker push {repo}/{tag}"
-            )
+    builds = get_builds(
+        python_version, gradio_version, cuda_version, cudnn_version
+    )
+    queue, waiting = order_builds(builds)
+    os.makedirs(log_dir, exist_ok=True)
 
-            try:
+    if not skip_push and not dry_run and not login(username, password):
+        skip_push = True
+        print("Images will be built, but not pushed")
 
-                subprocess.run(tag_command, check=True, shell=True)
-                if not skip_push:
-                    subprocess.run(push_command, check=True, shell=True)
-            except subprocess.CalledProcessError as err:
-                print(f"Error pushing image for {args} to {repo}: {err}")
+    start = time.perf_counter()
+    results: List[BuildResult] = []
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        running: Dict[Future, Build] = {}
+        while queue or running:
+            while queue and len(running) < max(1, jobs):
+                build = queue.pop(0)
+                future = executor.submit(
+                    run_build,
+                    build,
+                    repo,
+                    skip_push,
+                    cache_from_repo,
+                    log_dir,
+                    dry_run,
+                )
+                running[future] = build
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                build = running.pop(future)
+                results.append(future.result())
+                # Base layers of the group are now cached
+                queue.extend(waiting.pop(build.cache_group, []))
+    total_seconds = time.perf_counter() - start
+
+    print_report(results, total_seconds)
+    if report_path is not None:
+        with open(report_path, "w") as f:
+            json.dump(
+                {
+                    "total_seconds": total_seconds,
+                    "images": [result._asdict() for result in results],
+                },
+                f,
+                indent=2,
+            )
+    return results
 
 
 if __name__ == "__main__":
@@ -104,34 +376,57 @@ if __name__ == "__main__":
         "--python_version",
         nargs="+",
         help="List of possible Python versions",
-        default=["3.8", "3.9"]
+        default=["3.8", "3.9"],
     )
     parser.add_argument(
         "--gradio_version",
         nargs="+",
         help="List of possible Gradio versions",
-        default=["2.9.4", "3.16.1"]
+        default=["2.9.4", "3.16.1"],
     )
     parser.add_argument(
         "--cuda_version",
         nargs="+",
         help="List of possible CUDA versions",
-        default=["11.8"]
+        default=["11.8"],
     )
     parser.add_argument(
         "--cudnn_version",
         nargs="+",
-        help="List of possible CUDNN versions",
-        default=["8.6"]
+        help="List of possible CUDNN versions (e.g 8.6, or the full "
+        + "libcudnn8 package version such as 8.6.0.163-1)",
+        default=["8.6"],
+    )
+    parser.add_argument("--skip_push", action="store_true", default=False)
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=2,
+        help="Max number of images to build at the same time",
+    )
+    parser.add_argument(
+        "--no_cache_from_repo",
+        action="store_true",
+        default=False,
+        help="Do not reuse layers of images already in the repository",
+    )
+    parser.add_argument(
+        "--log_dir",
+        default="build-logs",
+        help="Directory to write the output of each build to",
+    )
+    parser.add_argument(
+        "--report", help="Path to save the build timings to, as JSON"
     )
     parser.add_argument(
-        "--skip_push",
-        action='store_true',
-        default=False
+        "--dry_run",
+        action="store_true",
+        default=False,
+        help="Only print the commands that would be run",
     )
     args = parser.parse_args()
     # Call the build_and_push function with the command line arguments
-    build_images(
+    results = build_images(
         args.repo,
         args.username,
         args.password,
@@ -139,5 +434,12 @@ if __name__ == "__main__":
         args.gradio_version,
         args.cuda_version,
         args.cudnn_version,
-        args.skip_push
+        args.skip_push,
+        jobs=args.jobs,
+        cache_from_repo=not args.no_cache_from_repo,
+        log_dir=args.log_dir,
+        report_path=args.report,
+        dry_run=args.dry_run,
     )
+    if any(result.status not in ("ok", "skipped") for result in results):
+        sys.exit(1)
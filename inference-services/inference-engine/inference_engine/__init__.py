@@ -0,0 +1,6 @@
+"""Helpers shared by the inference services of the AI App Store
+(Triton client, batching, caching, lazy loading, readiness).
+
+Installed in the inference-engine images, so that apps import them
+instead of keeping a copy in every project.
+"""
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Generic, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """Collects concurrent requests into batches for a single model call.
+
+    Requests are queued, and a background thread dispatches them to
+    `batch_fn` once `max_batch_size` items are waiting or `max_latency_ms`
+    has passed since the first item of the batch arrived, whichever comes
+    first. Each request receives the result at its own position.
+
+    Requests can be submitted from worker threads (`submit`) or from
+    async handlers (`asubmit`).
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[T]], List[R]],
+        max_batch_size: int = 8,
+        max_latency_ms: float = 10,
+        name: str = "micro-batcher",
+    ):
+        """Initialize the batcher. The dispatch thread is started
+        on the first request.
+
+        :param batch_fn: Function which takes a list of inputs
+            and returns a list of outputs in the same order
+        :type batch_fn: Callable[[List[T]], List[R]]
+        :param max_batch_size: Max number of items per batch. If 1,
+            requests call `batch_fn` directly, defaults to 8
+        :type max_batch_size: int, optional
+        :param max_latency_ms: Max time to wait for a batch to fill up,
+            defaults to 10
+        :type max_latency_ms: float, optional
+        :param name: Name of the dispatch thread, defaults to "micro-batcher"
+        :type name: str, optional
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_latency = max_latency_ms / 1000
+        self.name = name
+        # Items are (input, future), None stops the dispatch thread
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Starts the dispatch thread, if not yet started"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name=self.name, daemon=True
+            )
+            self._thread.start()
+
+    def close(self):
+        """Stops the dispatch thread after pending requests are processed"""
+        self._queue.put(None)
+
+    def submit_future(self, item: T) -> "Future[R]":
+        """Queues an item for the next batch
+
+        :param item: Input of a single request
+        :type item: T
+        :return: Future resolved with the output of the request
+        :rtype: Future[R]
+        """
+        self.start()
+        future: "Future[R]" = Future()
+        self._queue.put((item, future))
+        return future
+
+    def submit(self, item: T, timeout: Optional[float] = None) -> R:
+        """Runs a single request as part of a batch, blocking until done
+
+        :param item: Input of a single request
+        :type item: T
+        :param timeout: Seconds to wait for the result, defaults to None
+        :type timeout: Optional[float], optional
+        :return: Output of the request
+        :rtype: R
+        """
+        if self.max_batch_size == 1:
+            return self.batch_fn([item])[0]
+        return self.submit_future(item).result(timeout)
+
+    async def asubmit(self, item: T) -> R:
+        """Runs a single request as part of a batch, without blocking
+        the event loop
+
+        :param item: Input of a single request
+        :type item: T
+        :return: Output of the request
+        :rtype: R
+        """
+        return await asyncio.wrap_future(self.submit_future(item))
+
+    def _collect(
+        self, first: Tuple[T, Future]
+    ) -> Tuple[List[T], List[Future]]:
+        items, futures = [first[0]], [first[1]]
+        deadline = time.monotonic() + self.max_latency
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                # Finish this batch before stopping
+                self._queue.put(None)
+                break
+            items.append(request[0])
+            futures.append(request[1])
+        return items, futures
+
+    def _run(self):
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+            items, futures = self._collect(request)
+            # Skip requests which were cancelled while waiting
+            pending = [
+                (item, future)
+                for item, future in zip(items, futures)
+                if future.set_running_or_notify_cancel()
+            ]
+            if len(pending) == 0:
+                continue
+            logging.info(f"Dispatching batch of {len(pending)}")
+            try:
+                results = self.batch_fn([item for item, _ in pending])
+                if len(results) != len(pending):
+                    raise ValueError(
+                        f"Expected {len(pending)} results, got {len(results)}"
+                    )
+            except Exception as err:
+                for _, future in pending:
+                    future.set_exception(err)
+                continue
+            for (_, future), result in zip(pending, results):
+                future.set_result(result)
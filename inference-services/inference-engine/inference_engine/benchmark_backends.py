@@ -0,0 +1,126 @@
+"""Compare the CPU throughput of inference backends.
+
+Each variant runs in a fresh Python process with its own environment
+variables, e.g PyTorch against FP32 and int8 ONNX Runtime models:
+
+    python -m inference_engine.benchmark_backends \
+        -v pytorch:BACKEND=pytorch \
+        -v onnx:BACKEND=onnxruntime,ONNX_MODEL_PATH=model.onnx \
+        -v onnx-int8:BACKEND=onnxruntime,ONNX_MODEL_PATH=model.int8.onnx
+
+Run it from the root of the app, or pass the directory of its predict
+module with --src-dir. The first example of the predict module is
+repeated to fill each batch, and passed straight to `predict_batch`, so
+that only the model is timed.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PROBE = """
+import json
+import sys
+import time
+
+import predict
+
+try:
+    from inference_engine.lazy import LazyLoader
+
+    LazyLoader.wait_all()
+except ImportError:
+    pass
+
+batch_size, iterations, warmup = (int(arg) for arg in sys.argv[1:4])
+example = predict.examples[0]
+if isinstance(example, (list, tuple)):
+    example = example[0] if len(example) == 1 else tuple(example)
+batch = [example] * batch_size
+for _ in range(warmup):
+    predict.predict_batch(batch)
+latencies = []
+for _ in range(iterations):
+    start = time.perf_counter()
+    predict.predict_batch(batch)
+    latencies.append(time.perf_counter() - start)
+print(json.dumps(latencies))
+"""
+
+
+def parse_variant(variant: str) -> Tuple[str, Dict[str, str]]:
+    name, _, assignments = variant.partition(":")
+    env = {}
+    for assignment in filter(None, assignments.split(",")):
+        key, _, value = assignment.partition("=")
+        env[key.strip()] = value.strip()
+    return name, env
+
+
+def run_variant(
+    src_dir: Path,
+    env: Dict[str, str],
+    batch_size: int,
+    iterations: int,
+    warmup: int,
+) -> List[float]:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE]
+        + [str(batch_size), str(iterations), str(warmup)],
+        cwd=src_dir,
+        env={**os.environ, **env},
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-v",
+        "--variant",
+        action="append",
+        required=True,
+        help="NAME:KEY=VALUE,KEY=VALUE environment of a variant",
+    )
+    parser.add_argument("-b", "--batch-size", type=int, default=8)
+    parser.add_argument("-n", "--iterations", type=int, default=20)
+    parser.add_argument("-w", "--warmup", type=int, default=3)
+    parser.add_argument(
+        "-s",
+        "--src-dir",
+        type=Path,
+        default=Path("src"),
+        help="Directory of the predict module",
+    )
+    args = parser.parse_args()
+
+    print(f"{'variant':>16} {'p50 batch':>10} {'items/s':>10} {'speedup':>8}")
+    baseline = None
+    for variant in args.variant:
+        name, env = parse_variant(variant)
+        latencies = sorted(
+            run_variant(
+                args.src_dir,
+                env,
+                args.batch_size,
+                args.iterations,
+                args.warmup,
+            )
+        )
+        median = latencies[len(latencies) // 2]
+        throughput = args.batch_size / median
+        baseline = baseline or throughput
+        print(
+            f"{name:>16} {median * 1000:>8.1f}ms {throughput:>10.1f} "
+            + f"{throughput / baseline:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
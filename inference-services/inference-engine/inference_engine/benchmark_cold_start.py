@@ -0,0 +1,76 @@
+"""Measure the cold start time of the app.
+
+Each run starts a fresh Python process, like a new replica would, which
+imports the predict module and waits for every LazyLoader to finish
+loading. Run it from the root of the app, or pass the directory of its
+predict module with --src-dir. Run it inside the built image to include
+baked artifacts, e.g
+
+    docker run --rm <IMAGE> python -m inference_engine.benchmark_cold_start
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROBE = """
+import json
+import time
+
+start = time.perf_counter()
+import predict
+imported = time.perf_counter()
+from inference_engine.lazy import LazyLoader
+
+ok = LazyLoader.wait_all()
+ready = time.perf_counter()
+print(json.dumps({
+    "import_seconds": imported - start,
+    "ready_seconds": ready - start,
+    "ok": ok,
+}))
+"""
+
+
+def run_once(src_dir: Path) -> dict:
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=src_dir,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_seconds"] = time.perf_counter() - start
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-r", "--runs", type=int, default=5)
+    parser.add_argument(
+        "-s",
+        "--src-dir",
+        type=Path,
+        default=Path("src"),
+        help="Directory of the predict module",
+    )
+    args = parser.parse_args()
+
+    results = [run_once(args.src_dir) for _ in range(args.runs)]
+    if not all(result["ok"] for result in results):
+        print("Warning: some resources failed to load", file=sys.stderr)
+    for key in ("import_seconds", "ready_seconds", "process_seconds"):
+        values = [result[key] for result in results]
+        print(
+            f"{key:>16}: median {statistics.median(values):.2f}s, "
+            + f"min {min(values):.2f}s, max {max(values):.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import hashlib
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, Generic, Optional, Tuple, TypeVar
+
+import numpy as np
+
+R = TypeVar("R")
+
+
+def _update(digest: Any, value: Any):
+    # Type tags keep e.g "1" and 1 from hashing the same
+    if value is None:
+        digest.update(b"N")
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        digest.update(b"B%d:" % len(value))
+        digest.update(value)
+    elif isinstance(value, str):
+        encoded = value.encode("utf-8")
+        digest.update(b"S%d:" % len(encoded))
+        digest.update(encoded)
+    elif isinstance(value, (bool, int, float)):
+        digest.update(f"{type(value).__name__}:{value!r};".encode())
+    elif isinstance(value, Path):
+        # Hash the contents, so that uploads of the same file match
+        digest.update(b"F")
+        with open(value, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        digest.update(b";")
+    elif isinstance(value, np.ndarray):
+        digest.update(f"A{value.dtype.str}{value.shape};".encode())
+        digest.update(np.ascontiguousarray(value).data)
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"L%d:" % len(value))
+        for item in value:
+            _update(digest, item)
+    elif isinstance(value, dict):
+        digest.update(b"D%d:" % len(value))
+        for key in sorted(value, key=repr):
+            _update(digest, key)
+            _update(digest, value[key])
+    elif hasattr(value, "tobytes") and hasattr(value, "size"):
+        # PIL images
+        digest.update(f"I{getattr(value, 'mode', '')}{value.size};".encode())
+        digest.update(value.tobytes())
+    else:
+        raise TypeError(f"Cannot hash inputs of type {type(value)}")
+
+
+def content_key(*inputs: Any) -> str:
+    """Hashes the contents of request inputs into a cache key.
+
+    Handles text, numbers, bytes, numpy arrays, PIL images and nested
+    lists, tuples and dicts. Wrap file paths (e.g gradio "filepath"
+    inputs) in `pathlib.Path` to hash the file contents instead of the
+    path, since each upload gets a new temporary path.
+
+    :return: Hex digest of the inputs
+    :rtype: str
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    _update(digest, inputs)
+    return digest.hexdigest()
+
+
+def estimate_size(value: Any) -> int:
+    """Estimates the memory used by a result, in bytes
+
+    :param value: Result to measure
+    :type value: Any
+    :return: Approximate size in bytes
+    :rtype: int
+    """
+    if isinstance(value, np.ndarray):
+        return value.nbytes + sys.getsizeof(value)
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(k) + estimate_size(v) for k, v in value.items()
+        )
+    return sys.getsizeof(value)
+
+
+class ResultCache(Generic[R]):
+    """LRU cache of model results, bounded by memory, with an optional
+    time to live.
+
+    Only use it for deterministic predictions, where the same inputs
+    always give the same outputs. Concurrent requests for the same key
+    share a single computation.
+    """
+
+    def __init__(self, max_bytes: int = 0, ttl_seconds: float = 0):
+        """Initialize the cache
+
+        :param max_bytes: Max total size of cached results, 0 disables
+            the cache, defaults to 0
+        :type max_bytes: int, optional
+        :param ttl_seconds: Seconds before a result expires, 0 or less to
+            never expire, defaults to 0
+        :type ttl_seconds: float, optional
+        """
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        # Key to (result, size, expiry), least recently used first
+        self._entries: "OrderedDict[str, Tuple[Any, int, float]]" = (
+            OrderedDict()
+        )
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        """If results are cached"""
+        return self.max_bytes > 0
+
+    def _get(self, key: str) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        if entry[2] < time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            return False, None
+        self._entries.move_to_end(key)
+        return True, entry[0]
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self.size_bytes -= size
+
+    def _put(self, key: str, result: Any):
+        size = estimate_size(result)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        expiry = (
+            time.monotonic() + self.ttl_seconds
+            if self.ttl_seconds > 0
+            else float("inf")
+        )
+        self._entries[key] = (result, size, expiry)
+        self.size_bytes += size
+        while self.size_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def get_or_compute(self, key: str, compute: Callable[[], R]) -> R:
+        """Returns the cached result of a key, computing it on a miss
+
+        :param key: Cache key, see `content_key`
+        :type key: str
+        :param compute: Computes the result
+        :type compute: Callable[[], R]
+        :return: Result
+        :rtype: R
+        """
+        if not self.enabled:
+            return compute()
+        with self._lock:
+            found, result = self._get(key)
+            if found:
+                self.hits += 1
+                return result
+            self.misses += 1
+            pending = self._pending.get(key)
+            if pending is None:
+                future: "Future[R]" = Future()
+                self._pending[key] = future
+        if pending is not None:
+            # Same inputs are already being computed
+            return pending.result()
+        try:
+            result = compute()
+        except BaseException as err:
+            with self._lock:
+                self._pending.pop(key, None)
+            future.set_exception(err)
+            raise
+        with self._lock:
+            self._pending.pop(key, None)
+            self._put(key, result)
+        future.set_result(result)
+        return result
+
+    def clear(self):
+        """Removes every cached result"""
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def metrics(self) -> Dict[str, Any]:
+        """Cache statistics, e.g for logging
+
+        :return: Hits, misses, hit rate, evictions, expirations,
+            entries and size in bytes
+        :rtype: Dict[str, Any]
+        """
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "size_bytes": self.size_bytes,
+            }
+
+    def log_metrics(self, every: int = 100):
+        """Logs metrics every `every` requests
+
+        :param every: Number of requests between logs, defaults to 100
+        :type every: int, optional
+        """
+        requests = self.hits + self.misses
+        if self.enabled and requests > 0 and requests % every == 0:
+            logging.info(f"Result cache: {self.metrics()}")
@@ -0,0 +1,109 @@
+import logging
+import threading
+import time
+from typing import Callable, List, Optional
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+
+class Readiness:
+    """Tracks if the app can serve requests, for the readiness probe
+    of its deployment (GET /ready).
+
+    The app starts serving while the model loads, but is only ready once
+    a warm up call (e.g a prediction) succeeded, so that no traffic is
+    sent to a cold pod. Checks can be added to stop traffic while a
+    dependency (e.g Triton) is down.
+    """
+
+    def __init__(self, max_retry_seconds: float = 30):
+        """Initialize readiness, not ready until warmed up
+
+        :param max_retry_seconds: Max wait between warm up attempts,
+            defaults to 30
+        :type max_retry_seconds: float, optional
+        """
+        self.max_retry_seconds = max_retry_seconds
+        self.warm_up_seconds: Optional[float] = None
+        self._warm = threading.Event()
+        self._checks: List[Callable[[], bool]] = []
+
+    def add_check(self, check: Callable[[], bool]):
+        """Add a check which must pass for the app to be ready
+
+        :param check: Returns if a dependency is ready
+        :type check: Callable[[], bool]
+        """
+        self._checks.append(check)
+
+    def warm_up(self, warmup: Optional[Callable[[], None]] = None):
+        """Calls `warmup` until it succeeds, then marks the app ready
+
+        :param warmup: Runs the model once, defaults to None
+        :type warmup: Optional[Callable[[], None]], optional
+        """
+        start = time.perf_counter()
+        retry_seconds = min(1.0, self.max_retry_seconds)
+        while warmup is not None:
+            try:
+                warmup()
+                break
+            except Exception as err:  # e.g Triton still starting
+                logging.warning(
+                    f"Warm up failed, retrying in {retry_seconds:.0f}s: {err}"
+                )
+                time.sleep(retry_seconds)
+                retry_seconds = min(retry_seconds * 2, self.max_retry_seconds)
+        self.warm_up_seconds = time.perf_counter() - start
+        self._warm.set()
+        logging.info(f"Warmed up in {self.warm_up_seconds:.2f}s")
+
+    def start(
+        self, warmup: Optional[Callable[[], None]] = None
+    ) -> threading.Thread:
+        """Warms up in a background thread, so that the app can start
+
+        :param warmup: Runs the model once, defaults to None
+        :type warmup: Optional[Callable[[], None]], optional
+        :return: Warm up thread
+        :rtype: threading.Thread
+        """
+        thread = threading.Thread(
+            target=self.warm_up, args=(warmup,), name="warm-up", daemon=True
+        )
+        thread.start()
+        return thread
+
+    @property
+    def ready(self) -> bool:
+        """If warmed up and every check passes"""
+        return self._warm.is_set() and all(check() for check in self._checks)
+
+    def response(self) -> PlainTextResponse:
+        """Response of the readiness endpoint
+
+        :return: 200 if ready, else 503
+        :rtype: PlainTextResponse
+        """
+        if self.ready:
+            return PlainTextResponse("ready")
+        if not self._warm.is_set():
+            return PlainTextResponse("warming up", status_code=503)
+        return PlainTextResponse("not ready", status_code=503)
+
+    def add_route(self, app: FastAPI, path: str = "/ready"):
+        """Serve readiness on the app
+
+        :param app: App serving the interface
+        :type app: FastAPI
+        :param path: Path of the endpoint, defaults to "/ready"
+        :type path: str, optional
+        """
+        app.add_api_route(
+            path, self.response, methods=["GET"], include_in_schema=False
+        )
+
+
+# Shared by the app and the predict module
+readiness = Readiness()
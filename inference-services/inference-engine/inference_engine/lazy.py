@@ -0,0 +1,112 @@
+import logging
+import threading
+import time
+from typing import Callable, Generic, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class LazyLoader(Generic[T]):
+    """Loads a heavy resource (e.g model, tokenizer) in a background thread.
+
+    Heavy imports and loading happen inside `factory`, so that importing
+    the predict module stays fast and the app can start serving while
+    the resource loads. Requests block in `get` until it is ready.
+    If loading failed (e.g the model server was down), the next `get`
+    loads it again instead of failing forever.
+    """
+
+    # Every loader created, so that startup can wait for all of them
+    instances: List["LazyLoader"] = []
+
+    def __init__(self, factory: Callable[[], T], name: str = "resource"):
+        """Initialize the loader. Loading starts with `start` or
+        on the first `get`.
+
+        :param factory: Function which imports and loads the resource
+        :type factory: Callable[[], T]
+        :param name: Name used in logs, defaults to "resource"
+        :type name: str, optional
+        """
+        self.factory = factory
+        self.name = name
+        self.load_seconds: Optional[float] = None
+        # Value and error of the last attempt, replaced together so that
+        # a `get` never sees the value of one attempt and error of another
+        self._result: Tuple[Optional[T], Optional[BaseException]] = (
+            None,
+            None,
+        )
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        LazyLoader.instances.append(self)
+
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            self._result = (self.factory(), None)
+        except BaseException as err:
+            logging.error(f"Failed to load {self.name}: {err}")
+            self._result = (None, err)
+        else:
+            self.load_seconds = time.perf_counter() - start
+            logging.info(f"Loaded {self.name} in {self.load_seconds:.2f}s")
+        finally:
+            self._done.set()
+
+    def start(self) -> "LazyLoader[T]":
+        """Starts loading in a background thread, if not yet started
+        or if the last attempt failed
+
+        :return: This loader
+        :rtype: LazyLoader[T]
+        """
+        with self._lock:
+            failed = self._done.is_set() and self._result[1] is not None
+            if self._thread is None or failed:
+                self._done.clear()
+                self._thread = threading.Thread(
+                    target=self._load, name=f"load-{self.name}", daemon=True
+                )
+                self._thread.start()
+        return self
+
+    @property
+    def ready(self) -> bool:
+        """If the resource has loaded successfully"""
+        return self._done.is_set() and self._result[1] is None
+
+    def get(self, timeout: Optional[float] = None) -> T:
+        """Gets the resource, waiting for it to load. Loads it again if
+        the last attempt failed.
+
+        :param timeout: Seconds to wait, defaults to None
+        :type timeout: Optional[float], optional
+        :raises TimeoutError: If the resource did not load in time
+        :raises RuntimeError: If loading failed
+        :return: Loaded resource
+        :rtype: T
+        """
+        self.start()
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"{self.name} did not load in time")
+        value, error = self._result
+        if error is not None:
+            raise RuntimeError(f"Failed to load {self.name}") from error
+        return value
+
+    @classmethod
+    def wait_all(cls, timeout: Optional[float] = None) -> bool:
+        """Starts every loader, and waits for all of them to finish
+
+        :param timeout: Seconds to wait for each loader, defaults to None
+        :type timeout: Optional[float], optional
+        :return: If every loader loaded successfully
+        :rtype: bool
+        """
+        for loader in cls.instances:
+            loader.start()
+        for loader in cls.instances:
+            loader._done.wait(timeout)
+        return all(loader.ready for loader in cls.instances)
@@ -0,0 +1,96 @@
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+import onnxruntime as ort
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+
+def create_session(
+    model_path: str,
+    intra_op_threads: int = 0,
+    inter_op_threads: int = 0,
+    graph_optimization: str = "all",
+    providers: Optional[List[str]] = None,
+) -> ort.InferenceSession:
+    """Creates an ONNX Runtime session
+
+    :param model_path: Path to ONNX model
+    :type model_path: str
+    :param intra_op_threads: Threads used to run a single operator,
+        0 lets ONNX Runtime decide (one per physical core), defaults to 0
+    :type intra_op_threads: int, optional
+    :param inter_op_threads: Threads used to run independent operators
+        in parallel, 0 lets ONNX Runtime decide, defaults to 0
+    :type inter_op_threads: int, optional
+    :param graph_optimization: One of disable, basic, extended or all,
+        defaults to "all"
+    :type graph_optimization: str, optional
+    :param providers: Execution providers, defaults to CPU only
+    :type providers: Optional[List[str]], optional
+    :return: Inference session
+    :rtype: ort.InferenceSession
+    """
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = intra_op_threads
+    options.inter_op_num_threads = inter_op_threads
+    # Also accepts a str Enum from the config
+    graph_optimization = getattr(
+        graph_optimization, "value", graph_optimization
+    )
+    options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[
+        graph_optimization
+    ]
+    if inter_op_threads > 1:
+        options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+    session = ort.InferenceSession(
+        model_path,
+        sess_options=options,
+        providers=providers or ["CPUExecutionProvider"],
+    )
+    logging.info(
+        f"Loaded {model_path} with {session.get_providers()}, "
+        + f"graph optimization: {graph_optimization}"
+    )
+    return session
+
+
+def run(
+    session: ort.InferenceSession, inputs: Dict[str, np.ndarray]
+) -> List[np.ndarray]:
+    """Runs a session, only passing the inputs the model declares
+    (e.g exported text models may not take token_type_ids)
+
+    :param session: Inference session
+    :type session: ort.InferenceSession
+    :param inputs: Input name to value
+    :type inputs: Dict[str, np.ndarray]
+    :return: Model outputs
+    :rtype: List[np.ndarray]
+    """
+    names = {node.name for node in session.get_inputs()}
+    return session.run(
+        None, {name: value for name, value in inputs.items() if name in names}
+    )
+
+
+def quantize_model(model_path: str, output_path: str):
+    """Applies dynamic int8 quantization to a model. Weights are
+    quantized ahead of time, activations at runtime, which mostly
+    speeds up models dominated by MatMul (e.g transformers) on CPU
+
+    :param model_path: Path to FP32 ONNX model
+    :type model_path: str
+    :param output_path: Path to save quantized model to
+    :type output_path: str
+    """
+    # Only needed at build time
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QInt8)
@@ -0,0 +1,68 @@
+"""Bake Hugging Face artifacts into the image at build time.
+
+By default, the tokenizer and model are downloaded into the Hugging Face
+cache. With --output-dir, they are also saved to a local directory, which
+the app can load from directly (e.g TOKENIZER_PATH=/artifacts/model) with
+TRANSFORMERS_OFFLINE=1, so that startup makes no calls to the Hub. The
+fast tokenizer is saved as tokenizer.json, which loads much faster than
+converting the slow (sentencepiece) tokenizer at startup.
+"""
+from typing import Optional
+
+import click
+import transformers
+from transformers import AutoTokenizer
+
+
+@click.command()
+@click.option(
+    "-m",
+    "--model",
+    type=str,
+    required=True,
+    help="The model name to be cached.",
+)
+@click.option(
+    "-t",
+    "--tokenizer-only",
+    is_flag=True,
+    help="Only cache the tokenizer.",
+)
+@click.option(
+    "-o",
+    "--output-dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Also save the artifacts to this directory.",
+)
+@click.option(
+    "-c",
+    "--model-class",
+    type=str,
+    default="AutoModel",
+    help="transformers class used to load the model "
+    + "(e.g AutoModelForSequenceClassification).",
+)
+def main(
+    model: str,
+    tokenizer_only: bool,
+    output_dir: Optional[str],
+    model_class: str,
+):
+    tokenizer = AutoTokenizer.from_pretrained(model, use_fast=True)
+    if output_dir is not None:
+        tokenizer.save_pretrained(output_dir)
+    if not tokenizer_only:
+        model_cls = getattr(transformers, model_class)
+        if model_class == "AutoModel":
+            hf_model = model_cls.from_pretrained(
+                model, output_hidden_states=True
+            )
+        else:
+            hf_model = model_cls.from_pretrained(model)
+        if output_dir is not None:
+            hf_model.save_pretrained(output_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,753 @@
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+import tritonclient.grpc as tr
+from tritonclient.utils import triton_to_np_dtype
+
+# gRPC status codes which mean the channel to Triton is broken,
+# and a new client should be created
+RECONNECT_STATUSES = ("StatusCode.UNAVAILABLE", "StatusCode.CANCELLED")
+
+
+def triton_health_check(
+    client: tr.InferenceServerClient, model_name: str, model_version: str
+) -> bool:
+    """Checks the status of the Triton Inference Server and
+    the model
+
+    :param client: Triton Client
+    :type client: tr.InferenceServerClient
+    :param model_name: Name of the model
+    :type model_name: str
+    :param model_version: Version of the model (e.g "1")
+    :type model_version: str, optional
+    :return: If everything is up, return True
+    :rtype: bool
+    """
+    return (
+        client.is_server_live()
+        and client.is_server_ready()
+        and client.is_model_ready(
+            model_name=model_name, model_version=model_version
+        )
+    )
+
+
+class TensorSpec(NamedTuple):
+    """Input or output of a model, from its Triton model config"""
+
+    name: str
+    # Triton datatype, e.g FP32
+    datatype: str
+    # Shape without the batch dimension, -1 if variable
+    dims: List[int]
+    # FORMAT_NHWC, FORMAT_NCHW or FORMAT_NONE
+    format: str = "FORMAT_NONE"
+
+    @property
+    def np_dtype(self) -> np.dtype:
+        """numpy dtype of the datatype"""
+        return np.dtype(triton_to_np_dtype(self.datatype))
+
+
+class ModelSpec(NamedTuple):
+    """Inputs, outputs and batching of a model, from its Triton
+    model config"""
+
+    name: str
+    version: str
+    inputs: List[TensorSpec]
+    outputs: List[TensorSpec]
+    # 0 if the model does not support batching
+    max_batch_size: int
+    dynamic_batching: bool
+    preferred_batch_sizes: List[int]
+
+    def input(self, name: Optional[str] = None) -> TensorSpec:
+        """Gets an input by name
+
+        :param name: Name of the input, defaults to the first input
+        :type name: Optional[str], optional
+        :raises ValueError: If the model has no such input
+        :return: Input
+        :rtype: TensorSpec
+        """
+        return _find_tensor(self.inputs, name, self.name)
+
+    def output(self, name: Optional[str] = None) -> TensorSpec:
+        """Gets an output by name
+
+        :param name: Name of the output, defaults to the first output
+        :type name: Optional[str], optional
+        :raises ValueError: If the model has no such output
+        :return: Output
+        :rtype: TensorSpec
+        """
+        return _find_tensor(self.outputs, name, self.name)
+
+    def batch_size(self, limit: int) -> int:
+        """Largest batch to send in one request
+
+        :param limit: Max batch size wanted by the app
+        :type limit: int
+        :return: At most `limit` and the model's max batch size,
+            1 if the model does not support batching
+        :rtype: int
+        """
+        if self.max_batch_size <= 0:
+            return 1
+        return max(1, min(limit, self.max_batch_size))
+
+
+def _find_tensor(
+    tensors: List[TensorSpec], name: Optional[str], model_name: str
+) -> TensorSpec:
+    for tensor in tensors:
+        if name is None or tensor.name == name:
+            return tensor
+    raise ValueError(
+        f"Model {model_name} has no tensor {name}, "
+        + f"expected one of {[tensor.name for tensor in tensors]}"
+    )
+
+
+def _tensor_spec(tensor: dict) -> TensorSpec:
+    datatype = tensor.get("data_type", "TYPE_FP32").replace("TYPE_", "", 1)
+    return TensorSpec(
+        name=tensor["name"],
+        # Strings are BYTES in inference requests
+        datatype="BYTES" if datatype == "STRING" else datatype,
+        # int64 fields are strings in JSON
+        dims=[int(dim) for dim in tensor.get("dims", [])],
+        format=tensor.get("format", "FORMAT_NONE"),
+    )
+
+
+def get_model_config(
+    client: tr.InferenceServerClient, name: str, version: str = ""
+) -> ModelSpec:
+    """Gets the inputs, outputs and batching of a model from Triton,
+    so that they do not need to be set manually. The model must be
+    loaded.
+
+    :param client: Triton client
+    :type client: tr.InferenceServerClient
+    :param name: Name of the model
+    :type name: str
+    :param version: Version of the model, defaults to ""
+    :type version: str, optional
+    :return: Model spec
+    :rtype: ModelSpec
+    """
+    model_config: dict = client.get_model_config(name, version, as_json=True)
+    # The gRPC client wraps the config, and leaves out default values
+    model_config = model_config.get("config", model_config)
+    dynamic_batching = model_config.get("dynamic_batching")
+    return ModelSpec(
+        name=name,
+        version=version,
+        inputs=[_tensor_spec(tensor) for tensor in model_config["input"]],
+        outputs=[_tensor_spec(tensor) for tensor in model_config["output"]],
+        max_batch_size=int(model_config.get("max_batch_size", 0)),
+        dynamic_batching=dynamic_batching is not None,
+        preferred_batch_sizes=[
+            int(size)
+            for size in (dynamic_batching or {}).get(
+                "preferred_batch_size", []
+            )
+        ],
+    )
+
+
+def get_client(
+    url: str,
+    ssl: bool = False,
+    root_certificates: Optional[str] = None,
+    private_key: Optional[str] = None,
+    certificate_chain: Optional[str] = None,
+    **kwargs,
+) -> tr.InferenceServerClient:
+    client = tr.InferenceServerClient(
+        url=url,
+        ssl=ssl,
+        root_certificates=root_certificates,
+        private_key=private_key,
+        certificate_chain=certificate_chain,
+        **kwargs,
+    )
+    return client
+
+
+def load_model(
+    client: tr.InferenceServerClient,
+    name: str,
+    version: str,
+    polling: bool = True,
+):
+    if not polling:
+        client.load_model(model_name=name)
+    if not triton_health_check(client, name, version):
+        raise tr.InferenceServerException(
+            msg="Triton not ready! Health check failed."
+        )
+
+
+def unload_model(
+    client: tr.InferenceServerClient,
+    name: str,
+    unload_dependents: bool = False,
+):
+    client.unload_model(model_name=name, unload_dependents=unload_dependents)
+
+
+def is_connection_error(err: tr.InferenceServerException) -> bool:
+    """Checks if an error was caused by a broken connection to Triton
+
+    :param err: Error raised by the Triton client
+    :type err: tr.InferenceServerException
+    :return: True if the client should reconnect
+    :rtype: bool
+    """
+    return err.status() in RECONNECT_STATUSES
+
+
+class TritonClient:
+    """Process-wide Triton client.
+
+    The gRPC channel is created once and reused by every request,
+    instead of creating a new client per request. Readiness of the
+    server and model is refreshed by a background thread and cached,
+    so that a request only has to send a single Infer RPC. If the
+    connection is lost, the client is recreated and the request is
+    retried once.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        model_name: str,
+        model_version: str = "",
+        ssl: bool = False,
+        root_certificates: Optional[str] = None,
+        private_key: Optional[str] = None,
+        certificate_chain: Optional[str] = None,
+        health_check_interval: float = 5,
+        **kwargs,
+    ):
+        """Initialize the client. No connection is made until
+        the client is first used.
+
+        :param url: Triton GRPC URL (e.g localhost:8001)
+        :type url: str
+        :param model_name: Name of the model
+        :type model_name: str
+        :param model_version: Version of the model, defaults to ""
+        :type model_version: str, optional
+        :param ssl: Flag to enable SSL, defaults to False
+        :type ssl: bool, optional
+        :param root_certificates: Path to root certificates, defaults to None
+        :type root_certificates: Optional[str], optional
+        :param private_key: Path to private key, defaults to None
+        :type private_key: Optional[str], optional
+        :param certificate_chain: Path to certificate chain, defaults to None
+        :type certificate_chain: Optional[str], optional
+        :param health_check_interval: Seconds between background
+            readiness checks, defaults to 5
+        :type health_check_interval: float, optional
+        """
+        self.url = url
+        self.model_name = model_name
+        self.model_version = model_version
+        self.health_check_interval = health_check_interval
+        self._client_kwargs = dict(
+            ssl=ssl,
+            root_certificates=root_certificates,
+            private_key=private_key,
+            certificate_chain=certificate_chain,
+            **kwargs,
+        )
+        self._client: Optional[tr.InferenceServerClient] = None
+        self._lock = threading.Lock()
+        self._spec: Optional[ModelSpec] = None
+        self._spec_lock = threading.Lock()
+        self._ready = False
+        self._stop = threading.Event()
+        self._monitor: Optional[threading.Thread] = None
+
+    @property
+    def client(self) -> tr.InferenceServerClient:
+        """Shared Triton client, created on first access
+
+        :return: Triton client
+        :rtype: tr.InferenceServerClient
+        """
+        with self._lock:
+            if self._client is None:
+                logging.info(f"Connecting to Triton at {self.url}")
+                self._client = get_client(self.url, **self._client_kwargs)
+            return self._client
+
+    @property
+    def ready(self) -> bool:
+        """Cached readiness of the server and model"""
+        return self._ready
+
+    def reconnect(self, client: Optional[tr.InferenceServerClient] = None):
+        """Closes the current client, so that a new one is created
+        on next access
+
+        :param client: Client which failed. If another thread already
+            replaced it, nothing is done. Defaults to None
+        :type client: Optional[tr.InferenceServerClient], optional
+        """
+        with self._lock:
+            if client is not None and client is not self._client:
+                return
+            old_client, self._client = self._client, None
+            self._ready = False
+        if old_client is not None:
+            try:
+                old_client.close()
+            except Exception as err:
+                logging.warning(f"Failed to close Triton client: {err}")
+
+    def check_health(self) -> bool:
+        """Checks readiness of the server and model, and caches the result
+
+        :return: If everything is up, return True
+        :rtype: bool
+        """
+        client = self.client
+        try:
+            ready = triton_health_check(
+                client, self.model_name, self.model_version
+            )
+        except tr.InferenceServerException as err:
+            logging.warning(f"Triton health check failed: {err}")
+            if is_connection_error(err):
+                self.reconnect(client)
+            ready = False
+        self._ready = ready
+        return ready
+
+    def _monitor_health(self):
+        while not self._stop.wait(self.health_check_interval):
+            self.check_health()
+
+    def start(self):
+        """Starts the background readiness checks, if not yet started"""
+        with self._lock:
+            if self._monitor is not None and self._monitor.is_alive():
+                return
+            self._stop.clear()
+            self._monitor = threading.Thread(
+                target=self._monitor_health,
+                name="triton-health-check",
+                daemon=True,
+            )
+            self._monitor.start()
+
+    def close(self):
+        """Stops the background readiness checks and closes the client"""
+        self._stop.set()
+        self.reconnect()
+
+    def model_spec(self) -> ModelSpec:
+        """Config of the model, fetched from Triton once and cached.
+        The model must be loaded.
+
+        :return: Model spec
+        :rtype: ModelSpec
+        """
+        with self._spec_lock:
+            if self._spec is None:
+                self._spec = get_model_config(
+                    self.client, self.model_name, self.model_version
+                )
+                logging.info(f"Discovered model config: {self._spec}")
+            return self._spec
+
+    def prefetch_model_spec(self):
+        """Fetches the model config in the background, e.g at startup
+        when Triton already has the model loaded. If it fails, the
+        next `model_spec` call tries again."""
+
+        def fetch():
+            try:
+                self.model_spec()
+            except tr.InferenceServerException as err:
+                logging.warning(f"Could not get model config yet: {err}")
+
+        threading.Thread(
+            target=fetch, name="triton-model-config", daemon=True
+        ).start()
+
+    def ensure_ready(self):
+        """Raises an error if the server or model is not ready.
+        Only contacts Triton if the cached readiness is stale or False.
+
+        :raises tr.InferenceServerException: If health check failed
+        """
+        self.start()
+        if not self._ready and not self.check_health():
+            raise tr.InferenceServerException(
+                msg="Triton not ready! Health check failed."
+            )
+
+    def infer(
+        self,
+        inputs: List[tr.InferInput],
+        outputs: Optional[List[tr.InferRequestedOutput]] = None,
+        **kwargs,
+    ) -> tr.InferResult:
+        """Sends an inference request for the model, reconnecting
+        and retrying once if the connection was lost
+
+        :param inputs: Model inputs
+        :type inputs: List[tr.InferInput]
+        :param outputs: Requested outputs, defaults to None
+        :type outputs: Optional[List[tr.InferRequestedOutput]], optional
+        :return: Inference result
+        :rtype: tr.InferResult
+        """
+        client = self.client
+        try:
+            return client.infer(
+                model_name=self.model_name,
+                model_version=self.model_version,
+                inputs=inputs,
+                outputs=outputs,
+                **kwargs,
+            )
+        except tr.InferenceServerException as err:
+            if not is_connection_error(err):
+                raise
+            logging.warning(f"Lost connection to Triton, reconnecting: {err}")
+            self.reconnect(client)
+        return self.client.infer(
+            model_name=self.model_name,
+            model_version=self.model_version,
+            inputs=inputs,
+            outputs=outputs,
+            **kwargs,
+        )
+
+
+class ModelManager:
+    """Keeps a model loaded while it is in use.
+
+    In explicit mode, the model is loaded by the first request and kept
+    loaded while requests are in flight. It is only unloaded after it
+    has been idle for `idle_timeout` seconds, so that steady traffic
+    does not pay a model load per request. In polling mode, Triton
+    manages the model, and only the cached readiness is checked.
+    """
+
+    def __init__(
+        self,
+        triton: TritonClient,
+        explicit: bool = False,
+        idle_timeout: float = 300,
+    ):
+        """Initialize the manager
+
+        :param triton: Shared Triton client
+        :type triton: TritonClient
+        :param explicit: If the model must be loaded and unloaded by the
+            client (TRITON_MODE=EXPLICIT), defaults to False
+        :type explicit: bool, optional
+        :param idle_timeout: Seconds without requests before the model
+            is unloaded. If negative, the model is never unloaded,
+            defaults to 300
+        :type idle_timeout: float, optional
+        """
+        self.triton = triton
+        self.explicit = explicit
+        self.idle_timeout = idle_timeout
+        self._cond = threading.Condition()
+        self._refs = 0
+        self._loaded = False
+        # Set while a load or unload is in progress
+        self._busy = False
+        self._last_used = time.monotonic()
+        self._timer: Optional[threading.Timer] = None
+        self.load_count = 0
+        self.unload_count = 0
+        self.last_cold_start = 0.0
+        self.total_cold_start = 0.0
+
+    @contextmanager
+    def use(self) -> Iterator[None]:
+        """Context manager which ensures the model is ready
+        for the duration of the block
+
+        :raises tr.InferenceServerException: If model failed to load
+        """
+        if not self.explicit:
+            # Uses cached readiness, no extra RPCs in the common case
+            self.triton.ensure_ready()
+            yield
+            return
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self):
+        """Registers a request using the model, loading it if needed
+
+        :raises tr.InferenceServerException: If model failed to load
+        """
+        with self._cond:
+            self._refs += 1
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            while self._busy:
+                self._cond.wait()
+            if self._loaded:
+                return
+            self._busy = True
+        start = time.perf_counter()
+        try:
+            load_model(
+                self.triton.client,
+                self.triton.model_name,
+                self.triton.model_version,
+                polling=False,
+            )
+        except Exception:
+            with self._cond:
+                self._refs -= 1
+                self._busy = False
+                self._cond.notify_all()
+            raise
+        elapsed = time.perf_counter() - start
+        with self._cond:
+            self._loaded = True
+            self._busy = False
+            self.load_count += 1
+            self.last_cold_start = elapsed
+            self.total_cold_start += elapsed
+            self._cond.notify_all()
+        logging.info(
+            f"Loaded model {self.triton.model_name} in {elapsed:.2f}s: "
+            + f"{self.metrics()}"
+        )
+
+    def release(self):
+        """Unregisters a request, and schedules the model to be unloaded
+        if there are no more requests using it"""
+        with self._cond:
+            self._refs -= 1
+            self._last_used = time.monotonic()
+            if self._refs > 0 or not self._loaded or self.idle_timeout < 0:
+                return
+            self._timer = threading.Timer(
+                self.idle_timeout, self._unload_if_idle
+            )
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _unload_if_idle(self):
+        with self._cond:
+            idle = time.monotonic() - self._last_used
+            if (
+                self._refs > 0
+                or self._busy
+                or not self._loaded
+                or idle < self.idle_timeout
+            ):
+                return
+            self._busy = True
+        try:
+            unload_model(self.triton.client, self.triton.model_name)
+        except Exception as err:
+            logging.warning(f"Failed to unload model: {err}")
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+            return
+        with self._cond:
+            self._loaded = False
+            self._busy = False
+            self.unload_count += 1
+            self._cond.notify_all()
+        logging.info(
+            f"Unloaded model {self.triton.model_name} after {idle:.0f}s "
+            + f"idle: {self.metrics()}"
+        )
+
+    def metrics(self) -> Dict[str, float]:
+        """Model lifecycle metrics, logged on every load and unload
+
+        :return: Load and unload counts, and cold start latency in seconds
+        :rtype: Dict[str, float]
+        """
+        with self._cond:
+            return {
+                "loaded": float(self._loaded),
+                "in_flight": self._refs,
+                "load_count": self.load_count,
+                "unload_count": self.unload_count,
+                "last_cold_start_seconds": self.last_cold_start,
+                "avg_cold_start_seconds": (
+                    self.total_cold_start / self.load_count
+                    if self.load_count
+                    else 0.0
+                ),
+            }
+
+
+class SharedMemoryRegion:
+    """A system shared memory region registered with Triton"""
+
+    def __init__(self, name: str, byte_size: int):
+        """Create the region. It is registered by the SharedMemoryPool.
+
+        :param name: Name of the region
+        :type name: str
+        :param byte_size: Size of the region in bytes
+        :type byte_size: int
+        """
+        # Only imported when used, as it requires the native shm library
+        import tritonclient.utils.shared_memory as shm
+
+        self._shm = shm
+        self.name = name
+        self.key = f"/{name}"
+        self.byte_size = byte_size
+        self.handle = shm.create_shared_memory_region(
+            name, self.key, byte_size
+        )
+
+    def set_input(
+        self, infer_input: tr.InferInput, array: np.ndarray, offset: int = 0
+    ) -> int:
+        """Copies an array into the region, and points an input to it
+
+        :param infer_input: Input to send from shared memory
+        :type infer_input: tr.InferInput
+        :param array: Input data
+        :type array: np.ndarray
+        :param offset: Offset in bytes to write to, defaults to 0
+        :type offset: int, optional
+        :return: Offset after the written data
+        :rtype: int
+        """
+        self._shm.set_shared_memory_region(self.handle, [array], offset)
+        infer_input.set_shared_memory(self.name, array.nbytes, offset)
+        return offset + array.nbytes
+
+    def destroy(self):
+        """Frees the region"""
+        self._shm.destroy_shared_memory_region(self.handle)
+
+
+class SharedMemoryPool:
+    """Pool of system shared memory regions, registered once and reused
+    by every request.
+
+    Sending tensors through shared memory avoids serializing them into
+    the gRPC message, but requires Triton to run on the same host and
+    share /dev/shm with the app (e.g a sidecar in the same pod).
+    Each region is used by one request at a time.
+    """
+
+    def __init__(
+        self,
+        triton: TritonClient,
+        byte_size: int,
+        count: int = 1,
+        prefix: str = "gradio",
+    ):
+        """Initialize the pool. Regions are created and registered
+        on first use.
+
+        :param triton: Shared Triton client
+        :type triton: TritonClient
+        :param byte_size: Size of each region in bytes
+        :type byte_size: int
+        :param count: Number of regions, i.e max concurrent requests
+            using shared memory, defaults to 1
+        :type count: int, optional
+        :param prefix: Prefix of region names, defaults to "gradio"
+        :type prefix: str, optional
+        """
+        self.triton = triton
+        self.byte_size = byte_size
+        self.count = count
+        self.prefix = f"{prefix}_{os.getpid()}"
+        self._regions: List[SharedMemoryRegion] = []
+        self._free: queue.Queue = queue.Queue()
+        self._registered = False
+        self._lock = threading.Lock()
+
+    def register(self):
+        """Creates the regions if needed, and registers them with Triton"""
+        with self._lock:
+            if self._registered:
+                return
+            if len(self._regions) == 0:
+                for i in range(self.count):
+                    region = SharedMemoryRegion(
+                        f"{self.prefix}_{i}", self.byte_size
+                    )
+                    self._regions.append(region)
+                    self._free.put(region)
+            client = self.triton.client
+            for region in self._regions:
+                # Registration may be left over from a previous attempt
+                client.unregister_system_shared_memory(region.name)
+                client.register_system_shared_memory(
+                    region.name, region.key, region.byte_size
+                )
+            self._registered = True
+            logging.info(
+                f"Registered {self.count} shared memory regions "
+                + f"of {self.byte_size} bytes"
+            )
+
+    @contextmanager
+    def region(self) -> Iterator[SharedMemoryRegion]:
+        """Context manager which checks out a free region,
+        waiting for one if all are in use
+
+        :return: Registered region
+        :rtype: Iterator[SharedMemoryRegion]
+        """
+        self.register()
+        region = self._free.get()
+        try:
+            yield region
+        except tr.InferenceServerException:
+            # Registration is lost if Triton restarts, so register again
+            # on next use
+            self._registered = False
+            raise
+        finally:
+            self._free.put(region)
+
+    def close(self):
+        """Unregisters and frees all regions"""
+        with self._lock:
+            for region in self._regions:
+                try:
+                    self.triton.client.unregister_system_shared_memory(
+                        region.name
+                    )
+                except tr.InferenceServerException as err:
+                    logging.warning(
+                        f"Failed to unregister {region.name}: {err}"
+                    )
+                region.destroy()
+            self._regions = []
+            self._free = queue.Queue()
+            self._registered = False
@@ -1,6 +1,8 @@
 import logging
-from typing import Any, Dict, List, Optional, Union
-{% if cookiecutter.gradio_version == "v2.9.4" %}
+import threading
+from contextlib import nullcontext
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+{% if cookiecutter.gradio_version == "2.9.4" %}
 import gradio.inputs as gr_inputs
 import gradio.outputs as gr_outputs
 {% else %}
@@ -9,95 +11,285 @@ import gradio as gr
 
 import numpy as np
 import tritonclient.grpc as tr
-from config import TensorFormat, config
-from triton_utils import get_client, load_model, unload_model
+from config import TensorFormat, TritonMode, config
+from inference_engine.batcher import MicroBatcher
+from inference_engine.cache import ResultCache, content_key
+from inference_engine.health import readiness
+from inference_engine.triton_utils import (
+    ModelManager,
+    ModelSpec,
+    SharedMemoryPool,
+    TensorSpec,
+    TritonClient,
+)
+from processing import ImagePreprocessor, LabelTable
 
-{% if cookiecutter.gradio_version == "v2.9.4" %}
-inputs = gr_inputs.Image(shape=(config.img_width, config.img_height))
+{% if cookiecutter.gradio_version == "2.9.4" %}
+# Without a configured size, images are resized to the model's input
+image_shape = (
+    (config.img_width, config.img_height)
+    if config.img_width and config.img_height
+    else None
+)
+inputs = gr_inputs.Image(shape=image_shape)
 outputs = gr_outputs.Label(num_top_classes=config.top_k)
 {% else %}
-inputs = gr.Image(shape=(config.img_width, config.img_height))
+# Without a configured size, images are resized to the model's input
+image_shape = (
+    (config.img_width, config.img_height)
+    if config.img_width and config.img_height
+    else None
+)
+inputs = gr.Image(shape=image_shape)
 outputs = gr.Label(num_top_classes=config.top_k)
 {% endif %}
 
 examples: Optional[Union[List[Any], List[List[Any]], str]] = None
 
 
-def predict(image: np.ndarray) -> Dict[str, float]:
-    """Takes in an image, and
-    calls Triton to infer it's class
+# Shared by all requests, so that the gRPC channel is reused
+triton = TritonClient(
+    config.triton_url,
+    config.model_name,
+    config.model_version,
+    ssl=config.triton_ssl,
+    root_certificates=config.triton_root_certs,
+    private_key=config.triton_private_key,
+    certificate_chain=config.triton_cert_chain,
+    health_check_interval=config.triton_health_check_interval,
+)
 
-    :param image: Image
-    :type image: np.ndarray
-    :return: Predicted classes with confidence
-    :rtype: Dict[str, float]
+# Keeps the model loaded while requests are flowing in explicit mode
+models = ModelManager(
+    triton,
+    explicit=config.triton_mode == TritonMode.explicit,
+    idle_timeout=config.triton_idle_unload_seconds,
+)
+
+
+class ModelIO(NamedTuple):
+    """How to call the model, from the config and the model in Triton"""
+
+    input: TensorSpec
+    output: TensorSpec
+    num_labels: int
+    batch_size: int
+    # False if the model does not take a batch dimension
+    batched: bool
+    preprocess: ImagePreprocessor
+    shm_pool: Optional[SharedMemoryPool]
+
+
+def image_layout(tensor: TensorSpec) -> Tuple[int, int, TensorFormat]:
+    """Image width, height and tensor format, from the config,
+    or else the model input
+
+    :param tensor: Model input
+    :type tensor: TensorSpec
+    :raises ValueError: If the model takes images of any size, and
+        IMG_WIDTH and IMG_HEIGHT are not set
+    :return: Width, height and tensor format
+    :rtype: Tuple[int, int, TensorFormat]
     """
-    # Initialize Triton GRPC Client
-    logging.info("Request received")
-    client = get_client(
-        config.triton_url,
-        config.triton_ssl,
-        config.triton_root_certs,
-        config.triton_private_key,
-        config.triton_cert_chain,
+    tensor_format = config.img_tensor_format
+    dims = tensor.dims[-3:]
+    if tensor_format is None:
+        nchw = tensor.format == "FORMAT_NCHW" or (
+            tensor.format == "FORMAT_NONE" and len(dims) == 3 and dims[0] == 3
+        )
+        tensor_format = TensorFormat.nchw if nchw else TensorFormat.nhwc
+    if len(dims) < 3:
+        dims = [-1, -1, -1]
+    if tensor_format == TensorFormat.nchw:
+        height, width = dims[1], dims[2]
+    else:
+        height, width = dims[0], dims[1]
+    width = config.img_width or width
+    height = config.img_height or height
+    if width <= 0 or height <= 0:
+        raise ValueError(
+            f"Input {tensor.name} takes images of any size, "
+            + "set IMG_WIDTH and IMG_HEIGHT"
+        )
+    return width, height, tensor_format
+
+
+def create_model_io(spec: ModelSpec) -> ModelIO:
+    """Works out how to call the model, config settings take
+    precedence over the model config
+
+    :param spec: Model config from Triton
+    :type spec: ModelSpec
+    :return: Model IO
+    :rtype: ModelIO
+    """
+    input_spec = spec.input(config.input_layer)
+    output_spec = spec.output(config.output_layer)
+    width, height, tensor_format = image_layout(input_spec)
+    num_labels = config.num_labels or (
+        output_spec.dims[-1] if output_spec.dims else 0
     )
-    logging.info("Loaded Triton client")
-    try:
-        load_model(
-            client,
-            config.model_name,
-            config.model_version,
-            config.triton_mode == "POLLING",
+    batch_size = spec.batch_size(config.batch_max_size)
+    # Later batches are only as large as the model takes
+    batcher.max_batch_size = batch_size
+    return ModelIO(
+        input=input_spec,
+        output=output_spec,
+        num_labels=num_labels if num_labels > 0 else config.top_k,
+        batch_size=batch_size,
+        batched=spec.max_batch_size > 0,
+        # Writes images straight into a reused input buffer
+        preprocess=ImagePreprocessor(
+            width,
+            height,
+            tensor_format,
+            max_batch_size=batch_size,
+            mean=config.normalize_mean if config.normalize_img else None,
+            std=config.normalize_std,
+        ),
+        # Optionally send the input batch through shared memory,
+        # using a region sized for the largest batch
+        shm_pool=SharedMemoryPool(
+            triton,
+            byte_size=batch_size
+            * 3
+            * width
+            * height
+            * input_spec.np_dtype.itemsize,
         )
-        logging.info("Loaded model for inference")
-        # Perform preprocessing
-        # assumes RGB image and FP32 input
-        if config.normalize_img:
-            logging.info("Normalizing image")
-            image = (
-                image.astype(np.float32) - config.normalize_mean
-            ) / config.normalize_std
-
-        # Default shape of image is Width, Height, 3
-        logging.info(f"Tensor Format: {config.img_tensor_format}")
-        if config.img_tensor_format == TensorFormat.nhwc:
-            # Convert to Height, Width, 3
-            shape = [1, config.img_height, config.img_width, 3]
-            image = np.transpose(image, (1, 0, 2))
-        elif config.img_tensor_format == TensorFormat.nchw:
-            # Convert to 3, Height, Width
-            shape = [1, 3, config.img_height, config.img_width]
-            image = np.transpose(image, (2, 1, 0))
-        else:
-            raise NotImplementedError("Format not supported yet")
+        if config.triton_shared_memory
+        else None,
+    )
+
+
+model_io: Optional[ModelIO] = None
+model_io_lock = threading.Lock()
+
+
+def get_model_io() -> ModelIO:
+    """Model IO, created once the model config is known
+
+    :return: Model IO
+    :rtype: ModelIO
+    """
+    global model_io
+    with model_io_lock:
+        if model_io is None:
+            model_io = create_model_io(triton.model_spec())
+        return model_io
+
+
+if config.triton_mode == TritonMode.polling:
+    # The model is already loaded, so the config can be fetched now
+    triton.prefetch_model_spec()
+    # Stop traffic while Triton is down. Not in explicit mode, where
+    # the model is unloaded while idle
+    readiness.add_check(lambda: triton.ready)
+
+labels = (
+    LabelTable.from_file(config.labels_path)
+    if config.labels_path is not None
+    else LabelTable()
+)
 
-        # Define expected input and output for Triton
-        expected_input = tr.InferInput(config.input_layer, shape, "FP32")
-        expected_input.set_data_from_numpy(np.expand_dims(image, 0))
+
+def predict_batch(images: List[np.ndarray]) -> List[Dict[str, float]]:
+    """Takes in a batch of images, and
+    calls Triton once to infer their classes
+
+    :param images: Images
+    :type images: List[np.ndarray]
+    :return: Predicted classes with confidence, for each image
+    :rtype: List[Dict[str, float]]
+    """
+    with models.use():
+        io = get_model_io()
+        results = []
+        # Batches collected before the model config was known
+        # may be larger than the model takes
+        for start in range(0, len(images), io.batch_size):
+            results.extend(infer(io, images[start : start + io.batch_size]))
+        return results
+
+
+def infer(io: ModelIO, images: List[np.ndarray]) -> List[Dict[str, float]]:
+    """Calls Triton once for a batch the model takes
+
+    :param io: Model IO
+    :type io: ModelIO
+    :param images: Images
+    :type images: List[np.ndarray]
+    :return: Predicted classes with confidence, for each image
+    :rtype: List[Dict[str, float]]
+    """
+    # assumes RGB image
+    batch = io.preprocess(images)
+    if batch.dtype != io.input.np_dtype:
+        batch = batch.astype(io.input.np_dtype)
+    if not io.batched:
+        batch = batch[0]
+
+    # Define expected input and output for Triton
+    expected_input = tr.InferInput(
+        io.input.name, list(batch.shape), io.input.datatype
+    )
+    if labels.labels is None:
+        # Let Triton pick the top k, only those are decoded
         expected_output = tr.InferRequestedOutput(
-            config.output_layer, class_count=config.num_labels
+            io.output.name,
+            class_count=min(config.top_k, io.num_labels),
         )
+    else:
+        expected_output = tr.InferRequestedOutput(io.output.name)
 
-        # Send Inference
-        logging.info("Sending infer request to Triton")
-        preds = client.infer(
-            model_name=config.model_name,
+    # Send Inference
+    logging.info(f"Sending infer request for {len(images)} images")
+    use_shm = io.shm_pool is not None and batch.nbytes <= io.shm_pool.byte_size
+    with io.shm_pool.region() if use_shm else nullcontext() as region:
+        if region is None:
+            expected_input.set_data_from_numpy(batch)
+        else:
+            region.set_input(expected_input, batch)
+        preds = triton.infer(
             inputs=[expected_input],
             outputs=[expected_output],
             client_timeout=config.triton_client_timeout,
-        ).as_numpy(config.output_layer)
-
-        # Process output
-        logging.info("Processing output")
-        processed_preds = [
-            result.decode("utf-8").split(":") for result in preds.tolist()[0]
-        ]
-        results = {}
-        for confidence, _, class_name in processed_preds:
-            results[class_name] = float(confidence)
-        return results
-    finally:
-        # No matter what, unload model after prediction
-        if config.triton_mode == "EXPLICIT" and client is not None:
-            logging.info("Unloading model")
-            unload_model(client, config.model_name)
+        ).as_numpy(io.output.name)
+
+    # Process output
+    preds = preds.reshape(len(images), -1)
+    if labels.labels is None:
+        return labels.decode(preds)
+    return labels.top_k(preds, config.top_k)
+
+
+# Concurrent requests are sent to Triton together
+batcher = MicroBatcher(
+    predict_batch, config.batch_max_size, config.batch_max_latency_ms
+)
+# Opt-in (CACHE_MAX_BYTES), repeated images skip Triton
+cache = ResultCache(config.cache_max_bytes, config.cache_ttl_seconds)
+
+
+def warmup():
+    """Runs a blank image through the model, so that the first request
+    does not wait for the connection to Triton or the model to load
+    """
+    predict_batch([np.zeros((64, 64, 3), dtype=np.uint8)])
+
+
+def predict(image: np.ndarray) -> Dict[str, float]:
+    """Takes in an image, and
+    calls Triton to infer it's class
+
+    :param image: Image
+    :type image: np.ndarray
+    :return: Predicted classes with confidence
+    :rtype: Dict[str, float]
+    """
+    logging.info("Request received")
+    result = cache.get_or_compute(
+        content_key(image), lambda: batcher.submit(image)
+    )
+    cache.log_metrics()
+    return result
@@ -0,0 +1,79 @@
+"""Compare CPU latency of padding to max_length vs bucketed padding,
+for short and long inputs.
+
+Example:
+    python benchmark_seq_length.py --runs 10 --threads 4
+"""
+import time
+
+import click
+import numpy as np
+import torch
+from transformers import (
+    XLMRobertaForSequenceClassification,
+    XLMRobertaTokenizer,
+)
+
+MODEL = "joeddav/xlm-roberta-large-xnli"
+MAX_LENGTH = 256
+BUCKETS = (32, 64, 128, 256)
+LABELS = ["climate", "sports", "politics", "finance", "health"]
+INPUTS = {
+    "short": "Earth is warming up",
+    "long": " ".join(["The climate summit ended without an agreement."] * 20),
+}
+
+
+def bucket_length(length: int) -> int:
+    return next((b for b in BUCKETS if length <= b), MAX_LENGTH)
+
+
+@click.command()
+@click.option("-r", "--runs", type=int, default=10, help="Timed runs.")
+@click.option("-t", "--threads", type=int, default=None, help="CPU threads.")
+def main(runs: int, threads: int):
+    if threads is not None:
+        torch.set_num_threads(threads)
+    tokenizer = XLMRobertaTokenizer.from_pretrained(MODEL)
+    model = XLMRobertaForSequenceClassification.from_pretrained(
+        MODEL, return_dict=False
+    ).eval()
+    hypotheses = [f"This example is {label}." for label in LABELS]
+    for name, text in INPUTS.items():
+        longest = tokenizer(
+            [text] * len(LABELS),
+            hypotheses,
+            truncation=True,
+            max_length=MAX_LENGTH,
+            padding="longest",
+            return_tensors="pt",
+        )["input_ids"].shape[1]
+        for mode, length in (
+            ("max_length", MAX_LENGTH),
+            ("bucketed", bucket_length(longest)),
+        ):
+            x = tokenizer(
+                [text] * len(LABELS),
+                hypotheses,
+                truncation=True,
+                max_length=length,
+                padding="max_length",
+                return_tensors="pt",
+            )["input_ids"]
+            mask = (x != tokenizer.pad_token_id).long()
+            timings = []
+            with torch.inference_mode():
+                model(x, mask)  # warm up
+                for _ in range(runs):
+                    start = time.perf_counter()
+                    model(x, mask)
+                    timings.append(time.perf_counter() - start)
+            print(
+                f"{name:>5} input, {mode:>10} (seq_len={length:>3}): "
+                + f"p50 {np.percentile(timings, 50) * 1000:.1f} ms, "
+                + f"p95 {np.percentile(timings, 95) * 1000:.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,13 @@ import logging
 
 import gradio as gr
 from config import config
-from predict import examples, inputs, outputs, predict
+from inference_engine.health import readiness
+from predict import examples, inputs, outputs, predict, warmup
 
 if __name__ == "__main__":
     logging.basicConfig(format="[%(asctime)s] %(levelname)s: %(message)s")
+    # Ready (GET /ready) once the model has been warmed up
+    readiness.start(warmup)
     app = gr.Interface(
         predict,
         inputs=inputs,
@@ -14,13 +17,26 @@ if __name__ == "__main__":
         description="{{ cookiecutter.short_description }}",
         examples=examples,
     )
-    {% if cookiecutter.gradio_version == "v2.9.4" %}
+    {% if cookiecutter.gradio_version == "2.9.4" %}
+    from gradio.routes import app as server_app
+
+    readiness.add_route(server_app)
+    # The queue runs one request at a time, leaving nothing to batch,
+    # so it is only enabled if batching is disabled
     app.launch(
-        server_name="0.0.0.0", server_port=config.port, enable_queue=True
+        server_name="0.0.0.0",
+        server_port=config.port,
+        enable_queue=config.batch_max_size == 1,
     )
     {% else %}
-    app.launch(
+    # Run enough requests concurrently to fill a batch
+    server_app, _, _ = app.queue(
+        concurrency_count=config.batch_max_size
+    ).launch(
         server_name="0.0.0.0",
-        server_port=config.port
-    ).queue()
+        server_port=config.port,
+        prevent_thread_lock=True,
+    )
+    readiness.add_route(server_app)
+    app.block_thread()
     {% endif %}
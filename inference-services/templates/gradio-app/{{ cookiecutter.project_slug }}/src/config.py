@@ -1,3 +1,4 @@
+from enum import Enum
 from typing import Optional
 
 from pydantic import BaseSettings, Field
@@ -7,6 +8,13 @@ class TritonMode(str, Enum):
     polling = "POLLING"
     explicit = "EXPLICIT"
 {% endif %}
+{% if cookiecutter.inference_backend == "ONNX Runtime" %}
+class GraphOptimization(str, Enum):
+    disable = "disable"
+    basic = "basic"
+    extended = "extended"
+    all = "all"
+{% endif %}
 
 class Config(BaseSettings):
     """Define any config here.
@@ -17,6 +25,56 @@ class Config(BaseSettings):
     # KNative assigns a $PORT environment variable to the container
     port: int = Field(default=8080, env="PORT",description="Gradio App Server Port")
 
+    # Batching Settings
+    batch_max_size: int = Field(
+        default=8,
+        env="BATCH_MAX_SIZE",
+        description="Max requests per model call, 1 disables batching",
+    )
+    batch_max_latency_ms: float = Field(
+        default=10,
+        env="BATCH_MAX_LATENCY_MS",
+        description="Max time to wait for a batch to fill up",
+    )
+
+    # Result Cache Settings
+    cache_max_bytes: int = Field(
+        default=0,
+        env="CACHE_MAX_BYTES",
+        description="Memory for results of repeated inputs (e.g examples), "
+        + "0 disables the cache. Only for deterministic predictions",
+    )
+    cache_ttl_seconds: float = Field(
+        default=3600,
+        env="CACHE_TTL_SECONDS",
+        description="Seconds before a cached result expires, 0 to never expire",
+    )
+
+    # Video Settings
+    video_mode: bool = Field(
+        default=False,
+        env="VIDEO_MODE",
+        description="Take a video, and stream results while it is processed",
+    )
+    video_queue_size: int = Field(
+        default=32,
+        env="VIDEO_QUEUE_SIZE",
+        description="Max decoded frames waiting for the model",
+    )
+    video_max_in_flight: int = Field(
+        default=16,
+        env="VIDEO_MAX_IN_FLIGHT",
+        description="Max frames submitted to the model but not yet returned",
+    )
+    video_frame_stride: int = Field(
+        default=1, env="VIDEO_FRAME_STRIDE", description="Run every n-th frame"
+    )
+    video_update_every: int = Field(
+        default=10,
+        env="VIDEO_UPDATE_EVERY",
+        description="Frames between updates streamed back to the client",
+    )
+
     {% if cookiecutter.inference_backend == "Triton" %}
     triton_url: str = Field(default="localhost:8001", env="TRITON_URL")
     triton_mode: TritonMode = Field(
@@ -31,6 +89,40 @@ class Config(BaseSettings):
     triton_private_key: Optional[str] = Field(default=None, env="TRITON_PRIVATE_KEY")
     triton_cert_chain: Optional[str] = Field(default=None, env="TRITON_CERT_CHAIN")
     triton_client_timeout: float = Field(default=300, env="TRITON_CLIENT_TIMEOUT")
+    triton_health_check_interval: float = Field(
+        default=5,
+        env="TRITON_HEALTH_CHECK_INTERVAL",
+        description="Seconds between background readiness checks",
+    )
+    triton_idle_unload_seconds: float = Field(
+        default=300,
+        env="TRITON_IDLE_UNLOAD_SECONDS",
+        description="In explicit mode, unload the model after this many "
+        + "seconds without requests. If negative, never unload",
+    )
+    triton_shared_memory: bool = Field(
+        default=False,
+        env="TRITON_SHARED_MEMORY",
+        description="Send inputs through system shared memory. Requires "
+        + "Triton to share /dev/shm with the app (e.g sidecar in same pod)",
+    )
+    {% endif %}
+
+    {% if cookiecutter.inference_backend == "ONNX Runtime" %}
+    onnx_model_path: str = Field(default="model.onnx", env="ONNX_MODEL_PATH")
+    ort_intra_op_threads: int = Field(
+        default=0,
+        env="ORT_INTRA_OP_THREADS",
+        description="Threads per operator, 0 uses one per physical core",
+    )
+    ort_inter_op_threads: int = Field(
+        default=0,
+        env="ORT_INTER_OP_THREADS",
+        description="Threads to run independent operators in parallel",
+    )
+    ort_graph_optimization: GraphOptimization = Field(
+        default=GraphOptimization.all, env="ORT_GRAPH_OPTIMIZATION"
+    )
     {% endif %}
 
 config = Config()
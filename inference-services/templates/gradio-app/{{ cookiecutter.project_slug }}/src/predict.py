@@ -1,23 +1,132 @@
 import logging
-from typing import Any, List, Optional, Union
+from typing import Any, Iterator, List, Optional, Tuple, Union
 
+import numpy as np
 from config import config
-{% if cookiecutter.gradio_version == "v2.9.4" %}
+from inference_engine.batcher import MicroBatcher
+from inference_engine.cache import ResultCache, content_key
+from video import VideoStream, VideoWriter
+{% if cookiecutter.gradio_version == "2.9.4" %}
+import gradio.inputs as gr_inputs
+import gradio.outputs as gr_outputs
 from gradio.inputs import InputComponent
 from gradio.outputs import OutputComponent
 
 inputs: List[Union[str, InputComponent]] = ["text"]
 outputs: List[Union[str, OutputComponent]] = ["text"]
+if config.video_mode:
+    inputs = [gr_inputs.Video(label="Video")]
+    outputs = [gr_outputs.Video(label="Annotated Video")]
 {% else %}
 import gradio as gr
 
 inputs: List[Union[str, gr.components.Component]] = ["text"]
 outputs: List[Union[str, gr.components.Component]] = ["text"]
+if config.video_mode:
+    inputs = [gr.Video(label="Video")]
+    # Updated every config.video_update_every frames while processing
+    outputs = [
+        gr.Image(label="Latest Frame"),
+        gr.JSON(label="Results"),
+        gr.Video(label="Annotated Video"),
+    ]
 {% endif %}
 
 examples: Optional[Union[List[Any], List[List[Any]], str]] = None
 
 
-def predict(name: str) -> str:
+def predict_batch(names: List[str]) -> List[str]:
     # TODO: Implement this!
-    return f"Hello {name}"
+    # Called with up to config.batch_max_size inputs from concurrent
+    # requests, must return one output per input in the same order
+    return [f"Hello {name}" for name in names]
+
+
+def predict_frames(frames: List[np.ndarray]) -> List[Tuple[np.ndarray, Any]]:
+    # TODO: Implement this for VIDEO_MODE!
+    # Called with up to config.batch_max_size RGB frames, from one or
+    # more videos. Must return the annotated frame and the result
+    # (e.g detections) of each frame, in the same order
+    return [(frame, None) for frame in frames]
+
+
+batcher = MicroBatcher(
+    predict_batch, config.batch_max_size, config.batch_max_latency_ms
+)
+frame_batcher = MicroBatcher(
+    predict_frames,
+    config.batch_max_size,
+    config.batch_max_latency_ms,
+    name="frame-batcher",
+)
+# Opt-in (CACHE_MAX_BYTES), repeated inputs skip the model
+cache = ResultCache(config.cache_max_bytes, config.cache_ttl_seconds)
+
+
+def warmup():
+    # TODO: Run the model once, so that the first request does not pay
+    # for loading it. The app is only ready (GET /ready) once this
+    # returns, and it is retried until it succeeds
+    if config.video_mode:
+        predict_frames([np.zeros((224, 224, 3), dtype=np.uint8)])
+    else:
+        predict_batch(["warm up"])
+
+
+def predict_text(name: str) -> str:
+    # Wrap file paths in pathlib.Path to key on the file contents
+    result = cache.get_or_compute(
+        content_key(name), lambda: batcher.submit(name)
+    )
+    cache.log_metrics()
+    return result
+
+
+{% if cookiecutter.gradio_version == "2.9.4" %}
+def predict_video(video: str) -> str:
+    """Runs every frame of a video through the model, and returns
+    the annotated video
+
+    :param video: Path to video
+    :type video: str
+    :return: Path to annotated video
+    :rtype: str
+    """
+{% else %}
+def predict_video(video: str) -> Iterator[Tuple[Any, Any, Optional[str]]]:
+    """Runs every frame of a video through the model, streaming the
+    latest annotated frame and results while the video is processed
+
+    :param video: Path to video
+    :type video: str
+    :yield: Latest annotated frame, results so far, and the
+        annotated video once done
+    :rtype: Iterator[Tuple[Any, Any, Optional[str]]]
+    """
+{% endif %}
+    logging.info("Video received")
+    stream = VideoStream(
+        video,
+        frame_batcher.submit_future,
+        queue_size=config.video_queue_size,
+        max_in_flight=config.video_max_in_flight,
+        stride=config.video_frame_stride,
+    )
+    frame, results = None, []
+    with VideoWriter(stream.fps) as writer:
+        for i, (frame, result) in enumerate(stream):
+            writer.write(frame)
+            results.append(result)
+{% if cookiecutter.gradio_version != "2.9.4" %}
+            if i % config.video_update_every == 0:
+                yield frame, results, None
+{% endif %}
+    logging.info(f"Processed {len(results)} frames")
+{% if cookiecutter.gradio_version == "2.9.4" %}
+    return writer.path
+{% else %}
+    yield frame, results, writer.path
+{% endif %}
+
+
+predict = predict_video if config.video_mode else predict_text
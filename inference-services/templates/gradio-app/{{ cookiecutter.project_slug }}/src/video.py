@@ -0,0 +1,187 @@
+import logging
+import os
+import queue
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Generic, Iterator, Optional, TypeVar
+
+import numpy as np
+
+R = TypeVar("R")
+
+# Marks the end of the frames in the queue
+_DONE = object()
+
+
+class VideoStream(Generic[R]):
+    """Runs the frames of a video through a model while it is decoded.
+
+    A producer thread decodes frames into a bounded queue, so decoding
+    overlaps with inference without holding the whole clip in memory.
+    Frames are submitted to a batcher (e.g `MicroBatcher.submit_future`)
+    as they arrive, so they are batched together, and with other
+    requests. Iterating yields results in frame order as soon as each
+    one is ready.
+
+    OpenCV is required (e.g `opencv-python-headless`).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        submit: Callable[[np.ndarray], "Future[R]"],
+        queue_size: int = 32,
+        max_in_flight: int = 16,
+        stride: int = 1,
+        max_frames: Optional[int] = None,
+    ):
+        """Initialize the stream. Decoding starts when iterated.
+
+        :param path: Path to video
+        :type path: str
+        :param submit: Submits an RGB frame to the model
+        :type submit: Callable[[np.ndarray], Future[R]]
+        :param queue_size: Max decoded frames waiting for the model,
+            defaults to 32
+        :type queue_size: int, optional
+        :param max_in_flight: Max frames submitted but not yet yielded,
+            defaults to 16
+        :type max_in_flight: int, optional
+        :param stride: Only run every stride-th frame, defaults to 1
+        :type stride: int, optional
+        :param max_frames: Stop after this many frames are run,
+            defaults to None
+        :type max_frames: Optional[int], optional
+        """
+        import cv2
+
+        self.submit = submit
+        self.max_in_flight = max(1, max_in_flight)
+        self.stride = max(1, stride)
+        self.max_frames = max_frames
+        self._capture = cv2.VideoCapture(path)
+        if not self._capture.isOpened():
+            raise ValueError(f"Could not open video {path}")
+        self.fps = (self._capture.get(cv2.CAP_PROP_FPS) or 25) / self.stride
+        self._frames: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    def _put(self, item: object):
+        # Blocks while the queue is full, unless stopped
+        while not self._stop.is_set():
+            try:
+                self._frames.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _produce(self):
+        import cv2
+
+        index = count = 0
+        try:
+            while not self._stop.is_set():
+                if self.max_frames is not None and count >= self.max_frames:
+                    break
+                ok, frame = self._capture.read()
+                if not ok:
+                    break
+                index += 1
+                if (index - 1) % self.stride != 0:
+                    continue
+                self._put(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                count += 1
+        except BaseException as err:
+            logging.error(f"Failed to decode video: {err}")
+            self._error = err
+        finally:
+            self._capture.release()
+            self._put(_DONE)
+
+    def __iter__(self) -> Iterator[R]:
+        producer = threading.Thread(
+            target=self._produce, name="video-decoder", daemon=True
+        )
+        producer.start()
+        pending: Deque["Future[R]"] = deque()
+        try:
+            done = False
+            while not done or pending:
+                if not done and len(pending) < self.max_in_flight:
+                    # Only wait for frames if nothing is ready to yield
+                    try:
+                        frame = self._frames.get(
+                            timeout=None if not pending else 0.005
+                        )
+                    except queue.Empty:
+                        frame = None
+                    if frame is _DONE:
+                        done = True
+                    elif frame is not None:
+                        pending.append(self.submit(frame))
+                        continue
+                if pending and (
+                    done
+                    or pending[0].done()
+                    or len(pending) >= self.max_in_flight
+                ):
+                    yield pending.popleft().result()
+            if self._error is not None:
+                raise RuntimeError("Failed to decode video") from self._error
+        finally:
+            # Stopped early (e.g client disconnected), don't run the rest
+            self._stop.set()
+            for future in pending:
+                future.cancel()
+
+
+class VideoWriter:
+    """Writes RGB frames to a temporary WebM file, which plays in
+    browsers. The size is taken from the first frame."""
+
+    def __init__(self, fps: float, path: Optional[str] = None):
+        """Initialize the writer
+
+        :param fps: Frames per second
+        :type fps: float
+        :param path: Output path, defaults to a temporary .webm file
+        :type path: Optional[str], optional
+        """
+        self.fps = fps
+        if path is None:
+            fd, path = tempfile.mkstemp(suffix=".webm")
+            os.close(fd)
+        self.path = path
+        self._writer = None
+
+    def write(self, frame: np.ndarray):
+        """Appends a frame
+
+        :param frame: RGB frame
+        :type frame: np.ndarray
+        """
+        import cv2
+
+        if self._writer is None:
+            height, width = frame.shape[:2]
+            self._writer = cv2.VideoWriter(
+                self.path,
+                cv2.VideoWriter_fourcc(*"VP80"),
+                self.fps,
+                (width, height),
+            )
+        self._writer.write(cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
+
+    def close(self):
+        """Finishes the file"""
+        if self._writer is not None:
+            self._writer.release()
+
+    def __enter__(self) -> "VideoWriter":
+        return self
+
+    def __exit__(self, *args):
+        self.close()